@@ -0,0 +1,144 @@
+import asyncio
+import os
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# After an IVR answer the contact flow usually sets attributes within a couple of seconds
+ATTRIBUTE_REFRESH_AFTER_RESPONSE = float(os.getenv("ATTRIBUTE_REFRESH_AFTER_RESPONSE", "2"))
+
+
+class AttributeTracker:
+    """
+    Last known contact attributes plus a log of what changed, so each websocket
+    can be sent only the keys that moved since it last looked.
+    """
+
+    def __init__(self):
+        self.snapshot = {}
+        self.version = 0
+        self._log = []  # index i holds the diff that produced version i + 1
+
+    def apply(self, attributes: dict):
+        """Take a fresh attribute map; returns the diff, or None if nothing changed."""
+        changed = {key: value for key, value in attributes.items() if self.snapshot.get(key) != value}
+        removed = [key for key in self.snapshot if key not in attributes]
+        if not changed and not removed:
+            return None
+        self.snapshot = dict(attributes)
+        self.version += 1
+        diff = {"changed": changed, "removed": removed}
+        self._log.append(diff)
+        return diff
+
+    def since(self, version: int):
+        """Everything that changed after `version`, merged into one diff; None if nothing did."""
+        if version >= self.version:
+            return None
+        changed, removed = {}, set()
+        for diff in self._log[version:]:
+            changed.update(diff["changed"])
+            removed.difference_update(diff["changed"])
+            removed.update(diff["removed"])
+            for key in diff["removed"]:
+                changed.pop(key, None)
+        return {"changed": changed, "removed": sorted(removed)}
+
+
+class AttributeRefresher:
+    """
+    Fetches contact attributes only when something is likely to have changed them
+    (a status transition, an answer sent to the IVR). Requests for a contact that
+    arrive while a refresh is waiting are folded into it; one that arrives during
+    the fetch gets a single follow-up fetch.
+    """
+
+    def __init__(self):
+        self.trackers: Dict[str, AttributeTracker] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._fetching = set()
+        # contact_id -> delay of a request that arrived mid-fetch
+        self._rerun: Dict[str, float] = {}
+        self.requested = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.changes = 0
+        self.errors = 0
+
+    def tracker(self, contact_id: str) -> AttributeTracker:
+        if contact_id not in self.trackers:
+            self.trackers[contact_id] = AttributeTracker()
+        return self.trackers[contact_id]
+
+    def request(self, contact_id: str, fetch, on_change, delay: float = 0.0, reason: str = ""):
+        """
+        Schedule `await fetch(contact_id)` (returning the attribute map) after `delay`;
+        `await on_change(contact_id, attributes, diff)` runs when the map differs from the last one.
+        """
+        self.requested += 1
+        pending = self._pending.get(contact_id)
+        if pending is not None and not pending.done():
+            if contact_id in self._fetching:
+                self._rerun[contact_id] = delay
+            else:
+                self.coalesced += 1
+            return pending
+        task = asyncio.create_task(self._refresh(contact_id, fetch, on_change, delay, reason))
+        self._pending[contact_id] = task
+        task.add_done_callback(lambda finished: self._done(contact_id, finished))
+        return task
+
+    def _done(self, contact_id: str, task: asyncio.Task):
+        if self._pending.get(contact_id) is task:
+            del self._pending[contact_id]
+
+    async def _refresh(self, contact_id: str, fetch, on_change, delay: float, reason: str):
+        while True:
+            if delay:
+                await asyncio.sleep(delay)
+            self._fetching.add(contact_id)
+            try:
+                attributes = await fetch(contact_id)
+            except Exception as e:
+                self.errors += 1
+                print(f"Attribute fetch error for {contact_id} ({reason}): {e}")
+                self._rerun.pop(contact_id, None)
+                return
+            finally:
+                self._fetching.discard(contact_id)
+            self.fetches += 1
+            diff = self.tracker(contact_id).apply(attributes)
+            if diff is not None:
+                self.changes += 1
+                await on_change(contact_id, attributes, diff)
+            if contact_id not in self._rerun:
+                return
+            delay = self._rerun.pop(contact_id)
+
+    def forget(self, contact_id: str):
+        self.trackers.pop(contact_id, None)
+        self._rerun.pop(contact_id, None)
+        pending = self._pending.pop(contact_id, None)
+        if pending is not None:
+            pending.cancel()
+
+    async def close(self):
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self.trackers),
+            "pending": len(self._pending),
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "changes": self.changes,
+            "errors": self.errors,
+        }
+
+
+attribute_refresher = AttributeRefresher()
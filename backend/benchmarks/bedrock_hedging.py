@@ -0,0 +1,131 @@
+"""
+Tail latency and errors for Bedrock calls in one region against HedgedInvoker
+over two stand-in regions, with and without circuit breakers.
+
+Each stand-in region answers in about --latency-ms, with a --slow share of
+requests taking 5-8 s and a --throttle share failing with ThrottlingException.
+The primary region also fails every request between --outage-start and
+--outage-end seconds into the run. Prompts arrive at --rate per second. Hedge
+and breaker settings come from the BEDROCK_HEDGE_* / BEDROCK_BREAKER_* variables.
+Run from the backend directory:
+
+    python benchmarks/bedrock_hedging.py --rate 10 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import BedrockInvoker, BEDROCK_MODEL_ID
+from llm_scheduler import InferenceScheduler
+from hedging import HedgedInvoker, BedrockEndpoint, CircuitBreaker
+from metrics import percentile_ms
+
+ANSWER = json.dumps({"content": [{"text": json.dumps({"value": "1", "field": "press a number"})}]}).encode()
+
+
+class StandInClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class StandInBody:
+    async def read(self):
+        return ANSWER
+
+
+class StandInRegion:
+    """A bedrock-runtime client for one region with a slow tail, throttles and an optional outage."""
+
+    def __init__(self, args, rng, started, outage=False):
+        self.args = args
+        self.rng = rng
+        self.started = started
+        self.outage = outage
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def invoke_model(self, **kwargs):
+        elapsed = time.monotonic() - self.started
+        if self.outage and self.args.outage_start <= elapsed < self.args.outage_end:
+            await asyncio.sleep(0.05)
+            raise StandInClientError("ServiceUnavailableException")
+        if self.rng.random() < self.args.throttle:
+            await asyncio.sleep(0.02)
+            raise StandInClientError("ThrottlingException")
+        if self.rng.random() < self.args.slow:
+            await asyncio.sleep(self.rng.uniform(5, 8))
+        else:
+            await asyncio.sleep(self.rng.lognormvariate(0, 0.25) * self.args.latency_ms / 1000)
+        return {"body": StandInBody()}
+
+
+async def run(args, regions, hedge, breakers):
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    scheduler = InferenceScheduler(max_concurrency=1000, budgets={BEDROCK_MODEL_ID: (1000, 1000)})
+    endpoints = []
+    for region in ("primary", "backup")[:regions]:
+        client = StandInRegion(args, rng, started, outage=region == "primary")
+        breaker = CircuitBreaker() if breakers else CircuitBreaker(failures=10 ** 9)
+        endpoints.append(BedrockEndpoint(region, BedrockInvoker(lambda client=client: client, scheduler, region),
+                                         breaker=breaker))
+    invoker = HedgedInvoker(endpoints, hedge=hedge)
+    latencies, errors = [], 0
+
+    async def prompt():
+        nonlocal errors
+        sent = time.monotonic()
+        try:
+            await invoker.invoke({"messages": []})
+        except Exception:
+            errors += 1
+        latencies.append(time.monotonic() - sent)
+
+    tasks = []
+    while time.monotonic() - started < args.duration:
+        tasks.append(asyncio.create_task(prompt()))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    calls = sum(endpoint.calls for endpoint in endpoints)
+    return latencies, errors, invoker.stats(), calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--latency-ms", type=float, default=900)
+    parser.add_argument("--slow", type=float, default=0.04)
+    parser.add_argument("--throttle", type=float, default=0.02)
+    parser.add_argument("--outage-start", type=float, default=10)
+    parser.add_argument("--outage-end", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.rate}/s prompts for {args.duration:.0f}s, ~{args.latency_ms:.0f} ms, {args.slow * 100:.0f}% slow, "
+          f"{args.throttle * 100:.0f}% throttled, primary down {args.outage_start:.0f}-{args.outage_end:.0f}s")
+    print(f"{'strategy':<22}{'p50':>7}{'p95':>7}{'p99':>7}{'errors':>8}{'hedged':>8}{'failover':>9}{'calls/req':>10}")
+    strategies = [("single region", 1, False, False), ("hedged, no breaker", 2, True, False),
+                  ("hedged + breaker", 2, True, True)]
+    for name, regions, hedge, breakers in strategies:
+        latencies, errors, stats, calls = asyncio.run(run(args, regions, hedge, breakers))
+        total = len(latencies)
+        p50, p95, p99 = (percentile_ms(latencies, fraction, default=0.0) for fraction in (0.5, 0.95, 0.99))
+        print(f"{name:<22}{p50:>7.0f}{p95:>7.0f}{p99:>7.0f}"
+              f"{errors / total * 100:>7.1f}%{stats['hedged'] / total * 100:>7.1f}%"
+              f"{stats['failovers']:>9}{calls / total:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
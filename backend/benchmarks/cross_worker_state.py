@@ -0,0 +1,84 @@
+"""
+Check that two API workers see each other's contact state, transcripts and
+broadcasts through shared_state.RedisBackend, and measure write throughput and
+cross-worker delivery latency. Uses the in-process stand-in server unless
+--redis-url points at a real Redis. Run from the backend directory:
+
+    python benchmarks/cross_worker_state.py --messages 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from redis_standin import StandInRedis
+from metrics import percentile_ms
+from shared_state import RedisBackend
+
+
+async def run(url, messages):
+    standin = None
+    if url is None:
+        standin = StandInRedis()
+        url = f"redis://127.0.0.1:{await standin.start()}/0"
+    prefix = f"bench{int(time.time())}:"
+    worker_a, worker_b = RedisBackend(url, prefix), RedisBackend(url, prefix)
+
+    # Worker B subscribes before A publishes anything
+    received = []
+    ready = asyncio.Event()
+
+    async def listen():
+        subscription = worker_b.subscribe(["contacts"])
+        ready.set()
+        async for channel, message in subscription:
+            received.append(time.perf_counter() - message["sent"])
+            if len(received) == messages:
+                return
+
+    listener = asyncio.create_task(listen())
+    await ready.wait()
+    await asyncio.sleep(0.1)
+
+    # State written on one worker is readable on the other
+    await worker_a.put_contact("contact-1", {"ContactStatus": "CONNECTED", "row_data": {"NPI": "1234567890"}})
+    await worker_a.add_segments("contact-1", [{"content": "For claims press 2", "participant": "CUSTOMER", "offset": 1200}])
+    contact = await worker_b.get_contact("contact-1")
+    segments = await worker_b.get_segments("contact-1")
+    assert contact["ContactStatus"] == "CONNECTED" and segments[0]["offset"] == 1200
+    print("contact state and transcript visible across workers")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker_a.put_contact(f"contact-{i}", {"ContactStatus": "CONNECTED", "i": i}) for i in range(messages)))
+    writes = messages / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(messages):
+        await worker_a.publish("contacts", {"type": "status", "contact_id": f"contact-{i}", "sent": time.perf_counter()})
+    await asyncio.wait_for(listener, timeout=30)
+    delivered = messages / (time.perf_counter() - started)
+
+    print(f"{'writes/s':>10}{'msgs/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    print(f"{writes:>10.0f}{delivered:>10.0f}{percentile_ms(received, 0.5):>9.2f}"
+          f"{percentile_ms(received, 0.95):>9.2f}{max(received) * 1000:>9.2f}")
+
+    await worker_a.close()
+    await worker_b.close()
+    if standin is not None:
+        await standin.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args.redis_url, args.messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure event-loop lag while N simulated calls invoke the LLM concurrently.
+
+Compares the old blocking invoke_model call against BedrockInvoker backed by a
+stand-in client with the same latency. Run from the backend directory:
+
+    python benchmarks/event_loop_lag.py --latency 0.2 --duration 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import BedrockInvoker, BEDROCK_MODEL_ID
+from llm_scheduler import InferenceScheduler
+from metrics import percentile_ms
+
+
+class StandInBody:
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def read(self):
+        return self.payload
+
+
+class StandInBedrockClient:
+    """Answers invoke_model after a fixed delay, like a remote endpoint would."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def invoke_model(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        body = {"content": [{"text": json.dumps({"value": "1", "field": "press a number"})}]}
+        return {"body": StandInBody(json.dumps(body).encode())}
+
+
+async def monitor_lag(stop, samples, interval=0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def simulated_call(invoke, stop, tick):
+    while not stop.is_set():
+        await invoke()
+        await asyncio.sleep(tick)
+
+
+async def run(mode, calls, latency, duration, tick, max_concurrency):
+    # Only the concurrency bound matters here, so leave the per-model budget out of the way
+    scheduler = InferenceScheduler(max_concurrency=max_concurrency, budgets={BEDROCK_MODEL_ID: (10000, 10000)})
+    invoker = BedrockInvoker(client_factory=lambda: StandInBedrockClient(latency), scheduler=scheduler)
+
+    async def blocking_invoke():
+        # Equivalent of the old synchronous boto3 call inside the coroutine
+        time.sleep(latency)
+
+    async def async_invoke():
+        await invoker.invoke({"messages": []})
+
+    invoke = blocking_invoke if mode == "blocking" else async_invoke
+    stop = asyncio.Event()
+    samples = []
+    tasks = [asyncio.create_task(monitor_lag(stop, samples))]
+    tasks += [asyncio.create_task(simulated_call(invoke, stop, tick)) for _ in range(calls)]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    await invoker.close()
+
+    return {"mode": mode, "calls": calls, "p95_ms": percentile_ms(samples, 0.95, default=0.0),
+            "max_ms": max(samples) * 1000 if samples else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated Bedrock latency in seconds")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds to run each scenario")
+    parser.add_argument("--tick", type=float, default=0.5, help="per-call pause between prompts")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--calls", default="1,5,10,20,40")
+    parser.add_argument("--modes", default="blocking,async")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'calls':>7}{'p95 lag ms':>13}{'max lag ms':>13}")
+    for mode in args.modes.split(","):
+        for calls in [int(c) for c in args.calls.split(",")]:
+            result = asyncio.run(run(mode, calls, args.latency, args.duration, args.tick, args.max_concurrency))
+            print(f"{result['mode']:<10}{result['calls']:>7}{result['p95_ms']:>13.1f}{result['max_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Overload test for model admission: the old first-come semaphore against
+InferenceScheduler. Prompts arrive at --rate per second across all calls, each
+with --deadline seconds before its IVR gives up; --stale of them arrive already
+late (e.g. a backlog replayed after a reconnect). The stand-in model takes
+--service-ms per request. Reports how many prompts were answered in time, how
+many were shed, and queue waits. Run from the backend directory:
+
+    python benchmarks/llm_scheduling.py --rate 9 --concurrency 8 --service-ms 1200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_scheduler import InferenceScheduler, DeadlineExceeded, PRIORITY_LIVE
+from metrics import percentile_ms
+
+MODEL = "stand-in-model"
+
+
+async def run(args, scheduled):
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    scheduler = InferenceScheduler(max_concurrency=args.concurrency, budgets={MODEL: (args.budget_rps, args.budget_rps)})
+    results = {"in_time": 0, "late": 0, "shed": 0, "waits": []}
+
+    async def prompt(arrived_at):
+        deadline = arrived_at + args.deadline
+        queued = time.monotonic()
+        try:
+            if scheduled:
+                async with scheduler.slot(MODEL, PRIORITY_LIVE, deadline):
+                    results["waits"].append(time.monotonic() - queued)
+                    await asyncio.sleep(rng.uniform(0.7, 1.3) * args.service_ms / 1000)
+            else:
+                async with semaphore:
+                    results["waits"].append(time.monotonic() - queued)
+                    await asyncio.sleep(rng.uniform(0.7, 1.3) * args.service_ms / 1000)
+        except DeadlineExceeded:
+            results["shed"] += 1
+            return
+        results["in_time" if time.monotonic() <= deadline else "late"] += 1
+
+    tasks = []
+    started = time.monotonic()
+    while time.monotonic() - started < args.duration:
+        now = time.monotonic()
+        stale = rng.random() < args.stale
+        arrived_at = now - rng.uniform(args.deadline * 0.6, args.deadline) if stale else now
+        tasks.append(asyncio.create_task(prompt(arrived_at)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    return results, len(tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=9)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--service-ms", type=float, default=1200)
+    parser.add_argument("--deadline", type=float, default=6)
+    parser.add_argument("--stale", type=float, default=0.2)
+    parser.add_argument("--budget-rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.rate}/s prompts, {args.concurrency} slots, ~{args.service_ms:.0f} ms per request, "
+          f"{args.deadline:.0f}s deadline, {args.stale * 100:.0f}% arrive stale")
+    print(f"{'strategy':<12}{'prompts':>9}{'in time':>9}{'late':>7}{'shed':>7}{'wait p50':>10}{'wait p95':>10}")
+    for name, scheduled in (("fifo", False), ("scheduler", True)):
+        results, total = asyncio.run(run(args, scheduled))
+        print(f"{name:<12}{total:>9}{results['in_time'] / total * 100:>8.1f}%{results['late']:>7}{results['shed']:>7}"
+              f"{percentile_ms(results['waits'], 0.5, default=0.0):>10.0f}"
+              f"{percentile_ms(results['waits'], 0.95, default=0.0):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Offline evaluation of IVR model routing: latency and agreement of the large model
+alone, the fast model alone, and ModelRouter (fast first, escalating on failed
+validation) over a set of recorded prompts.
+
+--prompts is a JSONL file with one recorded prompt per line:
+
+    {"ivr_text": "...", "row_data": {...}, "selected_option": "Claims",
+     "expected": {"value": "1", "field": "press a number"}}
+
+"expected" is optional; without it the large model's answer is the reference.
+Without --prompts a built-in set of payer menus is used. By default both models
+are stand-ins (--fast-ms/--large-ms latency, --fast-error/--large-error chance of
+a wrong answer); --live calls Bedrock with IVR_FAST_MODEL_ID and BEDROCK_MODEL_ID.
+Run from the backend directory:
+
+    python benchmarks/model_routing_eval.py --repeat 20
+    python benchmarks/model_routing_eval.py --prompts recorded_prompts.jsonl --live
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_routing import ModelRouter, ModelTier, request_body, parse_decision, NO_MATCH
+from model_routing import IVR_FAST_MODEL_ID, IVR_FAST_MAX_TOKENS, IVR_FAST_PROMPT_CACHING, IVR_LARGE_MAX_TOKENS
+from llm import BEDROCK_MODEL_ID
+from metrics import percentile_ms
+
+ROW = {"Patient Name": "Jane Doe", "DOB": "1990-01-01", "NPI": "1447914288", "TAX_ID": "843612075",
+       "Claim Number": "7845120093", "Member ID": "W123456789"}
+PROMPTS = [
+    ("If you are a provider press 1. If you are a member press 2.", "1", "press a number"),
+    ("Please enter the provider's 10 digit NPI number followed by the pound sign.", "1447914288#", "NPI"),
+    ("Please enter the patient's date of birth using 2 digits for the month, 2 digits for the day, "
+     "and 4 digits for the year.", "01011990", "DOB"),
+    ("For eligibility press 2. For claims press 3.", "3", "press a number"),
+    ("Please enter your 9 digit tax ID.", "843612075", "TAX_ID"),
+    ("Your call may be monitored or recorded.", NO_MATCH, "unknown"),
+    ("Please say or enter the member ID.", "W123456789", "Member ID"),
+    ("Please hold while we transfer you to a representative.", "transferring", "transfer to agent"),
+    ("Enter the claim number followed by pound.", "7845120093#", "Claim Number"),
+    ("Para español oprima el 9. For English please stay on the line.", NO_MATCH, "unknown"),
+    ("To check the status of a claim press 1. To submit a new claim press 2.", "1", "press a number"),
+    ("Please say your reason for calling, for example claims or eligibility.", "Claims", "voice only"),
+]
+
+
+def builtin_prompts():
+    return [{"ivr_text": text, "row_data": ROW, "selected_option": "Claims", "expected": {"value": value, "field": field}}
+            for text, value, field in PROMPTS]
+
+
+def load_prompts(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def normalize(decision):
+    if decision is None:
+        return None
+    return str(decision.get("value", "")).strip().lower(), str(decision.get("field", "")).strip().lower()
+
+
+def wrong_answer(rng, prompt, expected):
+    """A plausible mistake: an offered-but-wrong option, a made-up column, a dropped digit, no JSON or no match."""
+    value, field = expected["value"], expected["field"]
+    if field == "press a number":
+        options = [digit for digit in "0123456789" if digit in prompt["ivr_text"] and digit != value]
+        if options and rng.random() < 0.5:
+            return json.dumps({"value": rng.choice(options), "field": field})
+    mistake = rng.choice(["column", "digits", "text", "no match"])
+    if mistake == "column" and field not in ("unknown", "press a number"):
+        return json.dumps({"value": value, "field": "Provider " + field})
+    if mistake == "digits" and any(char.isdigit() for char in value):
+        return json.dumps({"value": value[1:], "field": field})
+    if mistake == "text":
+        return f'Here is the answer: {{"value": "{value}", "field": "{field}"}}'
+    return json.dumps({"value": NO_MATCH, "field": "unknown"})
+
+
+def stand_in_ask(args, rng, prompt):
+    expected = prompt.get("expected") or {"value": NO_MATCH, "field": "unknown"}
+
+    async def ask(tier):
+        fast = tier.name == "fast"
+        await asyncio.sleep(rng.uniform(0.7, 1.4) * (args.fast_ms if fast else args.large_ms) / 1000)
+        if rng.random() < (args.fast_error if fast else args.large_error):
+            text = wrong_answer(rng, prompt, expected)
+        else:
+            text = json.dumps(expected)
+        return parse_decision(text), text
+
+    return ask
+
+
+def live_ask(prompt):
+    from hedging import hedged_invoker
+    from ivr_prompts import build_system_blocks
+
+    system_blocks = build_system_blocks(prompt.get("selected_option", "Claims"), prompt["row_data"])
+
+    async def ask(tier):
+        body = request_body(system_blocks, prompt["ivr_text"], tier)
+        streamed_fields, text = await hedged_invoker.invoke_stream(body, model_id=tier.model_id)
+        return streamed_fields or parse_decision(text), text
+
+    return ask
+
+
+async def run(args, prompts, tiers):
+    rng = random.Random(args.seed)
+    router = ModelRouter(tiers)
+
+    async def one(prompt):
+        ask = live_ask(prompt) if args.live else stand_in_ask(args, rng, prompt)
+        started = time.monotonic()
+        try:
+            decision, tier, text = await router.decide(ask, prompt["ivr_text"], prompt["row_data"])
+        except Exception as e:
+            print(f"error on {prompt['ivr_text']!r}: {e}")
+            decision = None
+        return decision, time.monotonic() - started
+
+    results = await asyncio.gather(*(one(prompt) for prompt in prompts))
+    if args.live:
+        from hedging import hedged_invoker
+        await hedged_invoker.close()
+    return results, router.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", help="JSONL of recorded prompts; defaults to a built-in set")
+    parser.add_argument("--repeat", type=int, default=10, help="times each prompt is asked")
+    parser.add_argument("--live", action="store_true", help="call Bedrock instead of the stand-in models")
+    parser.add_argument("--fast-ms", type=float, default=350)
+    parser.add_argument("--large-ms", type=float, default=1400)
+    parser.add_argument("--fast-error", type=float, default=0.15)
+    parser.add_argument("--large-error", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    prompts = (load_prompts(args.prompts) if args.prompts else builtin_prompts()) * args.repeat
+    fast = ModelTier("fast", IVR_FAST_MODEL_ID, IVR_FAST_MAX_TOKENS, IVR_FAST_PROMPT_CACHING)
+    large = ModelTier("large", BEDROCK_MODEL_ID, IVR_LARGE_MAX_TOKENS)
+    runs = {name: asyncio.run(run(args, prompts, tiers))
+            for name, tiers in (("large only", [large]), ("fast only", [fast]), ("routed", [fast, large]))}
+
+    # Recorded answers are the reference when present, otherwise whatever the large model said
+    reference = [normalize(prompt.get("expected")) or normalize(decision)
+                 for prompt, (decision, _) in zip(prompts, runs["large only"][0])]
+    print(f"{len(prompts)} prompts, {'live Bedrock' if args.live else 'stand-in models'}")
+    print(f"{'strategy':<12}{'agree':>8}{'p50 ms':>9}{'p95 ms':>9}{'escalated':>11}")
+    for name, (results, stats) in runs.items():
+        agree = sum(normalize(decision) == expected for (decision, _), expected in zip(results, reference))
+        latencies = [seconds for _, seconds in results]
+        escalated = stats["tiers"]["fast"]["escalated"] if "fast" in stats["tiers"] and name == "routed" else 0
+        print(f"{name:<12}{agree / len(prompts) * 100:>7.1f}%{percentile_ms(latencies, 0.5, default=0.0):>9.0f}"
+              f"{percentile_ms(latencies, 0.95, default=0.0):>9.0f}{escalated / len(prompts) * 100:>10.1f}%")
+    reasons = runs["routed"][1]["escalation_reasons"]
+    if reasons:
+        print("escalation reasons: " + ", ".join(f"{reason} {count}" for reason, count in sorted(reasons.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+The /ws loop deciding IVR prompts inline (the old serial await) against handing
+them to IVRPipeline. Reports how long a new segment waits before it is pushed to
+the operator, how long the latest prompt waits for its answer, and how many
+answers were for prompts the IVR had already moved past.
+
+Each stand-in call gets bursts of --burst prompts --gap-ms apart, with
+--pause-ms between bursts; the stand-in decision takes --decide-ms. Run from the
+backend directory:
+
+    python benchmarks/pipelined_ivr.py --calls 20 --decide-ms 900
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contact_events import ContactNotifier
+from ivr_pipeline import IVRPipeline
+from metrics import percentile_ms
+
+
+async def feed(prompts, notifier, args):
+    """Append (prompt, arrived_at, latest_in_burst) as Contact Lens would, waking the loop each time."""
+    for burst in range(args.bursts):
+        for position in range(args.burst):
+            prompts.append((f"burst {burst} prompt {position}", time.monotonic(), position == args.burst - 1))
+            notifier.notify()
+            await asyncio.sleep(args.gap_ms / 1000)
+        await asyncio.sleep(args.pause_ms / 1000)
+    prompts.append(None)
+    notifier.notify()
+
+
+async def serial_call(args, metrics):
+    prompts, notifier = [], ContactNotifier()
+    feeder = asyncio.create_task(feed(prompts, notifier, args))
+    seen = 0
+    while True:
+        version = notifier.version
+        new, seen = prompts[seen:], len(prompts)
+        for item in new:
+            if item is None:
+                await feeder
+                return
+            prompt, arrived_at, latest = item
+            await asyncio.sleep(args.decide_ms / 1000)
+            metrics["answers"] += 1
+            metrics["stale"] += not latest
+            if latest:
+                metrics["answer_wait"].append(time.monotonic() - arrived_at)
+        # Pushed only once every decision above has finished
+        now = time.monotonic()
+        metrics["push_wait"].extend(now - item[1] for item in new if item is not None)
+        await notifier.wait(version, timeout=5)
+
+
+async def pipeline_call(args, metrics, pipeline, call_id):
+    prompts, notifier = [], ContactNotifier()
+    feeder = asyncio.create_task(feed(prompts, notifier, args))
+    seen = 0
+    while True:
+        version = notifier.version
+        new, seen = prompts[seen:], len(prompts)
+        for item in new:
+            if item is None:
+                await feeder
+                # Let the last answer land
+                await asyncio.sleep(args.decide_ms / 1000 * 2)
+                return
+            pipeline.submit(call_id, item[0])
+            metrics["arrived"][item[0]] = item
+        now = time.monotonic()
+        metrics["push_wait"].extend(now - item[1] for item in new if item is not None)
+        await notifier.wait(version, timeout=5)
+
+
+async def run(args, pipelined):
+    metrics = {"answers": 0, "stale": 0, "answer_wait": [], "push_wait": [], "arrived": {}}
+    if not pipelined:
+        await asyncio.gather(*(serial_call(args, metrics) for _ in range(args.calls)))
+        return metrics
+
+    async def decide(contact_id, prompt, arrived_at):
+        await asyncio.sleep(args.decide_ms / 1000)
+        return {"question": prompt, "field": "press a number", "value": "1"}
+
+    async def on_result(contact_id, response_sent):
+        _, arrived_at, latest = metrics["arrived"][response_sent["question"]]
+        metrics["answers"] += 1
+        metrics["stale"] += not latest
+        if latest:
+            metrics["answer_wait"].append(time.monotonic() - arrived_at)
+
+    pipeline = IVRPipeline(decide, on_result)
+    await asyncio.gather(*(pipeline_call(args, metrics, pipeline, f"call-{i}") for i in range(args.calls)))
+    metrics["cancelled"] = pipeline.cancelled + pipeline.superseded
+    await pipeline.close()
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--bursts", type=int, default=4)
+    parser.add_argument("--burst", type=int, default=3)
+    parser.add_argument("--gap-ms", type=float, default=400)
+    parser.add_argument("--pause-ms", type=float, default=3000)
+    parser.add_argument("--decide-ms", type=float, default=900)
+    args = parser.parse_args()
+
+    print(f"{'strategy':<12}{'push p50':>10}{'push p95':>10}{'answer p50':>12}{'answer p95':>12}{'answers':>9}{'stale':>7}{'cancelled':>11}")
+    for name, pipelined in (("serial", False), ("pipelined", True)):
+        metrics = asyncio.run(run(args, pipelined))
+        push, answer = metrics['push_wait'], metrics['answer_wait']
+        print(f"{name:<12}{percentile_ms(push, 0.5, default=0.0):>10.0f}{percentile_ms(push, 0.95, default=0.0):>10.0f}"
+              f"{percentile_ms(answer, 0.5, default=0.0):>12.0f}{percentile_ms(answer, 0.95, default=0.0):>12.0f}"
+              f"{metrics['answers']:>9}{metrics['stale']:>7}{metrics.get('cancelled', 0):>11}")
+
+
+if __name__ == "__main__":
+    main()
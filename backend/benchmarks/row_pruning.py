@@ -0,0 +1,143 @@
+"""
+Row tokens sent per IVR prompt to a tier without prompt caching (the fast tier
+by default) with the full row_data against the columns picked by ColumnIndex,
+and whether the column the answer needs was still in the prompt.
+
+Uses a built-in 45-column worklist row and a replay set of payer prompts, or
+--prompts, a JSONL file in the format of benchmarks/model_routing_eval.py
+("expected" is needed for accuracy). Token counts are estimated from JSON size;
+--live also asks IVR_FAST_MODEL_ID each prompt both ways and reports the real
+input tokens and how often the answers agree. Run from the backend directory:
+
+    python benchmarks/row_pruning.py
+    python benchmarks/row_pruning.py --prompts recorded_prompts.jsonl --live
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_index import ColumnIndex, CHARS_PER_TOKEN
+from ivr_prompts import build_system_blocks
+
+ROW = {
+    "Row ID": "17", "Practice ID": "10040282", "Provider Name": "HARMONY OAKS RECOVERY CENTER, LLC",
+    "Billing Provider NPI": "1447914288", "Rendering Provider NPI": "1811992431", "TAX_ID": "843612075",
+    "Provider Address": "1200 Harmony Way", "Provider City": "Fort Worth", "Provider State": "TX",
+    "Provider Zip": "76102", "Patient First Name": "Jane", "Patient Last Name": "Doe", "DOB": "01/01/1990",
+    "Gender": "F", "Patient Account Number": "HO-558120", "Member ID": "W123456789", "Group Number": "GRP-22817",
+    "Subscriber Name": "John Doe", "Relationship": "Spouse", "Payer": "Aetna", "Payer Phone": "1-800-555-0199",
+    "Plan Type": "PPO", "Claim Number": "7845120093", "Date of Service": "2024-03-14", "Admit Date": "2024-03-10",
+    "Discharge Date": "2024-03-20", "Billed Amount": "18450.00", "Allowed Amount": "9120.00",
+    "Paid Amount": "0.00", "Claim Status": "Denied", "Denial Code": "CO-197", "Authorization Number": "AUTH-99812",
+    "Level of Care": "Residential", "Revenue Code": "1001", "CPT": "H0018", "Diagnosis Code": "F10.20",
+    "Place of Service": "55", "Submitted Date": "2024-03-25", "Follow Up Date": "2024-05-01",
+    "Assigned To": "mjones", "Notes": "Denied for missing auth; auth on file", "Priority": "High",
+    "Last Touched": "2024-04-20", "Aging Bucket": "31-60", "Phone": "+18005550199",
+}
+# (IVR prompt, field of the right answer)
+REPLAY = [
+    ("If you are a provider press 1. If you are a member press 2.", "press a number"),
+    ("Please enter the provider's 10 digit NPI number followed by the pound sign.", "Billing Provider NPI"),
+    ("Please enter your 9 digit tax ID.", "TAX_ID"),
+    ("Please enter the patient's date of birth using 2 digits for the month, 2 digits for the day, "
+     "and 4 digits for the year.", "DOB"),
+    ("Please say or enter the member ID.", "Member ID"),
+    ("Enter the claim number followed by pound.", "Claim Number"),
+    ("Please enter the date of service.", "Date of Service"),
+    ("Please enter the billed amount in dollars and cents.", "Billed Amount"),
+    ("Please say the patient's first and last name.", "Patient First Name"),
+    ("Please enter the group number on the member's card.", "Group Number"),
+    ("Please enter the authorization number.", "Authorization Number"),
+    ("Please enter the provider's zip code.", "Provider Zip"),
+    ("Your call may be monitored or recorded.", "unknown"),
+    ("For eligibility press 2. For claims press 3.", "press a number"),
+    ("Please say your reason for calling, for example claims or eligibility.", "voice only"),
+    ("Please hold while we transfer you to a representative.", "transfer to agent"),
+    ("Please enter the patient's account number.", "Patient Account Number"),
+    ("Enter the admission date.", "Admit Date"),
+]
+
+
+def builtin_prompts():
+    return [{"ivr_text": text, "row_data": ROW, "selected_option": "Claims", "expected": {"field": field}}
+            for text, field in REPLAY]
+
+
+def load_prompts(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def tokens(row):
+    return len(json.dumps(row)) // CHARS_PER_TOKEN
+
+
+async def live(prompts, pruned_rows):
+    """(input tokens full, input tokens pruned, answers that agree) from IVR_FAST_MODEL_ID."""
+    from hedging import hedged_invoker
+    from model_routing import ModelTier, request_body, parse_decision, IVR_FAST_MODEL_ID, IVR_FAST_MAX_TOKENS
+
+    tier = ModelTier("fast", IVR_FAST_MODEL_ID, IVR_FAST_MAX_TOKENS, prompt_caching=False)
+    totals = [0, 0, 0]
+    for prompt, pruned in zip(prompts, pruned_rows):
+        answers = []
+        for position, row in enumerate((prompt["row_data"], pruned or prompt["row_data"])):
+            blocks = build_system_blocks(prompt.get("selected_option", "Claims"), row)
+            response_body = await hedged_invoker.invoke(request_body(blocks, prompt["ivr_text"], tier),
+                                                        model_id=tier.model_id)
+            totals[position] += response_body.get("usage", {}).get("input_tokens", 0)
+            answers.append(parse_decision(response_body["content"][0]["text"]))
+        totals[2] += answers[0] == answers[1]
+    await hedged_invoker.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", help="JSONL of recorded prompts; defaults to a built-in replay set")
+    parser.add_argument("--live", action="store_true", help="also ask Bedrock with the full and the pruned row")
+    parser.add_argument("--verbose", action="store_true", help="print the columns picked for every prompt")
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.prompts) if args.prompts else builtin_prompts()
+    indexes = {}
+    full_tokens = sent_tokens = fallbacks = answerable = kept = 0
+    pruned_rows = []
+    for prompt in prompts:
+        row = prompt["row_data"]
+        key = json.dumps(row, sort_keys=True)
+        index = indexes.setdefault(key, ColumnIndex(row))
+        columns = index.candidates(prompt["ivr_text"])
+        pruned = None if columns is None else {column: row[column] for column in columns}
+        pruned_rows.append(pruned)
+        full_tokens += tokens(row)
+        sent_tokens += tokens(pruned if pruned is not None else row)
+        fallbacks += pruned is None
+        field = (prompt.get("expected") or {}).get("field")
+        if field in row:
+            answerable += 1
+            kept += pruned is None or field in pruned
+            if pruned is not None and field not in pruned:
+                print(f"MISSED {field!r}: {prompt['ivr_text']}")
+        if args.verbose:
+            print(f"{prompt['ivr_text'][:60]:<62}{'full row' if pruned is None else list(pruned)}")
+
+    instructions = len(build_system_blocks("Claims", {})[0]["text"]) // CHARS_PER_TOKEN
+    print(f"{len(prompts)} prompts, {len(ROW) if not args.prompts else 'recorded'} columns, "
+          f"{fallbacks} fell back to the full row")
+    print(f"row tokens per prompt: {full_tokens / len(prompts):.0f} full, {sent_tokens / len(prompts):.0f} pruned "
+          f"({(1 - sent_tokens / full_tokens) * 100:.0f}% saved; "
+          f"{(full_tokens - sent_tokens) / (full_tokens + instructions * len(prompts)) * 100:.0f}% of the system prompt)")
+    if answerable:
+        print(f"answer column in the prompt: {kept}/{answerable} ({kept / answerable * 100:.1f}%)")
+    if args.live:
+        full_input, pruned_input, agree = asyncio.run(live(prompts, pruned_rows))
+        print(f"live input tokens: {full_input} full, {pruned_input} pruned; answers agree {agree}/{len(prompts)}")
+
+
+if __name__ == "__main__":
+    main()
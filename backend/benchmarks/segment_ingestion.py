@@ -0,0 +1,131 @@
+"""
+Compare Contact Lens API calls, CPU and ingestion delay per call-minute for the
+old restart-from-the-first-page polling and the cursor-based adaptive poller.
+
+The call is replayed on a virtual clock against a stand-in
+list_realtime_contact_analysis_segments that pages through the segments that
+have "happened" so far. Run from the backend directory:
+
+    python benchmarks/segment_ingestion.py --minutes 20
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestion import SegmentCursor, pull_segments
+from transcript_store import TranscriptStore
+
+IVR_SECONDS = 90
+
+
+def synthetic_call(minutes):
+    """IVR prompts every few seconds for 90 s, long hold with reminders, then an agent conversation."""
+    segments = []
+    at = 2.0
+    while at < IVR_SECONDS:
+        segments.append((at, "CUSTOMER", f"For claims press 2, for eligibility press 3, menu prompt at {at:.0f} seconds."))
+        at += 4.5
+    hold_end = minutes * 60 - 120
+    while at < hold_end:
+        segments.append((at, "CUSTOMER", "Thank you for holding, your call is important to us. Please continue to hold."))
+        at += 60
+    while at < minutes * 60:
+        segments.append((at, "AGENT", f"Agent speaking about the claim status at {at:.0f} seconds into the call."))
+        at += 8
+    return [
+        {"Transcript": {"Id": f"seg-{index}", "ParticipantRole": role, "Content": content,
+                        "BeginOffsetMillis": int(available * 1000)}, "available": available}
+        for index, (available, role, content) in enumerate(segments)
+    ]
+
+
+class StandInContactLens:
+    def __init__(self, segments):
+        self.segments = segments
+        self.now = 0.0
+        self.calls = 0
+
+    async def list_segments(self, MaxResults, NextToken=None, **kwargs):
+        self.calls += 1
+        available = [segment for segment in self.segments if segment["available"] <= self.now]
+        start = int(NextToken) if NextToken else 0
+        page = available[start:start + MaxResults]
+        # Contact Lens keeps returning a token while real-time analysis is running
+        return {"Segments": [{"Transcript": s["Transcript"]} for s in page], "NextToken": str(start + len(page))}
+
+
+def legacy_poll(client, seen_offsets, delays):
+    """The old fetch_analysis_segments: page from the start and hash every segment each poll."""
+    start_cpu = time.process_time()
+    seen_hashes = set()
+    token = None
+    while True:
+        available = [segment for segment in client.segments if segment["available"] <= client.now]
+        client.calls += 1
+        start = int(token) if token else 0
+        page = available[start:start + 100]
+        for segment in page:
+            content = segment["Transcript"]["Content"]
+            normalized = " ".join(content.strip().lower().split())
+            content_hash = hashlib.sha256(normalized.encode()).hexdigest()
+            if content_hash in seen_hashes:
+                continue
+            seen_hashes.add(content_hash)
+            if segment["Transcript"]["Id"] not in seen_offsets:
+                seen_offsets.add(segment["Transcript"]["Id"])
+                delays.append((segment["available"], client.now - segment["available"]))
+        if start + len(page) >= len(available):
+            break
+        token = str(start + len(page))
+    return time.process_time() - start_cpu
+
+
+async def run_legacy(segments, minutes):
+    client = StandInContactLens(segments)
+    seen, delays, cpu = set(), [], 0.0
+    while client.now < minutes * 60:
+        cpu += legacy_poll(client, seen, delays)
+        client.now += 2.0
+    return client.calls, cpu, delays
+
+
+async def run_cursor(segments, minutes):
+    client = StandInContactLens(segments)
+    cursor = SegmentCursor()
+    store = TranscriptStore()
+    delays, cpu = [], 0.0
+    while client.now < minutes * 60:
+        start_cpu = time.process_time()
+        transcripts = await pull_segments(client.list_segments, "instance", "contact", cursor)
+        # Same as fetch_analysis_segments: only segments the store accepts count as IVR activity
+        added = [store.add(t["Content"], t["ParticipantRole"], t["BeginOffsetMillis"]) for t in transcripts]
+        cpu += time.process_time() - start_cpu
+        delays += [(t["BeginOffsetMillis"] / 1000, client.now - t["BeginOffsetMillis"] / 1000) for t in transcripts]
+        customer = sum(1 for segment in added if segment and segment["participant"] == "CUSTOMER")
+        client.now += cursor.next_interval(customer, now=client.now)
+    return client.calls, cpu, delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=20)
+    args = parser.parse_args()
+
+    segments = synthetic_call(args.minutes)
+    print(f"{len(segments)} segments over a {args.minutes} minute call")
+    print(f"{'strategy':<10}{'API calls/min':>15}{'CPU ms/min':>12}{'IVR delay s':>13}{'hold delay s':>14}")
+    for name, runner in (("legacy", run_legacy), ("cursor", run_cursor)):
+        calls, cpu, delays = asyncio.run(runner(segments, args.minutes))
+        ivr = [delay for available, delay in delays if available < IVR_SECONDS]
+        hold = [delay for available, delay in delays if available >= IVR_SECONDS]
+        print(f"{name:<10}{calls / args.minutes:>15.1f}{cpu * 1000 / args.minutes:>12.2f}"
+              f"{sum(ivr) / max(len(ivr), 1):>13.2f}{sum(hold) / max(len(hold), 1):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
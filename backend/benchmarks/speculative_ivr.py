@@ -0,0 +1,112 @@
+"""
+Response latency saved by speculative IVR decisions against the share of
+decision calls that were wasted (cancelled or discarded).
+
+Each IVR prompt is "spoken" one word every --word-ms; the stand-in transcriber
+emits a growing partial every --partial-ms, sometimes misrecognizing the last
+word and correcting it on the next partial, and finalizes --final-ms after the
+last word. The stand-in decision takes --decide-ms. Every prompt runs as its
+own contact, all at once. Run from the backend directory:
+
+    python benchmarks/speculative_ivr.py --decide-ms 900 --final-ms 700
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speculation import SpeculativeDecider
+
+PROMPTS = [
+    "Thank you for calling provider services. For claims press 2. For eligibility and benefits press 3.",
+    "Please enter the provider's 10 digit NPI number followed by the pound sign.",
+    "Please enter the member's date of birth using 2 digits for the month 2 digits for the day and 4 digits for the year.",
+    "If you are a provider press 1. If you are a member press 2.",
+    "Para español oprima el 9. For English please stay on the line.",
+    "Please say or enter the claim number as it appears on the explanation of benefits.",
+    "To speak with a representative press 0 at any time.",
+    "Please enter your 9 digit tax identification number.",
+    "Your call may be monitored or recorded for quality purposes. Please listen carefully as our menu options have changed.",
+    "For the status of a claim press 1. To check a prior authorization press 2. For all other questions press 3.",
+]
+MISHEARD = {"press": "pressed", "enter": "center", "claims": "clean", "2": "to", "3": "free", "provider": "divider"}
+
+
+def answer(text):
+    digits = re.findall(r"\b\d\b", text.lower())
+    return {"value": digits[0] if digits else "No matching data found", "field": "press a number", "source": "llm"}
+
+
+async def speak(decider, contact_id, prompt, args, rng, timings):
+    words = prompt.split()
+    started = time.monotonic()
+    spoken = 0
+    while spoken < len(words):
+        await asyncio.sleep(args.partial_ms / 1000)
+        spoken = min(len(words), int((time.monotonic() - started) * 1000 / args.word_ms) + 1)
+        partial = words[:spoken]
+        if rng.random() < args.misrecognition and partial[-1].lower().strip(".,") in MISHEARD:
+            partial = partial[:-1] + [MISHEARD[partial[-1].lower().strip(".,")]]
+        if decider is not None:
+            decider.speculate(contact_id, " ".join(partial), "utterance-1")
+    await asyncio.sleep(args.final_ms / 1000)
+    final_at = time.monotonic()
+    result = await decider.commit(contact_id, prompt) if decider is not None else None
+    fallback = result is None
+    if fallback:
+        await asyncio.sleep(args.decide_ms / 1000)
+        result = answer(prompt)
+    timings.append(((time.monotonic() - final_at) * 1000, result["value"] == answer(prompt)["value"], fallback))
+
+
+async def run(args, min_new_words):
+    calls = {"count": 0}
+
+    async def decide(contact_id, text):
+        calls["count"] += 1
+        await asyncio.sleep(args.decide_ms / 1000)
+        return answer(text)
+
+    decider = SpeculativeDecider(decide, min_new_words=min_new_words) if min_new_words else None
+    rng = random.Random(args.seed)
+    timings = []
+    await asyncio.gather(*(
+        speak(decider, f"contact-{i}", prompt, args, rng, timings)
+        for i, prompt in enumerate(PROMPTS * args.repeat)
+    ))
+    calls["count"] += sum(1 for _, _, fallback in timings if fallback)
+    return timings, decider.stats() if decider else None, calls["count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--word-ms", type=float, default=300)
+    parser.add_argument("--partial-ms", type=float, default=250)
+    parser.add_argument("--final-ms", type=float, default=700)
+    parser.add_argument("--decide-ms", type=float, default=900)
+    parser.add_argument("--misrecognition", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    print(f"{'strategy':<24}{'resp p50 ms':>12}{'resp mean ms':>13}{'saved ms':>10}{'calls':>7}{'wasted':>8}{'correct':>9}")
+    baseline_mean = None
+    for min_new_words in (None, 1, 3, 5):
+        timings, stats, calls = asyncio.run(run(args, min_new_words))
+        latencies = sorted(latency for latency, _, _ in timings)
+        mean = sum(latencies) / len(latencies)
+        baseline_mean = mean if baseline_mean is None else baseline_mean
+        correct = sum(1 for _, ok, _ in timings if ok) / len(timings) * 100
+        name = "final only" if min_new_words is None else f"speculate (new words {min_new_words})"
+        wasted = f"{stats['wasted_call_rate'] * 100:.0f}%" if stats else "-"
+        print(f"{name:<24}{latencies[len(latencies) // 2]:>12.0f}{mean:>13.0f}{baseline_mean - mean:>10.0f}"
+              f"{calls:>7}{wasted:>8}{correct:>8.0f}%")
+
+
+if __name__ == "__main__":
+    main()
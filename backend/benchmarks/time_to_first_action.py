@@ -0,0 +1,112 @@
+"""
+Compare time-to-first-action for full-body and streamed IVR answers.
+
+A stand-in bedrock-runtime client emits the answer token by token with a fixed
+per-token delay, optionally followed by trailing explanation text. Run from the
+backend directory:
+
+    python benchmarks/time_to_first_action.py --token-delay 0.02 --trailing-tokens 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import BedrockInvoker
+
+ANSWER = '{\n    "value": "123456789#",\n    "field": "TAX_ID"\n}'
+
+
+def tokenize(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class StandInStream:
+    def __init__(self, tokens, first_token_delay, token_delay):
+        self.tokens = tokens
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.closed = False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first_token_delay)
+        for token in self.tokens:
+            if self.closed:
+                return
+            await asyncio.sleep(self.token_delay)
+            payload = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": token}}
+            yield {"chunk": {"bytes": json.dumps(payload).encode()}}
+
+    def close(self):
+        self.closed = True
+
+
+class StandInBody:
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def read(self):
+        return self.payload
+
+
+class StandInBedrockClient:
+    def __init__(self, first_token_delay, token_delay, trailing_tokens):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.text = ANSWER + " The IVR asked for the tax ID." * (trailing_tokens // 8)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def invoke_model(self, **kwargs):
+        tokens = tokenize(self.text)
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(tokens))
+        body = {"content": [{"text": self.text}]}
+        return {"body": StandInBody(json.dumps(body).encode())}
+
+    async def invoke_model_with_response_stream(self, **kwargs):
+        return {"body": StandInStream(tokenize(self.text), self.first_token_delay, self.token_delay)}
+
+
+async def measure(args):
+    client = StandInBedrockClient(args.first_token_delay, args.token_delay, args.trailing_tokens)
+    invoker = BedrockInvoker(client_factory=lambda: client)
+
+    full, streamed = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        await invoker.invoke({"messages": []})
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fields, _ = await invoker.invoke_stream({"messages": []})
+        streamed.append(time.perf_counter() - start)
+        assert fields == {"value": "123456789#", "field": "TAX_ID"}, fields
+
+    await invoker.close()
+    return sum(full) / len(full), sum(streamed) / len(streamed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--trailing-tokens", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    full, streamed = asyncio.run(measure(args))
+    print(f"full body  avg time-to-first-action: {full * 1000:8.1f} ms")
+    print(f"streamed   avg time-to-first-action: {streamed * 1000:8.1f} ms")
+    print(f"saved per prompt:                    {(full - streamed) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
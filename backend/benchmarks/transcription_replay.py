@@ -0,0 +1,144 @@
+"""
+Replay recorded (or synthetic) 8 kHz call audio through TranscriptionSession
+against a stand-in transcribe-streaming client, several calls at once, and
+report audio-to-text latency for partial and final results plus memory per
+call. The stand-in emits a partial every --partial-ms of audio and finalizes
+each --utterance-ms, after a --processing-ms delay. Run from the backend directory:
+
+    python benchmarks/transcription_replay.py --calls 20 --seconds 20
+    python benchmarks/transcription_replay.py --wav recording.wav
+"""
+import argparse
+import asyncio
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import percentile_ms
+from transcription import TranscriptionSession, file_source, TRANSCRIBE_SAMPLE_RATE, BYTES_PER_SAMPLE
+
+
+def write_tone(path, seconds):
+    with wave.open(path, "wb") as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(BYTES_PER_SAMPLE)
+        audio.setframerate(TRANSCRIBE_SAMPLE_RATE)
+        samples = (int(8000 * math.sin(2 * math.pi * 440 * i / TRANSCRIBE_SAMPLE_RATE))
+                   for i in range(int(seconds * TRANSCRIBE_SAMPLE_RATE)))
+        audio.writeframes(b"".join(struct.pack("<h", sample) for sample in samples))
+
+
+def result(result_id, start_ms, end_ms, partial):
+    words = " ".join(["word"] * max(1, int((end_ms - start_ms) / 400)))
+    return SimpleNamespace(
+        result_id=result_id, start_time=start_ms / 1000, end_time=end_ms / 1000, is_partial=partial,
+        alternatives=[SimpleNamespace(transcript=f"{words} at {end_ms / 1000:.1f}")], channel_id="ch_0")
+
+
+class StandInStream:
+    def __init__(self, partial_ms, utterance_ms, processing_ms):
+        self.partial_ms = partial_ms
+        self.utterance_ms = utterance_ms
+        self.processing = processing_ms / 1000
+        self.received_ms = 0.0
+        self.utterance_start = 0.0
+        self.last_partial = 0.0
+        self.utterances = 0
+        self.events = asyncio.Queue()
+        self.input_stream = SimpleNamespace(send_audio_event=self.send_audio_event, end_stream=self.end_stream)
+        self.output_stream = self._output()
+
+    def _emit(self, partial):
+        item = result(f"utt-{self.utterances}", self.utterance_start, self.received_ms, partial)
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.processing, self.events.put_nowait, SimpleNamespace(transcript=SimpleNamespace(results=[item])))
+
+    async def send_audio_event(self, audio_chunk):
+        self.received_ms += len(audio_chunk) / (TRANSCRIBE_SAMPLE_RATE * BYTES_PER_SAMPLE) * 1000
+        if self.received_ms - self.utterance_start >= self.utterance_ms:
+            self._emit(partial=False)
+            self.utterances += 1
+            self.utterance_start = self.last_partial = self.received_ms
+        elif self.received_ms - self.last_partial >= self.partial_ms:
+            self._emit(partial=True)
+            self.last_partial = self.received_ms
+
+    async def end_stream(self):
+        if self.received_ms > self.utterance_start:
+            self._emit(partial=False)
+        asyncio.get_running_loop().call_later(self.processing * 2, self.events.put_nowait, None)
+
+    async def _output(self):
+        while True:
+            event = await self.events.get()
+            if event is None:
+                return
+            yield event
+
+
+class StandInTranscribe:
+    def __init__(self, args):
+        self.args = args
+
+    async def start_stream_transcription(self, **kwargs):
+        return StandInStream(self.args.partial_ms, self.args.utterance_ms, self.args.processing_ms)
+
+
+async def replay(path, args):
+    client = StandInTranscribe(args)
+    finals = []
+
+    async def on_final(segment):
+        finals.append(segment)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [TranscriptionSession(f"call-{i}", file_source(path), client=client, on_final=on_final)
+                for i in range(args.calls)]
+    started = time.monotonic()
+    await asyncio.gather(*(session.run() for session in sessions))
+    elapsed = time.monotonic() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sessions, finals, elapsed, (retained - before) / args.calls, (peak - before) / args.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--wav", default=None, help="8 kHz 16-bit mono recording to replay")
+    parser.add_argument("--partial-ms", type=float, default=300)
+    parser.add_argument("--utterance-ms", type=float, default=3000)
+    parser.add_argument("--processing-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.wav or os.path.join(directory, "call.wav")
+        if args.wav is None:
+            write_tone(path, args.seconds)
+        sessions, finals, elapsed, retained, peak = asyncio.run(replay(path, args))
+
+    partial = [latency for session in sessions for latency in session.latencies["partial"]]
+    final = [latency for session in sessions for latency in session.latencies["final"]]
+    audio = sum(session.audio_ms for session in sessions) / 1000
+    print(f"{args.calls} calls, {audio:.0f} s of audio replayed in {elapsed:.1f} s, {len(finals)} final segments")
+    print(f"{'result':<10}{'count':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, latencies in (("partial", partial), ("final", final)):
+        print(f"{name:<10}{len(latencies):>8}{percentile_ms(latencies, 0.5, default=0.0):>9.1f}"
+              f"{percentile_ms(latencies, 0.95, default=0.0):>9.1f}")
+    print(f"memory per call: {retained / 1024:.1f} KiB retained, {peak / 1024:.1f} KiB peak "
+          f"(includes the replayed audio buffer)")
+    print(f"queue waits: {sum(session.queue_waits for session in sessions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Decisions made per IVR menu, and how often the first answer was given on half a
+menu, when Contact Lens segments are decided one by one against when they go
+through UtteranceCoalescer first.
+
+Each stand-in menu is spoken sentence by sentence with short pauses; Contact Lens
+splits it at random sentence boundaries and each segment becomes visible at the
+first --poll-ms poll after its audio ends plus --lag-ms. Runs on a simulated
+clock, so it finishes instantly. Run from the backend directory:
+
+    python benchmarks/utterance_coalescing.py --calls 200 --poll-ms 1000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescing import UtteranceCoalescer, CoalescingMetrics
+
+MENUS = [
+    ["Thank you for calling provider services.", "If you are a member press 1.", "If you are a provider press 2."],
+    ["For pharmacy press 1.", "For eligibility press 2.", "For claims press 3.", "For all other questions press 4."],
+    ["Please enter the provider's 10 digit NPI number", "followed by the pound sign."],
+    ["To check the status of a claim press 1.", "To submit a new claim press 2."],
+    ["Para español oprima el 9.", "For English please stay on the line."],
+    ["Your call may be monitored or recorded.", "Please listen carefully as our menu options have changed.",
+     "For claims press 5."],
+]
+WORD_MS = 330
+
+
+def answer(text):
+    """Stand-in decision for a provider calling about claims."""
+    text = text.lower()
+    for sentence in re.split(r"(?<=\.)\s+", text):
+        if re.search(r"\b(claims?|provider)\b", sentence) and "member" not in sentence and "submit" not in sentence:
+            digit = re.search(r"press (\d)", sentence)
+            if digit:
+                return digit.group(1)
+    if "npi" in text and "pound" in text:
+        return "1447914288#"
+    if "npi" in text:
+        return "1447914288"
+    return "No matching data found"
+
+
+def call_segments(rng, args):
+    """(menu index, segment) for every Contact Lens segment of one call, in audio order."""
+    offset = 0
+    segments = []
+    for index, menu in enumerate(rng.sample(range(len(MENUS)), 4)):
+        sentences = MENUS[menu]
+        fragment = []
+        for position, sentence in enumerate(sentences):
+            fragment.append((sentence, offset))
+            offset += len(sentence.split()) * WORD_MS
+            last = position == len(sentences) - 1
+            if last or rng.random() < args.split:
+                content = " ".join(text for text, _ in fragment)
+                segments.append((menu, {"content": content, "offset": fragment[0][1], "end_offset": offset,
+                                        "participant": "CUSTOMER"}))
+                fragment = []
+            offset += rng.randint(250, 900)
+        # The answer we send, then the IVR's next prompt after a pause
+        offset += args.menu_gap_ms
+    return segments
+
+
+def simulate(args, coalescer_args):
+    rng = random.Random(args.seed)
+    metrics = CoalescingMetrics()
+    decisions = half_menu = wrong = missed = menus_seen = 0
+    for call in range(args.calls):
+        segments = call_segments(rng, args)
+        coalescer = UtteranceCoalescer(f"call-{call}", metrics, **coalescer_args) if coalescer_args is not None else None
+        menus_answered = set()
+        menus_seen += len({menu for menu, _ in segments})
+        full_text = {}
+        for menu, segment in segments:
+            full_text.setdefault(menu, []).append(segment["content"])
+
+        def decide(text, menu):
+            nonlocal decisions, half_menu, wrong
+            decisions += 1
+            if menu in menus_answered:
+                return
+            # The first answer is the one the IVR acts on
+            menus_answered.add(menu)
+            if text != " ".join(full_text[menu]):
+                half_menu += 1
+            if answer(text) != answer(" ".join(full_text[menu])):
+                wrong += 1
+
+        menu_of = {segment["content"]: menu for menu, segment in segments}
+        visible = [((segment["end_offset"] + args.lag_ms) // args.poll_ms + 1) * args.poll_ms for _, segment in segments]
+        now = 0
+        index = 0
+        while index < len(segments) or (coalescer is not None and coalescer.pending is not None):
+            utterances = []
+            while index < len(segments) and visible[index] <= now:
+                menu, segment = segments[index]
+                index += 1
+                if coalescer is None:
+                    decide(segment["content"], menu)
+                else:
+                    utterances += coalescer.add(segment, now / 1000)
+            if coalescer is not None:
+                utterances += coalescer.due(now / 1000)
+            for utterance in utterances:
+                decide(utterance.text, menu_of[utterance.fragments[0]])
+            now += 10
+        # A menu merged into the one before it never got an answer of its own
+        missed += len(full_text) - len(menus_answered)
+    return decisions, half_menu, wrong + missed, menus_seen, metrics.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--split", type=float, default=0.5, help="chance Contact Lens ends a segment at a sentence")
+    parser.add_argument("--poll-ms", type=int, default=1000)
+    parser.add_argument("--lag-ms", type=int, default=800, help="Contact Lens delay after the audio ends")
+    parser.add_argument("--menu-gap-ms", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'strategy':<28}{'decisions':>10}{'per menu':>10}{'half menu':>11}{'wrong':>8}{'wait mean':>11}{'wait max':>10}")
+    strategies = [("per segment", None)] + [
+        (f"coalesce silence {silence} ms", {"silence_ms": silence, "max_gap_ms": 1200, "max_wait_ms": 10000})
+        for silence in (1500, 3000, 4500)
+    ]
+    for name, coalescer_args in strategies:
+        decisions, half_menu, wrong, menus, stats = simulate(args, coalescer_args)
+        waits = [counts["added_wait_ms_max"] for counts in stats["contacts"].values()]
+        print(f"{name:<28}{decisions:>10}{decisions / menus:>10.2f}{half_menu / menus * 100:>10.1f}%"
+              f"{wrong / menus * 100:>7.1f}%{stats['added_wait_ms_mean']:>11.0f}{max(waits, default=0):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Load test for /trigger-voice fan-out: the old sequential send loop against
+BroadcastHub, with a few hundred stand-in websocket clients of which a handful
+are slow and a few are dead. Reports how long each trigger blocks the caller
+and how long healthy clients wait for their message. Run from the backend directory:
+
+    python benchmarks/voice_broadcast.py --clients 300 --slow 5 --dead 3 --messages 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broadcast import BroadcastHub
+from metrics import percentile_ms
+
+
+class StandInSocket:
+    def __init__(self, send_delay, dead=False):
+        self.send_delay = send_delay
+        self.dead = dead
+        self.latencies = []
+        self.closed = False
+
+    async def send_text(self, message):
+        if self.dead:
+            raise ConnectionResetError("client went away")
+        await asyncio.sleep(self.send_delay)
+        self.latencies.append(time.perf_counter() - float(message))
+
+    async def close(self):
+        self.closed = True
+
+
+def make_clients(count, slow, dead, slow_delay):
+    return ([StandInSocket(0.001) for _ in range(count - slow - dead)]
+            + [StandInSocket(slow_delay) for _ in range(slow)]
+            + [StandInSocket(0, dead=True) for _ in range(dead)])
+
+
+async def run_sequential(sockets, messages, interval):
+    """The original trigger_voice loop (with the set copied so removal doesn't raise)."""
+    clients = set(sockets)
+    blocked = []
+    for _ in range(messages):
+        started = time.perf_counter()
+        for client in list(clients):
+            try:
+                await client.send_text(str(started))
+            except Exception:
+                clients.discard(client)
+        blocked.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return blocked
+
+
+async def run_hub(sockets, messages, interval, policy):
+    hub = BroadcastHub(queue_size=8, policy=policy, send_timeout=5)
+    clients = [hub.connect(socket) for socket in sockets]
+    blocked = []
+    for _ in range(messages):
+        started = time.perf_counter()
+        hub.broadcast(str(time.perf_counter()))
+        blocked.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    # Let healthy clients drain before measuring
+    await asyncio.sleep(0.5)
+    stats = hub.stats()
+    await asyncio.gather(*(hub.disconnect(client) for client in clients))
+    return blocked, stats
+
+
+def report(name, blocked, sockets, expected):
+    healthy = [socket for socket in sockets if socket.send_delay < 0.01 and not socket.dead]
+    latencies = [latency for socket in healthy for latency in socket.latencies]
+    delivered = sum(len(socket.latencies) for socket in healthy)
+    print(f"{name:<22}{percentile_ms(blocked, 0.5, default=0.0):>12.2f}{max(blocked) * 1000:>12.2f}"
+          f"{percentile_ms(latencies, 0.5, default=0.0):>12.2f}"
+          f"{percentile_ms(latencies, 0.95, default=0.0):>12.2f}"
+          f"{delivered / max(expected, 1) * 100:>11.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--slow", type=int, default=5)
+    parser.add_argument("--dead", type=int, default=3)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    healthy = args.clients - args.slow - args.dead
+    print(f"{args.clients} clients ({args.slow} slow at {args.slow_delay}s/send, {args.dead} dead), {args.messages} broadcasts")
+    print(f"{'strategy':<22}{'block p50':>12}{'block max':>12}{'deliver p50':>12}{'deliver p95':>12}{'delivered':>12}")
+    print(f"{'':<22}{'ms':>12}{'ms':>12}{'ms':>12}{'ms':>12}")
+
+    sockets = make_clients(args.clients, args.slow, args.dead, args.slow_delay)
+    blocked = asyncio.run(run_sequential(sockets, args.messages, args.interval))
+    report("sequential", blocked, sockets, healthy * args.messages)
+
+    for policy in ("drop_oldest", "disconnect"):
+        sockets = make_clients(args.clients, args.slow, args.dead, args.slow_delay)
+        blocked, stats = asyncio.run(run_hub(sockets, args.messages, args.interval, policy))
+        report(f"hub ({policy})", blocked, sockets, healthy * args.messages)
+        print(f"{'':<22}dropped {stats['dropped']}, closed {stats['closed']}")
+
+
+if __name__ == "__main__":
+    main()
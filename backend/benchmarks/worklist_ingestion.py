@@ -0,0 +1,115 @@
+"""
+Memory and throughput of server-side worklist ingestion on a large file.
+
+Writes a synthetic worklist (CSV, plus .xlsx when openpyxl is installed),
+streams it through parse_worklist and compares the stored size with keeping
+every row as a dict, which is what the browser holds and re-sends with each
+/initiate-call. Run from the backend directory:
+
+    python benchmarks/worklist_ingestion.py --rows 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklists import parse_worklist
+
+COLUMNS = ["Patient Name", "DOB", "Member ID", "Payer Name", "Payer Phone", "NPI", "Tax ID",
+           "Claim Number", "Date of Service", "Billed Amount", "Plan Type", "Provider Name"]
+PAYERS = ["Aetna", "Cigna", "UnitedHealthcare", "Humana", "Blue Cross Blue Shield", "Anthem", "Kaiser"]
+PLANS = ["PPO", "HMO", "EPO", "POS", "Medicare Advantage"]
+
+
+def synthetic_rows(count, seed=7):
+    rng = random.Random(seed)
+    for index in range(count):
+        phone = f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+        if index % 500 == 0:
+            phone = "N/A"
+        yield [
+            f"Patient {index}", f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(1940, 2015)}",
+            f"M{rng.randint(10 ** 8, 10 ** 9 - 1)}", rng.choice(PAYERS), phone,
+            str(rng.randint(10 ** 9, 10 ** 10 - 1)), str(rng.randint(10 ** 8, 10 ** 9 - 1)),
+            f"CLM{index:08d}", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            f"{rng.uniform(50, 5000):.2f}", rng.choice(PLANS), f"Clinic {rng.randint(1, 40)}",
+        ]
+
+
+def write_csv(path, count):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(synthetic_rows(count))
+
+
+def write_xlsx(path, count):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNS)
+    for row in synthetic_rows(count):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def measure(label, load):
+    started = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - started
+    # Memory is measured on a second run; tracemalloc slows the parse down too much to time it
+    tracemalloc.start()
+    result = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return label, result, elapsed, retained, peak
+
+
+def load_as_dicts(path):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        return list(csv.DictReader(file))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = [("csv", os.path.join(directory, "worklist.csv"), write_csv)]
+        try:
+            import openpyxl  # noqa: F401
+            files.append(("xlsx", os.path.join(directory, "worklist.xlsx"), write_xlsx))
+        except ImportError:
+            print("openpyxl not installed, skipping .xlsx")
+
+        print(f"{'loader':<16}{'file MB':>9}{'rows':>9}{'rejected':>10}{'rows/s':>10}{'retained MB':>13}{'peak MB':>9}")
+        for kind, path, write in files:
+            write(path, args.rows)
+            size = os.path.getsize(path) / 1e6
+            runs = [measure(f"stream {kind}", lambda: parse_worklist(open(path, "rb"), path))]
+            if kind == "csv":
+                runs.append(measure("dict per row", lambda: load_as_dicts(path)))
+            for label, result, elapsed, retained, peak in runs:
+                rows = len(result.rows) if hasattr(result, "rows") else len(result)
+                rejected = getattr(result, "rejected", 0)
+                print(f"{label:<16}{size:>9.1f}{rows:>9}{rejected:>10}{rows / elapsed:>10.0f}"
+                      f"{retained / 1e6:>13.1f}{peak / 1e6:>9.1f}")
+
+        worklist = parse_worklist(open(files[0][1], "rb"), files[0][1])
+        row = worklist.get(0)
+        inline = json.dumps({"phoneNumber": worklist.phones[0], "rowData": row, "selectedOption": "Claims"})
+        by_id = json.dumps({"rowId": worklist.row_id(0), "selectedOption": "Claims"})
+        print(f"/initiate-call body: {len(inline)} bytes with rowData, {len(by_id)} bytes with rowId")
+
+
+if __name__ == "__main__":
+    main()
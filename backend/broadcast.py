@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Messages waiting per client before the slow-consumer policy kicks in
+VOICE_QUEUE_SIZE = int(os.getenv("VOICE_QUEUE_SIZE", "32"))
+# "drop_oldest" skips the stalest queued message; "disconnect" closes the client
+VOICE_SLOW_CONSUMER_POLICY = os.getenv("VOICE_SLOW_CONSUMER_POLICY", "drop_oldest")
+# A single send taking longer than this means the client is gone
+VOICE_SEND_TIMEOUT = float(os.getenv("VOICE_SEND_TIMEOUT", "5"))
+# Clients that opt in with ?heartbeat=1 get a ping this often and must answer within the timeout
+VOICE_HEARTBEAT_INTERVAL = float(os.getenv("VOICE_HEARTBEAT_INTERVAL", "15"))
+VOICE_HEARTBEAT_TIMEOUT = float(os.getenv("VOICE_HEARTBEAT_TIMEOUT", "45"))
+
+HEARTBEAT_MESSAGE = json.dumps({"type": "ping"})
+
+
+class HubClient:
+    def __init__(self, websocket, queue_size: int, heartbeat: bool):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(queue_size)
+        self.heartbeat = heartbeat
+        self.last_seen = time.monotonic()
+        self.sent = 0
+        self.dropped = 0
+        self.writer = None
+        self.close_reason = None
+
+
+class BroadcastHub:
+    """
+    Fan-out to websocket clients without letting one slow socket hold up the rest.
+    Each client has a bounded queue drained by its own writer task; broadcast()
+    only enqueues and returns.
+    """
+
+    def __init__(self, queue_size: int = None, policy: str = None, send_timeout: float = None,
+                 heartbeat_interval: float = None, heartbeat_timeout: float = None):
+        self.queue_size = queue_size or VOICE_QUEUE_SIZE
+        self.policy = policy or VOICE_SLOW_CONSUMER_POLICY
+        self.send_timeout = send_timeout or VOICE_SEND_TIMEOUT
+        self.heartbeat_interval = heartbeat_interval or VOICE_HEARTBEAT_INTERVAL
+        self.heartbeat_timeout = heartbeat_timeout or VOICE_HEARTBEAT_TIMEOUT
+        self.clients = set()
+        self._heartbeat_task = None
+        self.broadcasts = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.closed = {"slow": 0, "send_error": 0, "heartbeat": 0}
+
+    def connect(self, websocket, heartbeat: bool = False) -> HubClient:
+        client = HubClient(websocket, self.queue_size, heartbeat)
+        client.writer = asyncio.create_task(self._write(client))
+        self.clients.add(client)
+        if heartbeat and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return client
+
+    def seen(self, client: HubClient):
+        client.last_seen = time.monotonic()
+
+    def _drop(self, client: HubClient, reason: str):
+        """Stop sending to a client; its writer task closes the socket."""
+        if client not in self.clients:
+            return
+        self.clients.discard(client)
+        client.close_reason = reason
+        self.closed[reason] += 1
+        client.writer.cancel()
+
+    async def disconnect(self, client: HubClient):
+        self.clients.discard(client)
+        if not client.writer.done():
+            client.writer.cancel()
+        await asyncio.gather(client.writer, return_exceptions=True)
+
+    def broadcast(self, message: str) -> int:
+        """Queue a message for every client; returns how many clients it was queued for."""
+        self.broadcasts += 1
+        queued = 0
+        for client in list(self.clients):
+            if self._enqueue(client, message):
+                queued += 1
+        return queued
+
+    def _enqueue(self, client: HubClient, message: str) -> bool:
+        if client.queue.full():
+            if self.policy == "disconnect":
+                print(f"Closing slow voice client after {client.queue.qsize()} queued messages")
+                self._drop(client, "slow")
+                return False
+            client.queue.get_nowait()
+            client.dropped += 1
+            self.dropped += 1
+        client.queue.put_nowait(message)
+        self.enqueued += 1
+        return True
+
+    async def _write(self, client: HubClient):
+        try:
+            while True:
+                message = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+                client.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending to voice client: {e}")
+            self.clients.discard(client)
+            client.close_reason = "send_error"
+            self.closed["send_error"] += 1
+        finally:
+            if client.close_reason is not None:
+                try:
+                    await asyncio.wait_for(client.websocket.close(), self.send_timeout)
+                except Exception:
+                    pass
+
+    async def _heartbeat(self):
+        while any(client.heartbeat for client in self.clients):
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            for client in list(self.clients):
+                if not client.heartbeat:
+                    continue
+                if now - client.last_seen > self.heartbeat_timeout:
+                    print("Closing voice client that stopped answering heartbeats")
+                    self._drop(client, "heartbeat")
+                elif not client.queue.full():
+                    client.queue.put_nowait(HEARTBEAT_MESSAGE)
+
+    async def close(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        clients = list(self.clients)
+        await asyncio.gather(*(self.disconnect(client) for client in clients), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "queued_now": sum(client.queue.qsize() for client in self.clients),
+            "broadcasts": self.broadcasts,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "closed": dict(self.closed),
+        }
+
+
+voice_hub = BroadcastHub()
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict
+from dotenv import load_dotenv
+from contact_events import ContactNotifier
+from state_store import ContactStore
+from worklists import row_phone
+
+load_dotenv()
+
+CAMPAIGN_CONCURRENCY = int(os.getenv("CAMPAIGN_CONCURRENCY", "5"))
+CAMPAIGN_MAX_ATTEMPTS = int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", "3"))
+# First retry waits this long, doubling on every further attempt
+CAMPAIGN_RETRY_BASE_SECONDS = float(os.getenv("CAMPAIGN_RETRY_BASE_SECONDS", "30"))
+# Minimum gap between two dials of the same campaign, on top of connect_scheduler's budget
+CAMPAIGN_DIAL_INTERVAL = float(os.getenv("CAMPAIGN_DIAL_INTERVAL", "1"))
+# How long a completed or cancelled campaign's progress stays readable before it is dropped
+CAMPAIGN_TTL_SECONDS = float(os.getenv("CAMPAIGN_TTL_SECONDS", str(24 * 3600)))
+
+# Disconnect reasons that mean nobody picked up or the line was busy
+RETRYABLE_DISCONNECT_REASONS = {
+    "OUTBOUND_DESTINATION_ENDPOINT_ERROR",
+    "OUTBOUND_RESOURCE_ERROR",
+    "OUTBOUND_ATTEMPT_FAILED",
+    "TELECOM_PROBLEM",
+}
+
+FINISHED_ROW_STATES = {"completed", "failed", "skipped", "cancelled"}
+
+
+class CampaignRow:
+    def __init__(self, index: int, row_data: dict, phone: str, row_id: str = None):
+        self.index = index
+        self.row_data = row_data
+        self.row_id = row_id
+        self.phone = phone
+        self.status = "pending" if phone else "skipped"
+        self.attempts = 0
+        self.contact_id = None
+        self.contact_ids = []
+        self.outcome = None if phone else "INVALID_PHONE"
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "row_id": self.row_id,
+            "phone": self.phone,
+            "status": self.status,
+            "attempts": self.attempts,
+            "contact_id": self.contact_id,
+            "contact_ids": self.contact_ids,
+            "outcome": self.outcome,
+            "error": self.error,
+        }
+
+
+class Campaign:
+    """
+    A batch of worklist rows dialed server-side with bounded concurrency and retries.
+    With a `row_source` (worklists.WorklistStore) `rows` are row IDs and each row's
+    data is only looked up when it is dialed.
+    """
+
+    def __init__(self, rows: list, selected_option: str, concurrency: int = None,
+                 max_attempts: int = None, phone_column: str = None, row_source=None):
+        self.id = str(uuid.uuid4())
+        self.selected_option = selected_option
+        self.concurrency = max(1, concurrency or CAMPAIGN_CONCURRENCY)
+        self.max_attempts = max(1, max_attempts or CAMPAIGN_MAX_ATTEMPTS)
+        self.row_source = row_source
+        if row_source is None:
+            self.rows = [CampaignRow(index, row, row_phone(row, phone_column)) for index, row in enumerate(rows)]
+        else:
+            self.rows = [CampaignRow(index, None, row_source.phone(row_id), row_id) for index, row_id in enumerate(rows)]
+        self.status = "created"
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self.notifier = ContactNotifier()
+        self._remaining = 0
+        self._done = asyncio.Event()
+        self._last_dial = 0.0
+        self._pace_lock = asyncio.Lock()
+        self._retry_tasks = set()
+        self._dials = set()
+
+    def _changed(self):
+        self.notifier.notify()
+
+    def progress(self, include_rows: bool = False) -> dict:
+        counts = {}
+        for row in self.rows:
+            counts[row.status] = counts.get(row.status, 0) + 1
+        progress = {
+            "campaign_id": self.id,
+            "status": self.status,
+            "selected_option": self.selected_option,
+            "concurrency": self.concurrency,
+            "total": len(self.rows),
+            "finished": sum(1 for row in self.rows if row.status in FINISHED_ROW_STATES),
+            "counts": counts,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_rows:
+            progress["rows"] = [row.to_dict() for row in self.rows]
+        return progress
+
+    async def run(self, dial, wait_for_outcome):
+        """
+        Dial every pending row. `dial(phone, row_data, selected_option)` returns a
+        contact ID; `wait_for_outcome(contact_id)` returns (ContactStatus, DisconnectReason).
+        """
+        queue = asyncio.Queue()
+        for row in self.rows:
+            if row.status == "pending":
+                queue.put_nowait(row)
+        self._remaining = queue.qsize()
+        self.status = "running"
+        self._changed()
+
+        workers = []
+        if self._remaining:
+            workers = [asyncio.create_task(self._worker(queue, dial, wait_for_outcome)) for _ in range(self.concurrency)]
+            await self._done.wait()
+        # A dial cut off mid-request could still place the call, so let those finish and record their contact.
+        # wait() rather than gather(), so cancelling run() doesn't cut them off either
+        if self._dials:
+            await asyncio.wait(list(self._dials))
+        for task in workers + list(self._retry_tasks):
+            task.cancel()
+        await asyncio.gather(*workers, *self._retry_tasks, return_exceptions=True)
+
+        if self.status == "running":
+            self.status = "completed"
+        self.finished_at = datetime.now()
+        self._changed()
+
+    def cancel(self):
+        """Stop dialing. Calls already placed carry on, but their rows are settled as cancelled too."""
+        for row in self.rows:
+            if row.status not in FINISHED_ROW_STATES:
+                row.status = "cancelled"
+        self.status = "cancelled"
+        self._done.set()
+        self._changed()
+
+    async def _pace(self):
+        async with self._pace_lock:
+            wait = self._last_dial + CAMPAIGN_DIAL_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_dial = time.monotonic()
+
+    def _finish_row(self, row: CampaignRow, status: str):
+        row.status = status
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._done.set()
+        self._changed()
+
+    async def _retry_later(self, queue, row: CampaignRow, delay: float):
+        await asyncio.sleep(delay)
+        if row.status == "retry_wait":
+            row.status = "pending"
+            queue.put_nowait(row)
+            self._changed()
+
+    async def _dial(self, row: CampaignRow, dial) -> str:
+        row_data = row.row_data if row.row_id is None else self.row_source.get(row.row_id)
+        contact_id = await dial(row.phone, row_data, self.selected_option)
+        row.contact_id = contact_id
+        row.contact_ids.append(contact_id)
+        return contact_id
+
+    async def _worker(self, queue, dial, wait_for_outcome):
+        while True:
+            row = await queue.get()
+            if row.status != "pending":
+                continue
+            await self._pace()
+            row.attempts += 1
+            row.status = "dialing"
+            row.error = None
+            self._changed()
+
+            dialing = asyncio.create_task(self._dial(row, dial))
+            self._dials.add(dialing)
+            dialing.add_done_callback(self._dials.discard)
+            try:
+                contact_id = await asyncio.shield(dialing)
+            except Exception as e:
+                row.outcome = "DIAL_ERROR"
+                row.error = str(e)
+                retry = True
+            else:
+                if row.status != "cancelled":
+                    row.status = "in_progress"
+                    self._changed()
+                    status, reason = await wait_for_outcome(contact_id)
+                    row.outcome = reason or status
+                    # contact_status() reports every ended call as COMPLETED; only the disconnect reason says why
+                    retry = reason in RETRYABLE_DISCONNECT_REASONS
+
+            # cancel() already settled the row while it was on a call
+            if row.status == "cancelled":
+                self._changed()
+                continue
+
+            if not retry:
+                self._finish_row(row, "completed")
+            elif row.attempts >= self.max_attempts:
+                self._finish_row(row, "failed")
+            else:
+                row.status = "retry_wait"
+                delay = CAMPAIGN_RETRY_BASE_SECONDS * 2 ** (row.attempts - 1)
+                task = asyncio.create_task(self._retry_later(queue, row, delay))
+                self._retry_tasks.add(task)
+                task.add_done_callback(self._retry_tasks.discard)
+                self._changed()
+
+
+# Running campaigns never go idle-expired; finish() starts the TTL once run() returns
+campaigns = ContactStore("campaigns", ttl_seconds=CAMPAIGN_TTL_SECONDS, max_idle_seconds=float("inf"))
+campaign_tasks: Dict[str, asyncio.Task] = {}
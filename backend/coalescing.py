@@ -0,0 +1,146 @@
+import os
+import time
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+# Fragments whose audio is at most this far apart (end of one to start of the next) are one utterance
+COALESCE_MAX_GAP_MS = int(os.getenv("COALESCE_MAX_GAP_MS", "1200"))
+# An utterance is handed on once no fragment has arrived for this long. Contact Lens only delivers a
+# segment after its audio ends, so this has to cover about one spoken sentence plus a poll
+COALESCE_SILENCE_MS = int(os.getenv("COALESCE_SILENCE_MS", "3000"))
+# Longest an utterance is held after its first fragment, however it keeps growing
+COALESCE_MAX_WAIT_MS = int(os.getenv("COALESCE_MAX_WAIT_MS", "8000"))
+
+# Speech time assumed per word for segments that arrive without an end offset
+WORD_MS = 350
+
+
+def segment_end(segment: dict) -> int:
+    if segment.get('end_offset') is not None:
+        return segment['end_offset']
+    return segment['offset'] + len(segment['content'].split()) * WORD_MS
+
+
+class Utterance:
+    def __init__(self, segment: dict, now: float):
+        self.fragments = [segment['content']]
+        self.offset = segment['offset']
+        self.end_offset = segment_end(segment)
+        self.first_at = now
+        self.last_at = now
+
+    def extend(self, segment: dict, now: float):
+        self.fragments.append(segment['content'])
+        self.end_offset = max(self.end_offset, segment_end(segment))
+        self.last_at = now
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.fragments)
+
+
+class CoalescingMetrics:
+    """Fragments in, utterances out and the wait that cost, per contact and overall."""
+
+    def __init__(self):
+        self.contacts: Dict[str, dict] = {}
+
+    def record(self, contact_id: str, utterance: Utterance, now: float):
+        counts = self.contacts.setdefault(contact_id, {
+            "fragments": 0, "utterances": 0, "decisions_saved": 0, "added_wait_ms_total": 0.0, "added_wait_ms_max": 0.0,
+        })
+        # Only the time after the last fragment is added; the rest was spent waiting for the IVR to finish talking
+        wait_ms = (now - utterance.last_at) * 1000
+        counts["fragments"] += len(utterance.fragments)
+        counts["utterances"] += 1
+        counts["decisions_saved"] += len(utterance.fragments) - 1
+        counts["added_wait_ms_total"] += wait_ms
+        counts["added_wait_ms_max"] = max(counts["added_wait_ms_max"], wait_ms)
+
+    def forget(self, contact_id: str):
+        self.contacts.pop(contact_id, None)
+
+    def stats(self) -> dict:
+        fragments = sum(counts["fragments"] for counts in self.contacts.values())
+        utterances = sum(counts["utterances"] for counts in self.contacts.values())
+        wait_total = sum(counts["added_wait_ms_total"] for counts in self.contacts.values())
+        return {
+            "enabled": COALESCE_ENABLED,
+            "max_gap_ms": COALESCE_MAX_GAP_MS,
+            "silence_ms": COALESCE_SILENCE_MS,
+            "max_wait_ms": COALESCE_MAX_WAIT_MS,
+            "fragments": fragments,
+            "utterances": utterances,
+            "decisions_saved": fragments - utterances,
+            "added_wait_ms_mean": wait_total / utterances if utterances else 0.0,
+            "contacts": {
+                contact_id: {
+                    "fragments": counts["fragments"],
+                    "utterances": counts["utterances"],
+                    "decisions_saved": counts["decisions_saved"],
+                    "added_wait_ms_mean": counts["added_wait_ms_total"] / counts["utterances"],
+                    "added_wait_ms_max": counts["added_wait_ms_max"],
+                }
+                for contact_id, counts in self.contacts.items()
+            },
+        }
+
+
+class UtteranceCoalescer:
+    """
+    Merges one contact's adjacent CUSTOMER segments into the utterance they were
+    split from. A fragment joins the pending utterance when its audio follows on
+    within max_gap_ms; the utterance is handed on when a fragment doesn't, when
+    another participant speaks, or after silence_ms without a new fragment.
+    """
+
+    def __init__(self, contact_id: str, metrics: CoalescingMetrics = None, max_gap_ms: int = None,
+                 silence_ms: int = None, max_wait_ms: int = None):
+        self.contact_id = contact_id
+        self.metrics = metrics
+        self.max_gap_ms = COALESCE_MAX_GAP_MS if max_gap_ms is None else max_gap_ms
+        self.silence = (COALESCE_SILENCE_MS if silence_ms is None else silence_ms) / 1000
+        self.max_wait = (COALESCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self.pending = None
+
+    def add(self, segment: dict, now: float = None) -> list:
+        """Take a CUSTOMER segment; returns the utterances it completed."""
+        now = time.monotonic() if now is None else now
+        if self.pending is not None and segment['offset'] - self.pending.end_offset <= self.max_gap_ms:
+            self.pending.extend(segment, now)
+            return []
+        ready = self.flush(now)
+        self.pending = Utterance(segment, now)
+        return ready
+
+    def due(self, now: float = None) -> list:
+        """The pending utterance, if it has been quiet or held long enough."""
+        now = time.monotonic() if now is None else now
+        timeout = self.timeout(now)
+        if timeout is None or timeout > 0:
+            return []
+        return self.flush(now)
+
+    def timeout(self, now: float = None):
+        """Seconds until the pending utterance is due; None when nothing is pending."""
+        if self.pending is None:
+            return None
+        now = time.monotonic() if now is None else now
+        deadline = min(self.pending.last_at + self.silence, self.pending.first_at + self.max_wait)
+        return max(0.0, deadline - now)
+
+    def flush(self, now: float = None) -> list:
+        """Hand on whatever is pending, e.g. because another participant spoke."""
+        if self.pending is None:
+            return []
+        now = time.monotonic() if now is None else now
+        utterance, self.pending = self.pending, None
+        if self.metrics is not None:
+            self.metrics.record(self.contact_id, utterance, now)
+        return [utterance]
+
+
+coalescing_metrics = CoalescingMetrics()
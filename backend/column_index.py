@@ -0,0 +1,154 @@
+import json
+import os
+import re
+from typing import Dict
+from dotenv import load_dotenv
+from ivr_rules import COLUMN_SYNONYMS, normalize_column, normalize_ivr_text
+
+load_dotenv()
+
+# Send model tiers without prompt caching only the row_data columns an IVR prompt could be asking about
+ROW_PRUNING_ENABLED = os.getenv("ROW_PRUNING_ENABLED", "true").lower() == "true"
+# Rough prompt size estimate for the stats; Claude averages about this many characters per token on JSON
+CHARS_PER_TOKEN = 4
+
+# concept: (normalized column synonyms, what an IVR says when it asks for it)
+CONCEPTS = {
+    "npi": (COLUMN_SYNONYMS["npi"] + ["nationalprovider"], r"\bnpi\b|national provider"),
+    "tax_id": (COLUMN_SYNONYMS["tax_id"] + ["federaltax"], r"\b(tax|tin|ein)\b|employer identification"),
+    "dob": (COLUMN_SYNONYMS["dob"] + ["birthday"], r"\b(birth|born|dob|birthday)\b"),
+    "member_id": (["memberid", "membernumber", "subscriberid", "subscribernumber", "insuredid", "policynumber",
+                   "policyid", "medicaidid", "medicareid", "mbi", "cardnumber", "idnumber"],
+                  r"\b(member|subscriber|insured|policy|medicaid|medicare|identification|id)\b"),
+    "patient_id": (["patientid", "patientnumber", "patientaccount", "accountnumber", "mrn", "medicalrecord"],
+                   r"\b(patient|account|medical record|mrn)\b"),
+    "patient_name": (["patientname", "membername", "subscribername", "insuredname", "firstname", "lastname",
+                      "patientfirst", "patientlast"], r"\b(name|spell|first|last)\b"),
+    "provider_name": (["providername", "practicename", "facilityname", "billingprovider", "renderingprovider",
+                       "organization"], r"\b(provider|practice|facility|office|clinic|organization)\b"),
+    "claim_number": (["claimnumber", "claimid", "claimno", "icn", "dcn", "referencenumber"],
+                     r"\b(claim|reference number|icn)\b"),
+    "service_date": (["dateofservice", "dos", "servicedate", "fromdate", "admitdate", "admissiondate"],
+                     r"\b(date of service|service date|dates of service|admission|admit)\b"),
+    "billed_amount": (["billedamount", "chargeamount", "totalcharge", "charges", "billed", "amount"],
+                      r"\b(amount|billed|charges?|dollars?)\b"),
+    "payer_phone": (["payerphone", "payorphone", "insurancephone", "phone", "telephone", "callback", "contactnumber"],
+                    r"\b(phone|telephone|callback|call back)\b"),
+    "group_number": (["groupnumber", "groupid", "group"], r"\bgroup\b"),
+    "zip": (["zip", "zipcode", "postal", "postalcode"], r"\b(zip|postal)\b"),
+    "ssn": (["ssn", "socialsecurity"], r"\b(social security|ssn)\b"),
+}
+# "N digit" prompts shorter than this are date parts ("2 digits for the month"), not identifiers
+MIN_ID_DIGITS = 5
+# Column name words too common to say which column a prompt means
+GENERIC_WORDS = {"number", "num", "no", "id", "date", "code", "name", "the", "of", "and", "for", "type", "status",
+                 "total", "info", "information", "data", "value", "details", "your", "please", "enter"}
+
+_DIGIT_COUNT = re.compile(r"\b(\d+) digit")
+
+
+def _column_words(column: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", str(column).lower()))
+
+
+def _matches_synonym(column: str, synonym: str) -> bool:
+    # Short synonyms like "tin" or "dos" only count as a whole word, so "Destination" isn't a TIN
+    if len(synonym) >= 5:
+        return synonym in normalize_column(column)
+    return synonym == normalize_column(column) or synonym in _column_words(column)
+
+
+class ColumnIndex:
+    """
+    Which of a row's columns each kind of IVR question can refer to, built once
+    per call. candidates(ivr_text) returns the columns worth sending for one
+    prompt, or None when nothing matches and the whole row should go.
+    """
+
+    def __init__(self, row_data: dict):
+        self.columns = list(row_data)
+        self.concepts = {
+            concept: [column for column in self.columns if any(_matches_synonym(column, synonym) for synonym in synonyms)]
+            for concept, (synonyms, _) in CONCEPTS.items()
+        }
+        self.patterns = {concept: re.compile(pattern) for concept, (_, pattern) in CONCEPTS.items()}
+        # Distinctive words of every column, for columns no concept covers (e.g. "Authorization Number")
+        self.words = {
+            column: {word for word in _column_words(column) if len(word) >= 3 and word not in GENERIC_WORDS}
+            for column in self.columns
+        }
+        # Columns by how many digits their value has, for "enter your 10 digit ..." prompts
+        self.digit_lengths: Dict[int, list] = {}
+        for column, cell in row_data.items():
+            digits = re.sub(r"\D", "", str(cell))
+            if digits:
+                self.digit_lengths.setdefault(len(digits), []).append(column)
+
+    def candidates(self, ivr_text: str):
+        text = normalize_ivr_text(ivr_text)
+        words = set(re.findall(r"[a-z0-9]+", text))
+        matched = set()
+        for concept, pattern in self.patterns.items():
+            if self.concepts[concept] and pattern.search(text):
+                matched.update(self.concepts[concept])
+        for column, column_words in self.words.items():
+            if column_words & words:
+                matched.add(column)
+        for count in set(_DIGIT_COUNT.findall(text)):
+            if int(count) >= MIN_ID_DIGITS:
+                matched.update(self.digit_lengths.get(int(count), []))
+        if not matched:
+            return None
+        return [column for column in self.columns if column in matched]
+
+
+class ColumnIndexStore:
+    """Per-contact column indexes plus how much of the row they kept out of prompts."""
+
+    def __init__(self):
+        self.indexes: Dict[str, ColumnIndex] = {}
+        self.prompts = 0
+        self.pruned = 0
+        self.fallbacks = 0
+        self.full_chars = 0
+        self.sent_chars = 0
+
+    def build(self, contact_id: str, row_data: dict) -> ColumnIndex:
+        self.indexes[contact_id] = ColumnIndex(row_data)
+        return self.indexes[contact_id]
+
+    def prune(self, contact_id: str, row_data: dict, ivr_text: str):
+        """The part of row_data to send for ivr_text, or None to send all of it."""
+        if not ROW_PRUNING_ENABLED:
+            return None
+        # Built at dial time; a contact shared from another worker gets its index here
+        index = self.indexes.get(contact_id) or self.build(contact_id, row_data)
+        columns = index.candidates(ivr_text)
+        self.prompts += 1
+        full_chars = len(json.dumps(row_data))
+        self.full_chars += full_chars
+        if columns is None or len(columns) == len(row_data):
+            self.fallbacks += 1
+            self.sent_chars += full_chars
+            return None
+        pruned = {column: row_data[column] for column in columns}
+        self.pruned += 1
+        self.sent_chars += len(json.dumps(pruned))
+        return pruned
+
+    def forget(self, contact_id: str):
+        self.indexes.pop(contact_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ROW_PRUNING_ENABLED,
+            "indexes": len(self.indexes),
+            "prompts": self.prompts,
+            "pruned": self.pruned,
+            "fallbacks": self.fallbacks,
+            "row_tokens_sent_estimate": self.sent_chars // CHARS_PER_TOKEN,
+            "row_tokens_saved_estimate": (self.full_chars - self.sent_chars) // CHARS_PER_TOKEN,
+        }
+
+
+column_indexes = ColumnIndexStore()
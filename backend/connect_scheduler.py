@@ -0,0 +1,224 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lower runs first when several requests wait for the same budget
+PRIORITY_IVR_TRANSCRIPT = 0   # transcript fetch for a call in the middle of an IVR exchange
+PRIORITY_TRANSCRIPT = 1       # transcript fetch for a call on hold or talking to an agent
+PRIORITY_STATUS = 2           # describe_contact / get_contact_attributes polls
+PRIORITY_DIAL = 3             # start_outbound_voice_contact
+
+# Requests per second and burst per Connect API, shared by every call on this worker. Each API worker
+# process has its own buckets, so with N uvicorn workers the account sees up to N times these rates;
+# divide by the worker count when the budgets must hold per account.
+# Override with CONNECT_API_BUDGETS='{"describe_contact": [5, 10]}'.
+# APIs without a budget of their own share DEFAULT_BUDGET, like the account-wide "rate of API
+# requests" quota Connect applies to every API it doesn't list separately. CONNECT_API_GROUPS puts
+# APIs on one named budget, e.g. '{"describe_contact": "status", "get_contact_attributes": "status"}'
+# with CONNECT_API_BUDGETS='{"status": [5, 10]}'.
+DEFAULT_API_BUDGETS = {
+    "list_realtime_contact_analysis_segments": (5, 10),
+    "describe_contact": (5, 10),
+    "get_contact_attributes": (2, 5),
+    "start_outbound_voice_contact": (2, 5),
+    "list_contacts": (1, 2),
+    "search_contacts": (1, 2),
+}
+DEFAULT_BUDGET = (2, 5)
+DEFAULT_BUDGET_NAME = "default"
+
+THROTTLE_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "LimitExceededException"}
+# Attempts per call, retries included. The boto3 clients have their own retries turned off, so every
+# retry waits for a token like any other request instead of bypassing the budget
+CONNECT_MAX_ATTEMPTS = int(os.getenv("CONNECT_MAX_ATTEMPTS", "3"))
+# Backoff before retrying a 5xx; throttles wait for the drained bucket instead
+CONNECT_RETRY_BASE_SECONDS = float(os.getenv("CONNECT_RETRY_BASE_SECONDS", "0.2"))
+# Calls that may have taken effect when they fail with a 5xx, so only throttles are retried
+NON_IDEMPOTENT_APIS = {"start_outbound_voice_contact"}
+
+
+def load_api_budgets() -> dict:
+    budgets = dict(DEFAULT_API_BUDGETS)
+    override = os.getenv("CONNECT_API_BUDGETS")
+    if override:
+        budgets.update({api: tuple(budget) for api, budget in json.loads(override).items()})
+    return budgets
+
+
+def load_api_groups() -> dict:
+    override = os.getenv("CONNECT_API_GROUPS")
+    return json.loads(override) if override else {}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """Take a token and return 0, or return how long until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self):
+        """Back off after a throttle by giving up any saved-up burst."""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+class ConnectScheduler:
+    """
+    Process-wide token-bucket scheduler for Amazon Connect calls. Every API draws
+    on a budget: its own, a group's from `groups` (API -> budget name), or the
+    shared default one. Requests waiting on a budget are released in priority
+    order, then FIFO, whichever API they are for, so priorities only compete
+    between APIs that share a budget. The budgets are per worker process, not
+    per account.
+    """
+
+    def __init__(self, budgets=None, groups=None):
+        budgets = budgets or load_api_budgets()
+        self.groups = load_api_groups() if groups is None else groups
+        self.buckets: Dict[str, TokenBucket] = {name: TokenBucket(*budget) for name, budget in budgets.items()}
+        # Budget name -> heap of (priority, sequence, waiter, api)
+        self._queues: Dict[str, list] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._sequence = itertools.count()
+        self.granted: Dict[str, int] = {}
+        self.throttles: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.wait_seconds: Dict[str, float] = {}
+
+    def budget(self, api: str) -> str:
+        """The name of the budget `api` draws on."""
+        if api in self.groups:
+            return self.groups[api]
+        return api if api in self.buckets else DEFAULT_BUDGET_NAME
+
+    def _bucket(self, budget: str) -> TokenBucket:
+        if budget not in self.buckets:
+            self.buckets[budget] = TokenBucket(*DEFAULT_BUDGET)
+        return self.buckets[budget]
+
+    async def acquire(self, api: str, priority: int):
+        """Wait for a token for `api`; lower priority values are served first."""
+        started = time.monotonic()
+        budget = self.budget(api)
+        queue = self._queues.setdefault(budget, [])
+        if not queue and self._bucket(budget).try_take() == 0:
+            self._granted(api, started)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue, (priority, next(self._sequence), waiter, api))
+        dispatcher = self._dispatchers.get(budget)
+        if dispatcher is None or dispatcher.done():
+            self._dispatchers[budget] = asyncio.create_task(self._dispatch(budget))
+        await waiter
+        self._granted(api, started)
+
+    def _granted(self, api: str, started: float):
+        self.granted[api] = self.granted.get(api, 0) + 1
+        self.wait_seconds[api] = self.wait_seconds.get(api, 0.0) + time.monotonic() - started
+
+    async def _dispatch(self, budget: str):
+        queue = self._queues[budget]
+        bucket = self._bucket(budget)
+        while queue:
+            # Drop requests whose caller gave up (e.g. the websocket closed)
+            if queue[0][2].done():
+                heapq.heappop(queue)
+                continue
+            wait = bucket.try_take()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            waiter = heapq.heappop(queue)[2]
+            waiter.set_result(None)
+
+    async def call(self, api: str, method, priority: int, **params):
+        """
+        Run a blocking boto3 method under the API budget without blocking the event loop.
+        Throttles and (for idempotent APIs) 5xx errors are retried up to CONNECT_MAX_ATTEMPTS,
+        each attempt taking its own token.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.acquire(api, priority)
+            try:
+                return await asyncio.to_thread(method, **params)
+            except Exception as e:
+                response = getattr(e, 'response', None) or {}
+                code = response.get('Error', {}).get('Code')
+                throttled = code in THROTTLE_ERROR_CODES
+                if throttled:
+                    self.throttles[api] = self.throttles.get(api, 0) + 1
+                    self._bucket(self.budget(api)).drain()
+                else:
+                    self.errors[api] = self.errors.get(api, 0) + 1
+                server_error = response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500
+                retryable = throttled or (server_error and api not in NON_IDEMPOTENT_APIS)
+                if not retryable or attempt >= CONNECT_MAX_ATTEMPTS:
+                    raise
+            self.retries[api] = self.retries.get(api, 0) + 1
+            if not throttled:
+                await asyncio.sleep(CONNECT_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+
+    def stats(self) -> dict:
+        apis = {api for api in self.buckets if api not in self.groups.values() and api != DEFAULT_BUDGET_NAME}
+        apis |= set(self.granted)
+        return {
+            api: {
+                "budget": self.budget(api),
+                "budget_rps": self._bucket(self.budget(api)).rate,
+                "burst": self._bucket(self.budget(api)).burst,
+                "queue_depth": sum(1 for entry in self._queues.get(self.budget(api), [])
+                                   if entry[3] == api and not entry[2].done()),
+                "granted": self.granted.get(api, 0),
+                "throttles": self.throttles.get(api, 0),
+                "errors": self.errors.get(api, 0),
+                "retries": self.retries.get(api, 0),
+                "avg_wait_ms": self.wait_seconds.get(api, 0.0) * 1000 / self.granted[api] if self.granted.get(api) else 0.0,
+            }
+            for api in sorted(apis)
+        }
+
+
+class ScheduledClient:
+    """
+    Wraps a boto3 client so every method call goes through the scheduler:
+    `await client.describe_contact(priority=PRIORITY_STATUS, **params)`.
+    """
+
+    def __init__(self, client, scheduler: ConnectScheduler):
+        self.client = client
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        async def call(priority: int = PRIORITY_STATUS, **params):
+            return await self.scheduler.call(name, method, priority, **params)
+
+        return call
+
+
+connect_scheduler = ConnectScheduler()
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Dict
+
+
+class ContactNotifier:
+    """Wakes every websocket watching a contact when new data is written for it."""
+
+    def __init__(self):
+        self.version = 0
+        self._waiters = set()
+
+    def notify(self):
+        self.version += 1
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    async def wait(self, seen_version: int, timeout: float = None) -> bool:
+        """Wait for a notification newer than `seen_version`; returns False on timeout."""
+        if self.version != seen_version:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters.discard(waiter)
+
+
+contact_notifiers: Dict[str, ContactNotifier] = {}
+
+
+def get_notifier(contact_id: str) -> ContactNotifier:
+    if contact_id not in contact_notifiers:
+        contact_notifiers[contact_id] = ContactNotifier()
+    return contact_notifiers[contact_id]
+
+
+def notify_contact(contact_id: str):
+    """Signal that transcript, status or attributes changed for a contact."""
+    notifier = contact_notifiers.get(contact_id)
+    if notifier is not None:
+        notifier.notify()
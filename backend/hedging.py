@@ -0,0 +1,288 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List
+from dotenv import load_dotenv
+from llm import BedrockInvoker, bedrock_client_factory, BEDROCK_MODEL_ID
+from llm_scheduler import llm_scheduler, DeadlineExceeded, PRIORITY_LIVE
+from metrics import percentile, percentile_ms
+from model_routing import IVR_FAST_MODEL_ID
+
+load_dotenv()
+
+# Regions to invoke Bedrock in, primary first; None leaves the region to the AWS config
+BEDROCK_REGIONS = [region.strip() for region in os.getenv("BEDROCK_REGIONS", os.getenv("AWS_REGION", "")).split(",")
+                   if region.strip()] or [None]
+# Optional second model tried in the primary region for BEDROCK_MODEL_ID (the large tier) requests,
+# e.g. when only one region has access to the main model
+BEDROCK_BACKUP_MODEL_ID = os.getenv("BEDROCK_BACKUP_MODEL_ID")
+# The same for IVR_FAST_MODEL_ID requests; without it the fast tier only fails over across regions
+BEDROCK_FAST_BACKUP_MODEL_ID = os.getenv("BEDROCK_FAST_BACKUP_MODEL_ID")
+# Point regions at other endpoints, e.g. local stand-ins: BEDROCK_ENDPOINTS='{"us-east-1": "http://localhost:9001"}'
+BEDROCK_ENDPOINTS = json.loads(os.getenv("BEDROCK_ENDPOINTS", "{}"))
+
+BEDROCK_HEDGE_ENABLED = os.getenv("BEDROCK_HEDGE_ENABLED", "true").lower() == "true"
+# Send a second request once the first has taken longer than this percentile of recent latencies
+BEDROCK_HEDGE_PERCENTILE = float(os.getenv("BEDROCK_HEDGE_PERCENTILE", "0.95"))
+# Hedge delay until an endpoint has BEDROCK_HEDGE_MIN_SAMPLES latencies, and the lowest it can go after
+BEDROCK_HEDGE_DELAY_MS = float(os.getenv("BEDROCK_HEDGE_DELAY_MS", "2500"))
+BEDROCK_HEDGE_MIN_DELAY_MS = float(os.getenv("BEDROCK_HEDGE_MIN_DELAY_MS", "400"))
+BEDROCK_HEDGE_MIN_SAMPLES = int(os.getenv("BEDROCK_HEDGE_MIN_SAMPLES", "20"))
+
+# Consecutive errors (throttles included) that open an endpoint's breaker, and how long it stays open
+BEDROCK_BREAKER_FAILURES = int(os.getenv("BEDROCK_BREAKER_FAILURES", "3"))
+BEDROCK_BREAKER_COOLDOWN = float(os.getenv("BEDROCK_BREAKER_COOLDOWN", "30"))
+
+# Latencies kept per endpoint for the hedge delay and percentiles
+ENDPOINT_LATENCY_SAMPLES = 200
+
+
+class CircuitBreaker:
+    """
+    Closed until `failures` errors in a row, then open for `cooldown` seconds.
+    After that one probe request is let through: success closes the breaker,
+    another error opens it again.
+    """
+
+    def __init__(self, failures: int = None, cooldown: float = None):
+        self.failures = BEDROCK_BREAKER_FAILURES if failures is None else failures
+        self.cooldown = BEDROCK_BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self.probing)
+
+    def attempt(self):
+        """A request is going out; in half-open it is the one probe."""
+        if self.state == "half-open":
+            self.probing = True
+
+    def abandon(self):
+        """The request ended without saying anything about the endpoint (cancelled or shed)."""
+        self.probing = False
+
+    def success(self):
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self):
+        self.consecutive += 1
+        if self.probing or self.consecutive >= self.failures:
+            if self.opened_at is None or self.probing:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class BedrockEndpoint:
+    """
+    One region with its own client, breaker and latency history. With a `model_id`
+    it is a backup model that only takes requests for the `backup_for` model.
+    """
+
+    def __init__(self, region, invoker: BedrockInvoker, model_id: str = None, breaker: CircuitBreaker = None,
+                 backup_for: str = None):
+        self.region = region
+        self.model_id = model_id
+        self.backup_for = backup_for
+        self.name = (region or "default") if model_id is None else f"{region or 'default'}/{model_id}"
+        self.invoker = invoker
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = deque(maxlen=ENDPOINT_LATENCY_SAMPLES)
+        self.calls = 0
+        self.wins = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def hedge_delay(self) -> float:
+        if len(self.latencies) < BEDROCK_HEDGE_MIN_SAMPLES:
+            return BEDROCK_HEDGE_DELAY_MS / 1000
+        return max(BEDROCK_HEDGE_MIN_DELAY_MS / 1000, percentile(self.latencies, BEDROCK_HEDGE_PERCENTILE))
+
+    def serves(self, model_id: str) -> bool:
+        return self.model_id is None or self.backup_for == model_id
+
+
+def default_endpoints(client_factory=bedrock_client_factory, scheduler=llm_scheduler) -> list:
+    def factory(region):
+        return lambda: client_factory(region, BEDROCK_ENDPOINTS.get(region))
+
+    endpoints = [BedrockEndpoint(region, BedrockInvoker(factory(region), scheduler, region)) for region in BEDROCK_REGIONS]
+    primary = BEDROCK_REGIONS[0]
+    # Each tier only ever falls back to a model of its own size
+    for model_id, backup_model_id in ((BEDROCK_MODEL_ID, BEDROCK_BACKUP_MODEL_ID),
+                                      (IVR_FAST_MODEL_ID, BEDROCK_FAST_BACKUP_MODEL_ID)):
+        if backup_model_id:
+            endpoints.append(BedrockEndpoint(primary, BedrockInvoker(factory(primary), scheduler, primary),
+                                             model_id=backup_model_id, backup_for=model_id))
+    return endpoints
+
+
+class Admission:
+    """Called by the invoker once an attempt holds a scheduler slot; waiting for one isn't the endpoint being slow."""
+
+    def __init__(self):
+        self.at = None
+        self.event = asyncio.Event()
+
+    def __call__(self):
+        self.at = time.monotonic()
+        self.event.set()
+
+
+class HedgedInvoker:
+    """
+    BedrockInvoker's interface over several endpoints. A request goes to the first
+    endpoint whose breaker is closed; if it hasn't answered within that endpoint's
+    hedge delay a second request goes to the next one, the first answer wins and
+    the other request is cancelled. An endpoint that errors fails over straight
+    away, and its breaker routes later requests elsewhere until it recovers.
+    The hedge delay and latencies only count from when an attempt is admitted by
+    the inference scheduler, so a busy local pool doesn't look like a slow endpoint.
+    """
+
+    def __init__(self, endpoints: List[BedrockEndpoint] = None, hedge: bool = None):
+        self.endpoints = endpoints or default_endpoints()
+        self.hedge = BEDROCK_HEDGE_ENABLED if hedge is None else hedge
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.failed = 0
+
+    def _candidates(self, model_id: str) -> list:
+        serving = [endpoint for endpoint in self.endpoints if endpoint.serves(model_id)]
+        allowed = [endpoint for endpoint in serving if endpoint.breaker.allow()]
+        # Every breaker open: keep trying in the usual order rather than failing outright
+        return allowed or serving
+
+    async def _attempt(self, endpoint: BedrockEndpoint, call, model_id: str, admission: Admission):
+        endpoint.calls += 1
+        result = await call(endpoint.invoker, endpoint.model_id or model_id, admission)
+        if admission.at is not None:
+            endpoint.latencies.append(time.monotonic() - admission.at)
+        return result
+
+    async def _run(self, call, model_id: str):
+        """Run `await call(invoker, model_id, on_admitted)` with hedging and failover; returns its result."""
+        self.requests += 1
+        candidates = self._candidates(model_id)
+        pending: Dict[asyncio.Task, BedrockEndpoint] = {}
+        launched = []
+        first_admission = Admission()
+        error = None
+
+        def launch():
+            endpoint = candidates.pop(0)
+            endpoint.breaker.attempt()
+            admission = first_admission if not launched else Admission()
+            launched.append(endpoint)
+            pending[asyncio.create_task(self._attempt(endpoint, call, model_id, admission))] = endpoint
+
+        launch()
+        try:
+            while pending:
+                can_hedge = self.hedge and candidates and len(launched) == 1
+                if can_hedge and first_admission.at is None:
+                    # Still queued for a local slot: a second request would only queue behind it
+                    admitted = asyncio.create_task(first_admission.event.wait())
+                    try:
+                        done, _ = await asyncio.wait([*pending, admitted], return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        admitted.cancel()
+                    done.discard(admitted)
+                    if not done:
+                        continue
+                else:
+                    timeout = None
+                    if can_hedge:
+                        timeout = max(0.0, first_admission.at + launched[0].hedge_delay() - time.monotonic())
+                    done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        self.hedged += 1
+                        launch()
+                        continue
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is None:
+                        endpoint.breaker.success()
+                        endpoint.wins += 1
+                        if endpoint is not launched[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    if isinstance(task.exception(), DeadlineExceeded):
+                        # Shed by the scheduler, not the endpoint's fault
+                        endpoint.breaker.abandon()
+                    else:
+                        endpoint.errors += 1
+                        endpoint.breaker.failure()
+                        print(f"Bedrock error in {endpoint.name}: {task.exception()}")
+                    error = error or task.exception()
+                if not pending and candidates:
+                    self.failovers += 1
+                    launch()
+            self.failed += 1
+            raise error
+        finally:
+            for task, endpoint in pending.items():
+                task.cancel()
+                endpoint.cancelled += 1
+                endpoint.breaker.abandon()
+
+    async def invoke(self, body: dict, model_id: str = BEDROCK_MODEL_ID, priority: int = PRIORITY_LIVE,
+                     deadline: float = None) -> dict:
+        return await self._run(
+            lambda invoker, model, on_admitted: invoker.invoke(body, model_id=model, priority=priority,
+                                                               deadline=deadline, on_admitted=on_admitted), model_id)
+
+    async def invoke_stream(self, body: dict, model_id: str = BEDROCK_MODEL_ID, fields=("value", "field"),
+                            priority: int = PRIORITY_LIVE, deadline: float = None):
+        return await self._run(
+            lambda invoker, model, on_admitted: invoker.invoke_stream(body, model_id=model, fields=fields,
+                                                                      priority=priority, deadline=deadline,
+                                                                      on_admitted=on_admitted), model_id)
+
+    def stats(self) -> dict:
+        return {
+            "hedge": self.hedge,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "failed": self.failed,
+            "endpoints": {
+                endpoint.name: {
+                    "breaker": endpoint.breaker.state,
+                    "breaker_opens": endpoint.breaker.opens,
+                    "calls": endpoint.calls,
+                    "wins": endpoint.wins,
+                    "errors": endpoint.errors,
+                    "cancelled": endpoint.cancelled,
+                    "hedge_delay_ms": endpoint.hedge_delay() * 1000,
+                    "latency_ms": {"p50": percentile_ms(endpoint.latencies, 0.5),
+                                   "p99": percentile_ms(endpoint.latencies, 0.99)},
+                    **endpoint.invoker.stats(),
+                }
+                for endpoint in self.endpoints
+            },
+        }
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.invoker.close()
+
+
+hedged_invoker = HedgedInvoker()
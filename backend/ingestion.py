@@ -0,0 +1,206 @@
+import asyncio
+import os
+import time
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Poll quickly while IVR prompts are arriving and back off towards the slow interval during hold
+TRANSCRIPT_POLL_FAST = float(os.getenv("TRANSCRIPT_POLL_FAST", "1"))
+TRANSCRIPT_POLL_SLOW = float(os.getenv("TRANSCRIPT_POLL_SLOW", "6"))
+# How long after the last CUSTOMER segment we still treat the IVR exchange as active
+TRANSCRIPT_IVR_WINDOW = float(os.getenv("TRANSCRIPT_IVR_WINDOW", "10"))
+
+
+class SegmentCursor:
+    """Where Contact Lens ingestion left off for one contact, kept across polls."""
+
+    def __init__(self):
+        self.next_token = None
+        self.last_segment_id = None
+        self.last_offset = -1
+        self.seen_ids = set()
+        self.interval = TRANSCRIPT_POLL_FAST
+        self.last_activity = None
+        self.polls = 0
+        self.api_calls = 0
+        self.segments = 0
+        self.cpu_seconds = 0.0
+
+    def accept(self, transcript: dict) -> bool:
+        """Record a transcript segment; False if it was already ingested."""
+        segment_id = transcript.get('Id') or (transcript.get('ParticipantRole'), transcript.get('BeginOffsetMillis'))
+        if segment_id in self.seen_ids:
+            return False
+        self.seen_ids.add(segment_id)
+        self.last_segment_id = segment_id
+        self.last_offset = max(self.last_offset, transcript.get('BeginOffsetMillis', -1))
+        self.segments += 1
+        return True
+
+    def in_ivr_exchange(self, now: float = None) -> bool:
+        """True while CUSTOMER prompts arrived within the IVR window."""
+        now = time.monotonic() if now is None else now
+        return self.last_activity is not None and now - self.last_activity < TRANSCRIPT_IVR_WINDOW
+
+    def next_interval(self, new_customer_segments: int, now: float = None) -> float:
+        """Stay fast during an IVR exchange, then double up to the slow interval while on hold."""
+        now = time.monotonic() if now is None else now
+        if new_customer_segments or self.last_activity is None:
+            self.last_activity = now
+        if self.in_ivr_exchange(now):
+            self.interval = TRANSCRIPT_POLL_FAST
+        else:
+            self.interval = min(TRANSCRIPT_POLL_SLOW, self.interval * 2)
+        return self.interval
+
+    def stats(self) -> dict:
+        return {
+            "polls": self.polls,
+            "api_calls": self.api_calls,
+            "segments": self.segments,
+            "last_offset": self.last_offset,
+            "interval": self.interval,
+            "cpu_ms": self.cpu_seconds * 1000,
+        }
+
+
+segment_cursors: Dict[str, SegmentCursor] = {}
+
+
+def get_segment_cursor(contact_id: str) -> SegmentCursor:
+    if contact_id not in segment_cursors:
+        segment_cursors[contact_id] = SegmentCursor()
+    return segment_cursors[contact_id]
+
+
+async def pull_segments(list_segments, instance_id: str, contact_id: str, cursor: SegmentCursor, max_results: int = 100) -> list:
+    """
+    Fetch the Contact Lens pages after the cursor and return the transcripts not seen before.
+    `list_segments` is an async callable taking list_realtime_contact_analysis_segments params.
+    While analysis is running Contact Lens keeps handing out a NextToken, so the
+    cursor resumes from it on the next poll instead of starting from the first segment.
+    """
+    cursor.polls += 1
+    new_transcripts = []
+    while True:
+        params = {
+            "InstanceId": instance_id,
+            "ContactId": contact_id,
+            "MaxResults": max_results
+        }
+        if cursor.next_token:
+            params["NextToken"] = cursor.next_token
+
+        response = await list_segments(**params)
+        cursor.api_calls += 1
+        started = time.process_time()
+        segments = response.get("Segments", [])
+        next_token = response.get("NextToken")
+        for segment in segments:
+            transcript = segment.get('Transcript')
+            if transcript and cursor.accept(transcript):
+                new_transcripts.append(transcript)
+        if next_token:
+            cursor.next_token = next_token
+        cursor.cpu_seconds += time.process_time() - started
+
+        # A short page means we are caught up; no token means analysis has finished
+        if len(segments) < max_results or not next_token:
+            return new_transcripts
+
+
+class ContactIngestion:
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.subscribers = 0
+
+
+class IngestionManager:
+    """
+    Runs at most one polling task of each kind (e.g. "status", "transcripts") per
+    contact and tracks how many websockets on this worker are watching it. Tasks
+    end on their own when the call completes and are cancelled by stop() once the
+    contact is finished or evicted, never because local subscribers left: clients
+    may reconnect through another worker while this one keeps polling.
+    """
+
+    def __init__(self):
+        self.contacts: Dict[str, ContactIngestion] = {}
+        self.started = 0
+        self.deduplicated = 0
+
+    def start(self, contact_id: str, kind: str, factory) -> asyncio.Task:
+        """Start factory(contact_id) unless a task of this kind is already running."""
+        contact = self.contacts.setdefault(contact_id, ContactIngestion())
+        task = contact.tasks.get(kind)
+        if task is not None and not task.done():
+            self.deduplicated += 1
+            return task
+        task = asyncio.create_task(factory(contact_id))
+        contact.tasks[kind] = task
+        task.add_done_callback(lambda finished: self._task_done(contact_id, kind, finished))
+        self.started += 1
+        return task
+
+    def _task_done(self, contact_id: str, kind: str, task: asyncio.Task):
+        contact = self.contacts.get(contact_id)
+        if contact is None or contact.tasks.get(kind) is not task:
+            return
+        del contact.tasks[kind]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"{kind} poller for {contact_id} failed: {task.exception()}")
+        if not contact.tasks and not contact.subscribers:
+            del self.contacts[contact_id]
+
+    def is_running(self, contact_id: str, kind: str) -> bool:
+        contact = self.contacts.get(contact_id)
+        return contact is not None and kind in contact.tasks
+
+    def subscribe(self, contact_id: str) -> int:
+        contact = self.contacts.setdefault(contact_id, ContactIngestion())
+        contact.subscribers += 1
+        return contact.subscribers
+
+    def unsubscribe(self, contact_id: str) -> int:
+        """Drop one subscriber; the contact's pollers keep running until stop()."""
+        contact = self.contacts.get(contact_id)
+        if contact is None:
+            return 0
+        contact.subscribers = max(0, contact.subscribers - 1)
+        if not contact.tasks and not contact.subscribers:
+            del self.contacts[contact_id]
+        return contact.subscribers
+
+    def stop(self, contact_id: str):
+        """Cancel a contact's pollers and drop its cursor, once the call has ended."""
+        segment_cursors.pop(contact_id, None)
+        contact = self.contacts.pop(contact_id, None)
+        if contact is None:
+            return
+        for task in contact.tasks.values():
+            task.cancel()
+
+    async def close(self):
+        tasks = [task for contact in self.contacts.values() for task in contact.tasks.values()]
+        for contact_id in list(self.contacts):
+            self.stop(contact_id)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        running = {}
+        for contact in self.contacts.values():
+            for kind in contact.tasks:
+                running[kind] = running.get(kind, 0) + 1
+        return {
+            "contacts": len(self.contacts),
+            "running": running,
+            "subscribers": sum(contact.subscribers for contact in self.contacts.values()),
+            "started": self.started,
+            "deduplicated": self.deduplicated,
+            "cursors": {contact_id: cursor.stats() for contact_id, cursor in segment_cursors.items()},
+        }
+
+
+ingestion_manager = IngestionManager()
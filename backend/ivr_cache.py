@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from ivr_rules import parse_date
+from segments import normalize_segment
+
+load_dotenv()
+
+IVR_CACHE_ENABLED = os.getenv("IVR_CACHE_ENABLED", "true").lower() == "true"
+# Defaults to the backend directory rather than wherever the server was started from
+IVR_CACHE_PATH = os.getenv("IVR_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ivr_decisions.db"))
+IVR_CACHE_MAX_ENTRIES = int(os.getenv("IVR_CACHE_MAX_ENTRIES", "5000"))
+IVR_CACHE_TTL_SECONDS = float(os.getenv("IVR_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# A single menu key is the same on every call; longer keypresses are usually row digits
+MENU_KEY = re.compile(r"[0-9*#]")
+# Failed or unparsed answers; "unknown" may carry raw model output, row values included
+UNCACHEABLE_FIELDS = {"error", "unknown"}
+# Shortest row value we trust when matching a spoken answer back to a column
+MIN_COLUMN_MATCH_LENGTH = 3
+# Digit-only forms a date is keyed in, e.g. 01021980
+DATE_DIGIT_FORMATS = ["%m%d%Y", "%m%d%y", "%Y%m%d"]
+
+
+def _digits(value: str) -> str:
+    return re.sub(r"\D", "", value)
+
+
+def _column_template(column: str, cell, value: str):
+    """Describe value as prefix + (cell or its digits) + suffix, or None if it is not derived from cell."""
+    cell = str(cell).strip()
+    for digits_only, base in ((False, cell), (True, _digits(cell))):
+        if len(base) < MIN_COLUMN_MATCH_LENGTH and base != cell:
+            continue
+        if base and base in value:
+            prefix, _, suffix = value.partition(base)
+            return {"kind": "column", "column": column, "digits": digits_only, "prefix": prefix, "suffix": suffix}
+    return None
+
+
+def _from_row(row_data: dict, value: str) -> bool:
+    """True when value shares digits or a date with any row cell, however it was reformatted."""
+    digits = _digits(value)
+    date = parse_date(value.rstrip("#").strip())
+    for cell in row_data.values():
+        cell_digits = _digits(str(cell))
+        if digits and cell_digits and (digits in cell_digits if len(digits) >= 2 else digits == cell_digits):
+            return True
+        if len(cell_digits) >= MIN_COLUMN_MATCH_LENGTH and cell_digits in digits:
+            return True
+        cell_date = parse_date(cell)
+        if cell_date is not None and (cell_date == date or
+                                      any(digits == cell_date.strftime(fmt) for fmt in DATE_DIGIT_FORMATS)):
+            return True
+    return False
+
+
+def decision_template(row_data: dict, value: str, field: str):
+    """
+    Turn an LLM answer into a row-independent template. Returns None for failed or
+    unmatched answers and when the value was derived from the row in a way we
+    cannot replay (e.g. reformatted dates).
+    """
+    value = str(value)
+    if field in UNCACHEABLE_FIELDS:
+        return None
+    if field == "press a number" and MENU_KEY.fullmatch(value.strip()):
+        return {"kind": "literal", "field": field, "value": value}
+    if field in row_data:
+        template = _column_template(field, row_data[field], value)
+        if template is None:
+            return None
+        return {**template, "field": field}
+    # e.g. "voice only" or keyed digits: the value may still be a row value that must follow the current row
+    for column, cell in row_data.items():
+        if len(str(cell).strip()) >= MIN_COLUMN_MATCH_LENGTH:
+            template = _column_template(column, cell, value)
+            if template is not None:
+                return {**template, "field": field}
+    # Anything else that came from this row, even reformatted, would leak it into another call
+    if field == "press a number" or _from_row(row_data, value):
+        return None
+    return {"kind": "literal", "field": field, "value": value}
+
+
+def resolve_template(template: dict, row_data: dict):
+    """Rebuild {"value", "field"} for the current row, or None if the row lacks the column."""
+    if template["kind"] == "literal":
+        return {"value": template["value"], "field": template["field"]}
+    cell = row_data.get(template["column"])
+    if cell is None:
+        return None
+    base = _digits(str(cell)) if template["digits"] else str(cell).strip()
+    if not base:
+        return None
+    return {"value": template["prefix"] + base + template["suffix"], "field": template["field"]}
+
+
+class IVRDecisionCache:
+    """
+    LRU+TTL cache of IVR decisions backed by SQLite so entries survive restarts.
+    Lookups only touch memory; inserts and deletes are queued to a writer thread
+    so a slow disk never blocks the event loop.
+    """
+
+    def __init__(self, path=IVR_CACHE_PATH, max_entries=IVR_CACHE_MAX_ENTRIES, ttl_seconds=IVR_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (template, created_at)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.write_errors = 0
+        self._db = None
+        self._writes = queue.Queue()
+        self._writer = None
+        if path:
+            # Other workers may share the file; wait on their locks instead of failing
+            self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, template TEXT, created_at REAL)"
+            )
+            self._load()
+            self._writer = threading.Thread(target=self._write_loop, name="ivr-cache-writer", daemon=True)
+            self._writer.start()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM decisions WHERE created_at < ?", (cutoff,))
+        rows = self._db.execute(
+            "SELECT key, template, created_at FROM decisions ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for key, template, created_at in reversed(rows):
+            self._entries[key] = (json.loads(template), created_at)
+        self._db.execute(
+            "DELETE FROM decisions WHERE key NOT IN (SELECT key FROM decisions ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
+
+    def _write_loop(self):
+        """Apply queued writes, committing once per batch; None stops the loop."""
+        while True:
+            batch = [self._writes.get()]
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            stop = None in batch
+            try:
+                for statement in batch:
+                    if statement is not None:
+                        self._db.execute(*statement)
+                self._db.commit()
+            except sqlite3.Error as e:
+                self.write_errors += 1
+                print(f"IVR decision cache write failed: {e}")
+            if stop:
+                return
+
+    def _write(self, sql: str, params: tuple):
+        if self._writer is not None:
+            self._writes.put((sql, params))
+
+    @staticmethod
+    def make_key(ivr_text: str, selected_option: str, row_data: dict) -> str:
+        columns = "\x1f".join(sorted(row_data.keys()))
+        raw = "\x1e".join([normalize_segment(ivr_text), selected_option or "", columns])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _evict(self, key):
+        self._entries.pop(key, None)
+        self.evictions += 1
+        self._write("DELETE FROM decisions WHERE key = ?", (key,))
+
+    def get(self, ivr_text: str, selected_option: str, row_data: dict):
+        """Return {"value", "field"} resolved against row_data, or None on a miss."""
+        key = self.make_key(ivr_text, selected_option, row_data)
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+            self._evict(key)
+            entry = None
+        decision = resolve_template(entry[0], row_data) if entry is not None else None
+        if decision is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return decision
+
+    def put(self, ivr_text: str, selected_option: str, row_data: dict, value, field: str):
+        template = decision_template(row_data, value, field)
+        if template is None:
+            return
+        key = self.make_key(ivr_text, selected_option, row_data)
+        created_at = time.time()
+        self._entries[key] = (template, created_at)
+        self._entries.move_to_end(key)
+        self.stores += 1
+        self._write("INSERT OR REPLACE INTO decisions (key, template, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(template), created_at))
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": IVR_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "pending_writes": self._writes.qsize(),
+            "write_errors": self.write_errors,
+        }
+
+    def close(self):
+        """Flush queued writes and close the database."""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+            self._db.close()
+
+
+ivr_decision_cache = IVRDecisionCache(path=IVR_CACHE_PATH if IVR_CACHE_ENABLED else None)
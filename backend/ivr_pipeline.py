@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict
+from dotenv import load_dotenv
+from metrics import percentile_ms
+from segments import hash_segment
+
+load_dotenv()
+
+# A newer prompt means the IVR has moved on: cancel the older one whether queued or in flight
+IVR_SUPERSEDE = os.getenv("IVR_SUPERSEDE", "true").lower() == "true"
+# Decision latencies (prompt arrived to answered) kept for percentiles
+IVR_LATENCY_SAMPLES = 500
+
+
+class IVRWorker:
+    """
+    Decides one contact's IVR prompts in the background, in arrival order, so the
+    websocket loop never waits on the model. Answers are kept in `results`;
+    each gets a version so readers only pick up what is new.
+    """
+
+    def __init__(self, contact_id: str, pipeline: "IVRPipeline"):
+        self.contact_id = contact_id
+        self.pipeline = pipeline
+        self.queue = deque()  # (prompt, arrived_at)
+        self.results = []
+        self.version = 0
+        self.current = None
+        self._seen = set()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, prompt: str, arrived_at: float = None) -> bool:
+        """
+        Queue a prompt; False if this contact's IVR already said it. `arrived_at`
+        (time.monotonic()) is when the IVR finished saying it, if known.
+        """
+        key = hash_segment(prompt)
+        if key in self._seen:
+            self.pipeline.duplicates += 1
+            return False
+        self._seen.add(key)
+        self.pipeline.submitted += 1
+        if IVR_SUPERSEDE:
+            self.pipeline.superseded += len(self.queue)
+            self.queue.clear()
+            if self.current is not None and not self.current.done():
+                self.current.cancel()
+                self.pipeline.cancelled += 1
+        self.queue.append((prompt, time.monotonic() if arrived_at is None else arrived_at))
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            if not self.queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            prompt, arrived_at = self.queue.popleft()
+            self.current = asyncio.create_task(self.pipeline.decide(self.contact_id, prompt, arrived_at))
+            # wait() rather than awaiting the task, so cancelling the decision doesn't stop the worker
+            await asyncio.wait([self.current])
+            task, self.current = self.current, None
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                self.pipeline.errors += 1
+                print(f"IVR decision error for {self.contact_id}: {task.exception()}")
+                continue
+            decision = task.result()
+            if not decision:
+                continue
+            self.pipeline.decided += 1
+            self.pipeline.latencies.append(time.monotonic() - arrived_at)
+            self.version += 1
+            response_sent = {
+                "timestamp": datetime.now().isoformat(),
+                "question": decision["question"],
+                "field": decision["field"],
+                "value": decision["value"],
+            }
+            self.results.append(response_sent)
+            try:
+                await self.pipeline.on_result(self.contact_id, response_sent)
+            except Exception as e:
+                print(f"IVR result handler error for {self.contact_id}: {e}")
+
+    def since(self, version: int) -> list:
+        """Answers produced after `version`, oldest first."""
+        return self.results[version:]
+
+    def cancel(self) -> list:
+        tasks = [self._task] + ([self.current] if self.current is not None else [])
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+
+class IVRPipeline:
+    """
+    One IVRWorker per contact. `await decide(contact_id, prompt, arrived_at)` returns the
+    answer dict; `await on_result(contact_id, response_sent)` runs for every answer
+    that wasn't superseded.
+    """
+
+    def __init__(self, decide, on_result):
+        self.decide = decide
+        self.on_result = on_result
+        self.workers: Dict[str, IVRWorker] = {}
+        self.submitted = 0
+        self.duplicates = 0
+        self.superseded = 0
+        self.cancelled = 0
+        self.decided = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=IVR_LATENCY_SAMPLES)
+
+    def worker(self, contact_id: str) -> IVRWorker:
+        if contact_id not in self.workers:
+            self.workers[contact_id] = IVRWorker(contact_id, self)
+        return self.workers[contact_id]
+
+    def submit(self, contact_id: str, prompt: str, arrived_at: float = None) -> bool:
+        return self.worker(contact_id).submit(prompt, arrived_at)
+
+    def stop(self, contact_id: str):
+        """Drop a contact's worker, cancelling anything it was still deciding."""
+        worker = self.workers.pop(contact_id, None)
+        if worker is not None:
+            worker.cancel()
+
+    async def close(self):
+        tasks = [task for worker in self.workers.values() for task in worker.cancel()]
+        self.workers.clear()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "supersede": IVR_SUPERSEDE,
+            "workers": len(self.workers),
+            "queued": sum(len(worker.queue) for worker in self.workers.values()),
+            "in_flight": sum(1 for worker in self.workers.values() if worker.current is not None),
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "superseded": self.superseded,
+            "cancelled": self.cancelled,
+            "decided": self.decided,
+            "errors": self.errors,
+            "latency_ms": {"p50": percentile_ms(self.latencies, 0.5), "p95": percentile_ms(self.latencies, 0.95)},
+        }
@@ -0,0 +1,234 @@
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IVR_RULES_ENABLED = os.getenv("IVR_RULES_ENABLED", "true").lower() == "true"
+
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+
+# Normalized column names (lowercase, alphanumerics only) for the fields the rules can fill
+COLUMN_SYNONYMS = {
+    "tax_id": ["taxid", "tin", "ein", "federaltaxid", "taxidnumber", "taxidentificationnumber"],
+    "npi": ["npi", "providernpi", "nationalproviderid", "nationalprovideridentifier", "npinumber"],
+    "dob": ["dob", "dateofbirth", "birthdate", "patientdob", "memberdob", "patientdateofbirth"],
+}
+
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m%d%Y", "%m-%d-%Y", "%Y/%m/%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"]
+
+_NEGATION = re.compile(r"\b(not|don't|do not)\b")
+_GOODBYE = re.compile(r"\b(goodbye|good bye)\b")
+_POUND = re.compile(r"\b(pound|hash)\b|#")
+
+
+def normalize_ivr_text(text: str) -> str:
+    """Lowercase, drop punctuation and turn spoken digits into numerals."""
+    text = re.sub(r"[^\w\s#']", " ", text.lower())
+    words = [NUMBER_WORDS.get(word, word) for word in text.split()]
+    return " ".join(words)
+
+
+def normalize_column(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def find_column(row_data: dict, concept: str):
+    """Return the single row_data column matching a concept, or None if absent or ambiguous."""
+    synonyms = COLUMN_SYNONYMS[concept]
+    exact = [column for column in row_data if normalize_column(column) in synonyms]
+    if len(exact) == 1:
+        return exact[0]
+    if exact:
+        return None
+    # Longer synonyms are specific enough to match inside a column name, e.g. "Billing Provider NPI Number"
+    partial = [
+        column for column in row_data
+        if any(len(synonym) >= 5 and synonym in normalize_column(column) for synonym in synonyms)
+        or normalize_column(column).endswith(concept.replace("_", ""))
+    ]
+    return partial[0] if len(partial) == 1 else None
+
+
+def parse_date(value):
+    if isinstance(value, (int, float)) and 1 < value < 80000:
+        # Excel serial date as produced by sheet_to_json
+        return datetime(1899, 12, 30) + timedelta(days=float(value))
+    text = str(value).strip()
+    if re.fullmatch(r"\d+(\.\d+)?", text) and 1 < float(text) < 80000 and len(text) != 8:
+        return datetime(1899, 12, 30) + timedelta(days=float(text))
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _pound_suffix(text: str) -> str:
+    return "#" if _POUND.search(text) else ""
+
+
+def _digits_answer(row_data, concept, length, text):
+    column = find_column(row_data, concept)
+    if column is None:
+        return None
+    digits = re.sub(r"\D", "", str(row_data[column]))
+    if len(digits) != length:
+        return None
+    return {"value": digits + _pound_suffix(text), "field": column}
+
+
+def press_digit(match, text, row_data):
+    return {"value": match.group("digit"), "field": "press a number"}
+
+
+def transfer_to_agent(match, text, row_data):
+    if _GOODBYE.search(text):
+        return None
+    return {"value": "transferring", "field": "transfer to agent"}
+
+
+def enter_tax_id(match, text, row_data):
+    if _NEGATION.search(text):
+        return None
+    return _digits_answer(row_data, "tax_id", 9, text)
+
+
+def enter_npi(match, text, row_data):
+    if _NEGATION.search(text):
+        return None
+    return _digits_answer(row_data, "npi", 10, text)
+
+
+def enter_dob(match, text, row_data):
+    if _NEGATION.search(text):
+        return None
+    # Only answer when the IVR spells out MMDDYYYY; anything else goes to the LLM
+    if not re.search(r"\bmmddyyyy\b|2 digits for the month 2 digits for the day and 4 digits for the year", text):
+        return None
+    column = find_column(row_data, "dob")
+    if column is None:
+        return None
+    date = parse_date(row_data[column])
+    if date is None:
+        return None
+    return {"value": date.strftime("%m%d%Y") + _pound_suffix(text), "field": column}
+
+
+class Rule:
+    """A compiled pattern for one formulaic IVR prompt, limited to the flows it applies to."""
+
+    def __init__(self, name, patterns, resolve, flows=None):
+        self.name = name
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.resolve = resolve
+        self.flows = set(flows) if flows else None
+
+    def applies_to(self, selected_option):
+        return self.flows is None or selected_option in self.flows
+
+    def evaluate(self, text, row_data):
+        """Return every answer the rule's patterns produce for the text."""
+        answers = []
+        for pattern in self.patterns:
+            for match in pattern.finditer(text):
+                answer = self.resolve(match, text, row_data)
+                if answer is not None:
+                    answers.append(answer)
+        return answers
+
+
+_PROVIDER = r"(?:a |an )?(?:health ?care )?provider(?:s| office| services)?"
+
+RULES = [
+    Rule("provider_menu", [
+        rf"\b(?:if you are|if you're|if you are calling as|for|as) {_PROVIDER} (?:please )?press (?P<digit>\d)\b",
+        rf"\bpress (?P<digit>\d) (?:if you are|if you're|for) {_PROVIDER}\b",
+    ], press_digit),
+    Rule("english_menu", [
+        r"\bfor english (?:please )?press (?P<digit>\d)\b",
+        r"\bpress (?P<digit>\d) for english\b",
+    ], press_digit),
+    Rule("claims_menu", [
+        r"\bfor (?:the )?(?:status of (?:a )?)?claims?(?: status)? (?:please )?press (?P<digit>\d)\b",
+        r"\bpress (?P<digit>\d) for (?:the )?claims?(?: status)?\b",
+    ], press_digit, flows=["Claims"]),
+    Rule("eligibility_menu", [
+        r"\bfor (?:eligibility|benefits)(?: (?:and|or) (?:eligibility|benefits))? (?:please )?press (?P<digit>\d)\b",
+        r"\bpress (?P<digit>\d) for (?:eligibility|benefits)\b",
+    ], press_digit, flows=["Eligibility"]),
+    Rule("transfer_to_agent", [
+        r"\bplease hold\b",
+        r"\bplease wait while (?:we|i) (?:connect|transfer)",
+        r"\btransferring your call\b",
+        r"\b(?:connect|connecting|transfer|transferring) you to (?:an|a|the next available) (?:agent|representative)\b",
+        r"\bconnecting (?:you )?to a representative\b",
+    ], transfer_to_agent),
+    Rule("tax_id", [
+        r"\benter (?:your |the )?(?:9 digit )?(?:tax id|tax identification number|tin)\b",
+    ], enter_tax_id),
+    Rule("npi", [
+        r"\benter (?:your |the )?(?:10 digit )?(?:npi|national provider identifier|national provider id)\b",
+    ], enter_npi),
+    Rule("dob", [
+        r"\benter (?:the )?(?:patient's |patients |member's |members )?(?:date of birth|birth date|dob)\b",
+    ], enter_dob),
+]
+
+
+class IVRRuleEngine:
+    """Answers formulaic IVR prompts locally and counts how often each rule fires."""
+
+    def __init__(self, rules=RULES):
+        self.rules = rules
+        self.evaluated = 0
+        self.answered = 0
+        self.ambiguous = 0
+        self.rule_hits = {rule.name: 0 for rule in rules}
+        self.total_us = 0.0
+
+    def match(self, ivr_text: str, selected_option: str, row_data: dict):
+        """Return {"value", "field", "rule"} when exactly one answer is found, else None."""
+        started = time.perf_counter()
+        self.evaluated += 1
+        text = normalize_ivr_text(ivr_text)
+        answers = {}
+        for rule in self.rules:
+            if not rule.applies_to(selected_option):
+                continue
+            for answer in rule.evaluate(text, row_data):
+                answers.setdefault((answer["value"], answer["field"]), rule.name)
+        self.total_us += (time.perf_counter() - started) * 1e6
+
+        if len(answers) != 1:
+            # Several different answers means a mixed menu; let the LLM weigh it
+            if answers:
+                self.ambiguous += 1
+            return None
+        (value, field), rule_name = next(iter(answers.items()))
+        self.answered += 1
+        self.rule_hits[rule_name] += 1
+        return {"value": value, "field": field, "rule": rule_name}
+
+    def stats(self) -> dict:
+        return {
+            "enabled": IVR_RULES_ENABLED,
+            "evaluated": self.evaluated,
+            "answered": self.answered,
+            "ambiguous": self.ambiguous,
+            "hit_rate": self.answered / self.evaluated if self.evaluated else 0.0,
+            "avg_match_us": self.total_us / self.evaluated if self.evaluated else 0.0,
+            "rules": {
+                name: {"hits": hits, "hit_rate": hits / self.evaluated if self.evaluated else 0.0}
+                for name, hits in self.rule_hits.items()
+            },
+        }
+
+
+ivr_rule_engine = IVRRuleEngine()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from llm_scheduler import llm_scheduler, PRIORITY_LIVE
+
+load_dotenv()
+
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
+# Stream responses and stop reading once the answer fields are complete
+BEDROCK_STREAMING = os.getenv("BEDROCK_STREAMING", "true").lower() == "true"
+
+# A complete JSON string, number or literal following a quoted key
+_FIELD_PATTERN = re.compile(
+    r'"(?P<key>[A-Za-z_]+)"\s*:\s*'
+    r'(?P<value>"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?=\s*[,}])|true|false|null)'
+)
+
+
+def bedrock_client_factory(region_name=None, endpoint_url=None):
+    """Return an aioboto3 bedrock-runtime client context manager; endpoint_url points it at a stand-in."""
+    import aioboto3
+
+    session = aioboto3.Session(
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=region_name or os.getenv("AWS_REGION"),
+    )
+    return session.client(service_name="bedrock-runtime", endpoint_url=endpoint_url)
+
+
+class StreamingFieldExtractor:
+    """Collects streamed model text until every wanted JSON field has a complete value."""
+
+    def __init__(self, fields=("value", "field")):
+        self.fields = set(fields)
+        self.values = {}
+        self.text = ""
+
+    def feed(self, delta: str):
+        """Append a text delta; return the fields once all of them are complete."""
+        self.text += delta
+        for match in _FIELD_PATTERN.finditer(self.text):
+            key = match.group('key')
+            if key in self.fields and key not in self.values:
+                self.values[key] = json.loads(match.group('value'))
+        return self.result
+
+    @property
+    def result(self):
+        if self.fields.issubset(self.values):
+            return {key: self.values[key] for key in self.fields}
+        return None
+
+
+async def _close_stream(stream):
+    close = getattr(stream, 'close', None)
+    if close is None:
+        return
+    result = close()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+class BedrockInvoker:
+    """
+    Async Bedrock invocation over one shared client. Admission (concurrency,
+    per-model budgets, deadlines) is left to the inference scheduler; with a
+    region_name each model gets its own "model@region" budget there.
+    """
+
+    def __init__(self, client_factory=bedrock_client_factory, scheduler=llm_scheduler, region_name: str = None):
+        self.client_factory = client_factory
+        self.scheduler = scheduler
+        self.region_name = region_name
+        self._client_cm = None
+        self._client = None
+        self._client_lock = None
+        self.streamed = 0
+        self.early_exits = 0
+        self.first_action_ms_total = 0.0
+        self.usage = {"input_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+
+    async def _get_client(self):
+        # The lock is bound lazily so the invoker can be built at import time
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self._client is None:
+                self._client_cm = self.client_factory()
+                self._client = await self._client_cm.__aenter__()
+        return self._client
+
+    def _record_usage(self, usage):
+        # Cache read/creation counts show whether the static prompt prefix is being reused
+        for key in self.usage:
+            self.usage[key] += usage.get(key) or 0
+
+    @asynccontextmanager
+    async def _slot(self, model_id: str, priority: int, deadline, on_admitted=None):
+        lane = model_id if self.region_name is None else f"{model_id}@{self.region_name}"
+        async with self.scheduler.slot(lane, priority, deadline):
+            client = await self._get_client()
+            if on_admitted is not None:
+                on_admitted()
+            yield client
+
+    async def invoke(self, body: dict, model_id: str = BEDROCK_MODEL_ID, priority: int = PRIORITY_LIVE,
+                     deadline: float = None, on_admitted=None) -> dict:
+        """
+        Invoke a model and return the decoded response body. Raises DeadlineExceeded
+        if the scheduler sheds the request (`deadline` is a time.monotonic() value).
+        `on_admitted()` is called once the request holds a scheduler slot.
+        """
+        async with self._slot(model_id, priority, deadline, on_admitted) as client:
+            response = await client.invoke_model(
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+            raw = await response['body'].read()
+            response_body = json.loads(raw)
+            self._record_usage(response_body.get('usage', {}))
+            return response_body
+
+    async def invoke_stream(self, body: dict, model_id: str = BEDROCK_MODEL_ID, fields=("value", "field"),
+                            priority: int = PRIORITY_LIVE, deadline: float = None, on_admitted=None):
+        """
+        Stream a model response and stop as soon as every field in `fields` is complete.
+        Returns (fields dict or None, generated text read so far).
+        """
+        started = time.perf_counter()
+        extractor = StreamingFieldExtractor(fields)
+        async with self._slot(model_id, priority, deadline, on_admitted) as client:
+            response = await client.invoke_model_with_response_stream(
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+            stream = response['body']
+            try:
+                async for event in stream:
+                    chunk = event.get('chunk')
+                    if not chunk:
+                        continue
+                    payload = json.loads(chunk['bytes'])
+                    if payload.get('type') == 'message_start':
+                        self._record_usage(payload.get('message', {}).get('usage', {}))
+                    if payload.get('type') != 'content_block_delta':
+                        continue
+                    if extractor.feed(payload['delta'].get('text', '')) is not None:
+                        # Leaving the loop early drops the rest of the generation
+                        self.early_exits += 1
+                        break
+            finally:
+                await _close_stream(stream)
+        self.streamed += 1
+        self.first_action_ms_total += (time.perf_counter() - started) * 1000
+        return extractor.result, extractor.text
+
+    def stats(self) -> dict:
+        return {
+            "streaming": BEDROCK_STREAMING,
+            "streamed": self.streamed,
+            "early_exits": self.early_exits,
+            "avg_time_to_first_action_ms": self.first_action_ms_total / self.streamed if self.streamed else 0.0,
+            "usage": dict(self.usage),
+        }
+
+    async def close(self):
+        if self._client_cm is not None:
+            await self._client_cm.__aexit__(None, None, None)
+        self._client_cm = None
+        self._client = None
+
+
+bedrock_invoker = BedrockInvoker()
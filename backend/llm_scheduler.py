@@ -0,0 +1,204 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+from dotenv import load_dotenv
+from connect_scheduler import TokenBucket, THROTTLE_ERROR_CODES
+from metrics import percentile_ms
+
+load_dotenv()
+
+# Lower runs first; within a priority the earliest deadline runs first
+PRIORITY_LIVE = 0         # final IVR prompt on a live call
+PRIORITY_SPECULATIVE = 1  # decision started on a partial transcript
+
+# Upper bound on in-flight model requests shared by every call on this worker
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", os.getenv("BEDROCK_MAX_CONCURRENCY", "8")))
+# How long an IVR waits for input after a prompt before it repeats or hangs up
+IVR_RESPONSE_DEADLINE = float(os.getenv("IVR_RESPONSE_DEADLINE", "6"))
+# Assumed model latency until a model has answered a few requests
+LLM_SERVICE_ESTIMATE = float(os.getenv("LLM_SERVICE_ESTIMATE", "1.5"))
+
+# Requests per second and burst per model, shared by every call on this worker.
+# Override with LLM_MODEL_BUDGETS='{"anthropic.claude-3-5-sonnet-20240620-v1:0": [5, 10]}';
+# a "model@region" key sets the budget for one region only.
+DEFAULT_MODEL_BUDGET = (10, 20)
+# Weight of the newest request in the per-model latency estimate
+SERVICE_EWMA_WEIGHT = 0.2
+# Queue waits kept per model for percentiles
+QUEUE_WAIT_SAMPLES = 500
+
+
+def load_model_budgets() -> dict:
+    override = os.getenv("LLM_MODEL_BUDGETS")
+    return {model: tuple(budget) for model, budget in json.loads(override).items()} if override else {}
+
+
+class DeadlineExceeded(Exception):
+    """The request was shed because it could not finish before its deadline."""
+
+
+class ModelLane:
+    """Budget, latency estimate and counters for one model."""
+
+    def __init__(self, budget):
+        self.bucket = TokenBucket(*budget)
+        self.service_seconds = LLM_SERVICE_ESTIMATE
+        self.in_flight = 0
+        self.granted = 0
+        self.shed = 0
+        self.throttles = 0
+        self.errors = 0
+        self.queue_waits = deque(maxlen=QUEUE_WAIT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.service_seconds += SERVICE_EWMA_WEIGHT * (seconds - self.service_seconds)
+
+
+class InferenceScheduler:
+    """
+    Process-wide admission for model requests. At most max_concurrency run at
+    once and each model has its own token-bucket budget. Waiting requests are
+    released by priority, then earliest deadline; a request that can no longer
+    finish before its deadline is shed with DeadlineExceeded instead of
+    holding a slot a fresher prompt could use.
+    """
+
+    def __init__(self, max_concurrency: int = None, budgets: dict = None):
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self.budgets = budgets if budgets is not None else load_model_budgets()
+        self.lanes: Dict[str, ModelLane] = {}
+        self.in_flight = 0
+        # [priority, deadline, sequence, model_id, future, enqueued_at]
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._timer = None
+
+    def lane(self, model_id: str) -> ModelLane:
+        if model_id not in self.lanes:
+            model = model_id.split("@")[0]
+            self.lanes[model_id] = ModelLane(self.budgets.get(model_id, self.budgets.get(model, DEFAULT_MODEL_BUDGET)))
+        return self.lanes[model_id]
+
+    def _can_finish(self, model_id: str, deadline, now: float) -> bool:
+        return deadline is None or now + self.lane(model_id).service_seconds <= deadline
+
+    async def acquire(self, model_id: str, priority: int = PRIORITY_LIVE, deadline: float = None):
+        """Wait for a slot; `deadline` is a time.monotonic() value, None to never shed."""
+        lane = self.lane(model_id)
+        now = time.monotonic()
+        if not self._can_finish(model_id, deadline, now):
+            lane.shed += 1
+            raise DeadlineExceeded(f"{model_id} needs ~{lane.service_seconds:.1f}s, deadline in {deadline - now:.1f}s")
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append([priority, float("inf") if deadline is None else deadline, next(self._sequence),
+                              model_id, future, now])
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just as the caller was cancelled: hand the slot back
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(model_id)
+            raise
+
+    def release(self, model_id: str, seconds: float = None):
+        self.in_flight -= 1
+        lane = self.lane(model_id)
+        lane.in_flight -= 1
+        if seconds is not None:
+            lane.observe(seconds)
+        self._dispatch()
+
+    def throttled(self, model_id: str):
+        """Back off a model after the service throttled it."""
+        lane = self.lane(model_id)
+        lane.throttles += 1
+        lane.bucket.drain()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        retry_in = None
+        self._waiting.sort()
+        remaining = []
+        for entry in self._waiting:
+            priority, deadline, _, model_id, future, enqueued_at = entry
+            if future.done():
+                continue
+            lane = self.lane(model_id)
+            if not self._can_finish(model_id, None if deadline == float("inf") else deadline, now):
+                lane.shed += 1
+                future.set_exception(DeadlineExceeded(f"{model_id} request waited {now - enqueued_at:.1f}s"))
+                continue
+            if self.in_flight >= self.max_concurrency:
+                remaining.append(entry)
+                continue
+            wait = lane.bucket.try_take()
+            if wait:
+                # Over this model's budget; other models can still go ahead
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+                remaining.append(entry)
+                continue
+            self.in_flight += 1
+            lane.in_flight += 1
+            lane.granted += 1
+            lane.queue_waits.append(now - enqueued_at)
+            future.set_result(None)
+        self._waiting = remaining
+        if remaining:
+            # Shed a waiting request as soon as it can no longer make its deadline, not on the next release
+            shed_in = min(entry[1] - self.lane(entry[3]).service_seconds for entry in remaining) - now
+            retry_in = shed_in if retry_in is None else min(retry_in, shed_in)
+            if retry_in != float("inf"):
+                self._timer = asyncio.get_running_loop().call_later(max(retry_in, 0.01), self._dispatch)
+
+    @asynccontextmanager
+    async def slot(self, model_id: str, priority: int = PRIORITY_LIVE, deadline: float = None):
+        await self.acquire(model_id, priority, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code in THROTTLE_ERROR_CODES:
+                self.throttled(model_id)
+            else:
+                self.lane(model_id).errors += 1
+            self.release(model_id)
+            raise
+        except BaseException:
+            self.release(model_id)
+            raise
+        self.release(model_id, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for entry in self._waiting if not entry[4].done()),
+            "models": {
+                model_id: {
+                    "budget_rps": lane.bucket.rate,
+                    "burst": lane.bucket.burst,
+                    "in_flight": lane.in_flight,
+                    "granted": lane.granted,
+                    "shed": lane.shed,
+                    "throttles": lane.throttles,
+                    "errors": lane.errors,
+                    "service_estimate_ms": lane.service_seconds * 1000,
+                    "queue_wait_ms": {"p50": percentile_ms(lane.queue_waits, 0.5),
+                                      "p95": percentile_ms(lane.queue_waits, 0.95)},
+                }
+                for model_id, lane in self.lanes.items()
+            },
+        }
+
+
+llm_scheduler = InferenceScheduler()
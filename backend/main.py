@@ -1,5 +1,5 @@
 import json
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, UploadFile, File, Form
 from pydantic import BaseModel
 import boto3
 import os
@@ -8,17 +8,38 @@ from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict
 from fastapi.responses import JSONResponse
-from typing import Set
+from typing import List, Optional
 from botocore.config import Config
 from contextlib import asynccontextmanager
-from datetime import datetime
-from botocore.exceptions import ClientError, BotoCoreError
-import uuid
-import aioboto3
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
 import asyncio
-import hashlib
-import re
 import openai
+from llm import BEDROCK_STREAMING
+from hedging import hedged_invoker
+from llm_scheduler import llm_scheduler, DeadlineExceeded, IVR_RESPONSE_DEADLINE, PRIORITY_LIVE, PRIORITY_SPECULATIVE
+from ivr_prompts import build_system_blocks
+from model_routing import model_router, request_body, parse_decision
+from column_index import column_indexes
+from ivr_cache import ivr_decision_cache, IVR_CACHE_ENABLED
+from ivr_rules import ivr_rule_engine, IVR_RULES_ENABLED
+from transcript_store import TranscriptStore
+from contact_events import get_notifier, notify_contact, contact_notifiers
+from state_store import ContactStore, process_memory
+from shared_state import state_backend, WORKER_ID
+from broadcast import voice_hub
+from attributes import attribute_refresher, ATTRIBUTE_REFRESH_AFTER_RESPONSE
+from transcription import TranscriptionSession
+from speculation import SpeculativeDecider, SPECULATION_ENABLED
+from coalescing import UtteranceCoalescer, coalescing_metrics, COALESCE_ENABLED
+from ivr_pipeline import IVRPipeline
+from campaigns import Campaign, campaigns, campaign_tasks
+from worklists import worklist_store, parse_worklist
+from ingestion import ingestion_manager, get_segment_cursor, pull_segments, segment_cursors
+from connect_scheduler import (
+    connect_scheduler, ScheduledClient,
+    PRIORITY_IVR_TRANSCRIPT, PRIORITY_TRANSCRIPT, PRIORITY_STATUS, PRIORITY_DIAL,
+)
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
@@ -26,17 +47,59 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 # Load environment variables
 load_dotenv()
 
-# Add transcription session storage
-transcription_sessions = {}
-call_status_store = {}
-transcription_data = {}
+# Evicted transcription sessions still shutting down, held so their close() isn't garbage collected
+closing_sessions = set()
+
+def close_session(contact_id: str, session=None):
+    """Schedule an evicted session's close(), which stops its tasks and its Transcribe stream"""
+    if session is None:
+        return
+    task = asyncio.create_task(session.close())
+    closing_sessions.add(task)
+    task.add_done_callback(closing_sessions.discard)
+
+def forget_contact(contact_id: str, record=None):
+    """Drop everything else kept for a contact once its status record is evicted"""
+    transcription_data.pop(contact_id)
+    close_session(contact_id, transcription_sessions.pop(contact_id))
+    status_signatures.pop(contact_id, None)
+    contact_notifiers.pop(contact_id, None)
+    attribute_refresher.forget(contact_id)
+    speculative_decider.forget(contact_id)
+    coalescing_metrics.forget(contact_id)
+    column_indexes.forget(contact_id)
+    ivr_pipeline.stop(contact_id)
+    ingestion_manager.stop(contact_id)
+
+# Per-contact state is bounded: finished contacts expire after CONTACT_STATE_TTL_SECONDS
+transcription_sessions = ContactStore("transcription_sessions", on_evict=close_session)
+call_status_store = ContactStore("call_status", on_evict=forget_contact)
+transcription_data = ContactStore("transcripts")
+
+# Default /ws/{contact_id} payload format: "snapshot" (full payload) or "delta"
+WS_PROTOCOL = os.getenv("WS_PROTOCOL", "snapshot")
+# Longest a campaign waits on a single call before moving on
+CAMPAIGN_CALL_TIMEOUT = float(os.getenv("CAMPAIGN_CALL_TIMEOUT", "3600"))
+# One search_contacts sweep refreshes every active contact's status
+STATUS_SWEEP_INTERVAL = float(os.getenv("STATUS_SWEEP_INTERVAL", "2"))
+STATUS_SWEEP_MAX_PAGES = int(os.getenv("STATUS_SWEEP_MAX_PAGES", "10"))
+# Last search summary signature per active contact, to spot contacts that changed
+status_signatures: Dict[str, str] = {}
+# describe_contact fields kept in call_status_store; the rest of the response is dropped
+CONTACT_RECORD_FIELDS = [
+    'Channel', 'InitiationMethod', 'InitiationTimestamp', 'ConnectedToSystemTimestamp',
+    'DisconnectTimestamp', 'DisconnectReason', 'LastUpdateTimestamp'
+]
+# Longest a websocket waits without a notification before re-checking state
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "5"))
 
 # Configure AWS client with custom retry policy
+# connect_scheduler retries throttles itself, taking a token for every attempt; botocore's own
+# retries would re-send outside the budget, so each boto3 call makes exactly one request
 connect_config = Config(
     retries={
-        'max_attempts': 5,
-        'mode': 'adaptive',
-        'total_max_attempts': 10,
+        'mode': 'standard',
+        'total_max_attempts': 1,
     }
 )
 
@@ -50,17 +113,15 @@ connect = boto3.client(
 # Initialize AWS clients
 connect_cl = boto3.client(
     'connect-contact-lens',
+    config=connect_config,
     region_name=os.getenv("AWS_REGION"),
     aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
     aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
 )
 
-bedrock = boto3.client(
-    service_name='bedrock-runtime',
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
+# All async Connect calls go through one process-wide rate limiter with per-API budgets (per worker process)
+connect_api = ScheduledClient(connect, connect_scheduler)
+connect_cl_api = ScheduledClient(connect_cl, connect_scheduler)
 
 # participant_client = boto3.client(
 #     'connectparticipant',
@@ -71,20 +132,25 @@ bedrock = boto3.client(
 
 # transcribe = boto3.client('transcribe', region_name=os.getenv("AWS_REGION"))
 
-voice_clients: Set[WebSocket] = set()
-
-def hash_segment(content: str) -> str:
-    """Generate a hash for content after normalizing whitespace and case."""
-    normalized = " ".join(content.strip().lower().split())
-    return hashlib.sha256(normalized.encode()).hexdigest()
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    sweeper_task = asyncio.create_task(status_sweeper())
+    replication_task = asyncio.create_task(replicate_shared_state())
     # Cleanup resources on shutdown
     yield
+    sweeper_task.cancel()
+    replication_task.cancel()
+    for campaign in campaigns.values():
+        campaign.cancel()
     for session in transcription_sessions.values():
         await session.close()
+    await ingestion_manager.close()
+    await hedged_invoker.close()
+    await state_backend.close()
+    await voice_hub.close()
+    await attribute_refresher.close()
+    await ivr_pipeline.close()
+    ivr_decision_cache.close()
 
 # Initialize FastAPI app
 app = FastAPI(lifespan=lifespan)
@@ -98,14 +164,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-call_status_store: Dict[str, dict] = {}
-
 # Request Model
 class CallRequest(BaseModel):
-    phoneNumber: str
-    rowData: dict
+    phoneNumber: Optional[str] = None
+    rowData: Optional[dict] = None
+    rowId: Optional[str] = None
     selectedOption: str
 
+class CampaignRequest(BaseModel):
+    rows: Optional[List[dict]] = None
+    worklistId: Optional[str] = None
+    rowIds: Optional[List[str]] = None
+    selectedOption: str
+    concurrency: Optional[int] = None
+    maxAttempts: Optional[int] = None
+    phoneColumn: Optional[str] = None
+
 class CallStatusRequest(BaseModel):
     contact_id: str
 
@@ -121,21 +195,25 @@ def sanitize_for_json(obj):
 # Ensure WebSocket endpoint properly broadcasts messages
 @app.websocket("/voice-ws")
 async def voice_websocket(websocket: WebSocket):
+    """Voice broadcasts; ?heartbeat=1 clients get {"type": "ping"} and must send "pong" back"""
     print("WebSocket connection initiated")
     await websocket.accept()
-    voice_clients.add(websocket)
+    client = voice_hub.connect(websocket, heartbeat=websocket.query_params.get("heartbeat") == "1")
     try:
         while True:
             # Keep connection alive...
             message = await websocket.receive_text()
-            print(f"Received message: {message}")
+            voice_hub.seen(client)
+            if message != "pong":
+                print(f"Received message: {message}")
     except WebSocketDisconnect:
         print("WebSocket disconnected")
-        voice_clients.remove(websocket)
+    except Exception as e:
+        # The hub closed the socket (slow consumer or missed heartbeats)
+        print(f"Voice WebSocket closed: {e}")
     finally:
-        if websocket in voice_clients:
-            voice_clients.remove(websocket)
-            print("WebSocket removed from clients")
+        await voice_hub.disconnect(client)
+        print("WebSocket removed from clients")
 
 
 @app.post("/trigger-voice")
@@ -144,72 +222,134 @@ async def trigger_voice(request: Request):
     response_text = data.get("text")
     print(f"Triggering voice with text: {response_text}")
     
-    # Broadcast to all connected voice clients
-    for client in voice_clients:
-        try:
-            await client.send_text(response_text)
-            print(f"Sent message to client: {response_text}")
-        except Exception as e:
-            print(f"Error sending to client: {e}")
-            voice_clients.remove(client)
+    # Every worker, this one included, delivers it to its own voice clients
+    await state_backend.publish("voice", {"origin": WORKER_ID, "text": response_text})
     
     return {"status": "success"}
 
+async def share_contact(contact_id: str):
+    """Publish a contact's status record so websockets on other workers see it"""
+    if not state_backend.shared or contact_id not in call_status_store:
+        return
+    record = sanitize_for_json(call_status_store[contact_id])
+    try:
+        await state_backend.put_contact(contact_id, record)
+        await state_backend.publish("contacts", {"origin": WORKER_ID, "type": "status", "contact_id": contact_id, "record": record})
+    except Exception as e:
+        print(f"Shared state error for {contact_id}: {e}")
+
+async def share_segments(contact_id: str, segments: list):
+    if not state_backend.shared or not segments:
+        return
+    segments = [{key: segment.get(key) for key in ('content', 'timestamp', 'participant', 'offset', 'end_offset')} for segment in segments]
+    try:
+        await state_backend.add_segments(contact_id, segments)
+        await state_backend.publish("contacts", {"origin": WORKER_ID, "type": "segments", "contact_id": contact_id, "segments": segments})
+    except Exception as e:
+        print(f"Shared state error for {contact_id}: {e}")
+
+def apply_shared_segments(contact_id: str, segments: list) -> int:
+    if contact_id not in transcription_data:
+        transcription_data[contact_id] = TranscriptStore()
+    store = transcription_data[contact_id]
+    added = 0
+    for segment in segments:
+        timestamp = datetime.fromisoformat(segment['timestamp']) if segment.get('timestamp') else None
+        if store.add(segment['content'], segment['participant'], segment['offset'], timestamp, segment.get('end_offset')) is not None:
+            added += 1
+    return added
+
+def apply_shared_contact(contact_id: str, record: dict):
+    """Take another worker's status record; the owning worker keeps polling Connect for it"""
+    call_status_store[contact_id] = {**call_status_store.get(contact_id, {}), **record}
+    if 'Attributes' in record:
+        attribute_refresher.tracker(contact_id).apply(record['Attributes'])
+    if record.get('ContactStatus') in ['COMPLETED', 'FAILED']:
+        finish_contact(contact_id)
+
+async def load_shared_contact(contact_id: str) -> bool:
+    """Fill the local stores for a contact another worker owns; False if nobody knows it"""
+    if contact_id in call_status_store or not state_backend.shared:
+        return contact_id in call_status_store
+    try:
+        record = await state_backend.get_contact(contact_id)
+        if record is None:
+            return False
+        segments = await state_backend.get_segments(contact_id)
+    except Exception as e:
+        print(f"Shared state error for {contact_id}: {e}")
+        return False
+    apply_shared_contact(contact_id, record)
+    apply_shared_segments(contact_id, segments)
+    return True
+
+async def replicate_shared_state():
+    """Apply other workers' contact updates locally and deliver voice broadcasts"""
+    while True:
+        try:
+            async for channel, message in state_backend.subscribe(["contacts", "voice"]):
+                if channel == "voice":
+                    # Queued per client; slow clients don't hold up the others
+                    voice_hub.broadcast(message.get("text"))
+                    continue
+                if message.get("origin") == WORKER_ID:
+                    continue
+                contact_id = message["contact_id"]
+                if message["type"] == "status":
+                    apply_shared_contact(contact_id, message["record"])
+                    notify_contact(contact_id)
+                elif message["type"] == "segments" and apply_shared_segments(contact_id, message["segments"]):
+                    notify_contact(contact_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Shared state subscription error: {e}")
+            await asyncio.sleep(1)
+
 
 @app.post("/fetch-call-transcript/{contact_id}")
 async def fetch_analysis_segments(contact_id: str):
+    """Ingest the segments Contact Lens produced since the contact's last poll"""
     instance_id = os.getenv("CONNECT_INSTANCE_ID")
-    next_token = None
+    cursor = get_segment_cursor(contact_id)
     retries = 0
     max_retries = 10
-    seen_hashes = set()
+    new_count = 0
+    new_customer_count = 0
+    new_segments = []
+
+    async def list_segments(**params):
+        # Calls in the middle of an IVR exchange get the Contact Lens budget first
+        priority = PRIORITY_IVR_TRANSCRIPT if cursor.in_ivr_exchange() else PRIORITY_TRANSCRIPT
+        return await connect_cl_api.list_realtime_contact_analysis_segments(priority=priority, **params)
 
     while retries < max_retries:
         try:
-            params = {
-                "InstanceId": instance_id,
-                "ContactId": contact_id,
-                "MaxResults": 100
-            }
-            if next_token:
-                params["NextToken"] = next_token
-
-            response = connect_cl.list_realtime_contact_analysis_segments(**params)
-            segments = response.get("Segments", [])
-            next_token = response.get("NextToken")
-
-            for segment in segments:
-                if 'Transcript' not in segment:
-                    continue
-                transcript = segment['Transcript']
-                content = transcript['Content'].strip()
-
-                # Generate a hash to detect duplicate content
-                content_hash = hash_segment(content)
+            # Resumes from the cursor's NextToken and skips segment IDs already ingested
+            transcripts = await pull_segments(list_segments, instance_id, contact_id, cursor)
 
+            for transcript in transcripts:
                 if contact_id not in transcription_data:
-                    transcription_data[contact_id] = []
-                    seen_hashes = set()
-                
-                # Avoid duplicate segments by hash
-                if content_hash in seen_hashes:
-                    continue
-
-                seen_hashes.add(content_hash)
-
-                transcription_data[contact_id].append({
-                    'content': content,
-                    'timestamp': datetime.now().isoformat(),
-                    'participant': transcript['ParticipantRole'],
-                    'offset': transcript['BeginOffsetMillis']
-                })
-
-            print(f"Fetched {len(segments)} segments for {contact_id}")
-            if not next_token:
-                break
-
-            await asyncio.sleep(0.4)
-            retries = 0
+                    transcription_data[contact_id] = TranscriptStore()
+
+                # The store drops duplicates and keeps offset order on insert
+                added = transcription_data[contact_id].add(
+                    transcript['Content'],
+                    transcript['ParticipantRole'],
+                    transcript['BeginOffsetMillis'],
+                    end_offset=transcript.get('EndOffsetMillis')
+                )
+                if added is not None:
+                    new_count += 1
+                    new_segments.append(added)
+                    if added['participant'] == 'CUSTOMER':
+                        new_customer_count += 1
+
+            if new_count:
+                notify_contact(contact_id)
+                await share_segments(contact_id, new_segments)
+            print(f"Fetched {len(transcripts)} new segments for {contact_id}")
+            break
 
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceNotFoundException':
@@ -223,35 +363,39 @@ async def fetch_analysis_segments(contact_id: str):
             print(f"Unexpected error: {e}")
             break
 
-def clean_transcripts(transcripts):
-    seen = set()
-    cleaned = []
-    for t in transcripts:
-        key = (t['participant'], t['content'].strip())
-        if key not in seen:
-            seen.add(key)
-            cleaned.append(t)
-    return cleaned
-
-def poll_contact_attributes(contact_id: str):
-    """Poll contact attributes independently"""
-    while True:
-        try:
-            response = connect.get_contact_attributes(
-                InstanceId=os.getenv("CONNECT_INSTANCE_ID"),
-                ContactId=contact_id
-            )
-            # Update call status store
-            if contact_id in call_status_store:
-                call_status_store[contact_id]['Attributes'] = response['Attributes']
-            time.sleep(2)
-        except Exception as e:
-            print(f"Attribute poll error: {e}")
-            break
+    return {"new_segments": new_count, "new_customer_segments": new_customer_count}
 
-import json
+async def fetch_contact_attributes(contact_id: str) -> dict:
+    response = await connect_api.get_contact_attributes(
+        priority=PRIORITY_STATUS,
+        InstanceId=os.getenv("CONNECT_INSTANCE_ID"),
+        ContactId=contact_id
+    )
+    return response.get('Attributes', {})
 
-async def process_ivr_prompt(contact_id: str, ivr_text: str):
+async def attributes_changed(contact_id: str, attributes: dict, diff: dict):
+    if contact_id not in call_status_store:
+        return
+    call_status_store[contact_id]['Attributes'] = attributes
+    notify_contact(contact_id)
+    await share_contact(contact_id)
+
+def refresh_attributes(contact_id: str, reason: str, delay: float = 0.0):
+    """Re-read contact attributes when the flow has probably changed them; no periodic polling"""
+    attribute_refresher.request(contact_id, fetch_contact_attributes, attributes_changed, delay, reason)
+
+def count_ivr_decision(contact_id: str, source: str):
+    """Track where each IVR answer came from (rules, cache or llm) for this contact"""
+    counts = call_status_store[contact_id].setdefault('ivr_decisions', {"rules": 0, "cache": 0, "llm": 0})
+    counts[source] += 1
+
+async def process_ivr_prompt(contact_id: str, ivr_text: str, speculative: bool = False, deadline: float = None):
+    """
+    Decide the answer to one IVR prompt. Speculative runs (on partial text) don't
+    count towards the contact's decisions or fill the cache until they are committed.
+    When the model can't answer before `deadline` (time.monotonic()) the request is
+    shed and the usual no-match answer is returned.
+    """
     # Get stored row data
     row_data = call_status_store[contact_id]['row_data']
     print(f"Processing IVR prompt with row data: {row_data}")
@@ -295,282 +439,64 @@ async def process_ivr_prompt(contact_id: str, ivr_text: str):
     #     THE MOST IMPORTANT THING IS TO FOLLOW THE INSTRUCTIONS PRECISELY AND RETURN THE RESPONSE IN THE REQUIRED JSON FORMAT ONLY NOT SPARE TEXT WITH, JUST JSON FORMAT, THAT'S IT.
     # """
 
-    if selected_option == "Claims":
-        prompt = f"""
-            You are an advanced AI assistant designed to interpret IVR (Interactive Voice Response) prompts and extract relevant information from provided data. Your task is to analyze the IVR text and determine the appropriate response based on the given patient and provider details.
-            Your main role is to follow "Claims" role, so prefer that option whenver it is asked in IVR.
-            You will be provided with two input variables:
-
-            <row_data>
-            {json.dumps(row_data)}
-            </row_data>
-
-            This is a JSON object containing patient details from an Excel file in the form of key-value pairs. The keys are column names, and the values are the corresponding data.
-
-            <ivr_text>
-            {ivr_text}
-            </ivr_text>
-
-            This is a string representing the IVR spoken text. It may ask the caller to provide details, instruct the caller to press a number, or present multiple options.
-
-            Your task is to analyze the IVR_TEXT and determine the appropriate response based on the ROW_DATA. Follow these general rules and preferences:
-
-            1. If there's a choice between text and audio input, prefer a choice number corresponding to text.
-            2. For language preferences, always prefer a choice number for English.
-            3. Pay attention to negative instructions (e.g., "NOT") and follow them precisely, For example, if said "do NOT enter your provider_id, then don't prefer giving that field and value in response".
-            4. Ignore any phone numbers provided for calling. (e.g., "For emergency, call 911." then do not prefer giving that number in response).
-            5. If confirmation of information is requested and the information is incorrect, respond with the number corresponding to "NO" choice.
-            6. When asked for an NPI, look for the National provider ID similar field.
-            7. If asked for provider number, look for the provider ID similar field.
-            8. Do not enter example values provided by the IVR. (e.g., If they say "For example please enter a date in MMDDYYYY Format like 10121998", But do NOT return that example value 10121998).
-            9. If it is asked for a phone number / contact number, look for the 'payer phone' or related field from the row_data.
-            10. Strictly AVOID giving response for "Eligibility" option or any other options as the current flow is "Claims" flow.
-            11. If you get any IVR text such as "Enter a number 1", "June 12, 1967" only With NO prior context which does NOT make sense, then do NOT send the response as it is, it should be considered as {{"value": "No matching data found", "field": "unknown"}} only.
-            12. When questioned about the date of birth, stick with the same date of birth as it is in row_data, even if it is multiple times query.
-
-            Handle the following special cases and scenarios:
-            These responses should be in 'value' attribute of json response:
-            1. Provider vs. Member/Participant choice: Always choose the provider number option when available.
-            2. Numeric inputs: Enter TAX_ID, Participation ID, Health Claim ID, or Member ID as requested, using the appropriate field from row_data.
-            3. Date of Birth: Enter in the format specified by the IVR (e.g., MMDDYYYY).
-            4. Reason for call: Prefer the number option for "Claims" or "Claim Status" when asked.
-            5. Healthcare provider identification: Confirm as a healthcare provider when asked by it's corresponding number.
-            6. Choose a corresponding number option for "Medical" or "Mental Health" , "Medicare Advantage" related when asked about type of coverage. Do NOT ever prefer options like 'Commercial plan', etc.
-            7. If the IVR prompt only allows / asks for a voice response (i.e., no numeric options), reply with 'field' set to 'Voice only' and 'value' set to the voice command that should be spoken 
-                (told by an IVR. e.g., Please speak the subscriber identification number, including all alpha characters then response should be 
-                {{
-                    "value": "<value that need to be spoken>",
-                    "field": "voice only"
-                }}).
-            8. (IMPORTANT POINT) If there's an option for pressing a number other than fields I mentioned, irrelevant fields like business, e-commerce, For network contracts or credentialing, etc. then do NOT respond there with "press a number". 
-            9. If the IVR says it's transferring to an agent (e.g., "please wait while we connect you to an agent" or any similar statements telling for 
-                "please wait" or "please hold", "transferring your call", "connecting to a representative"), respond with:
-                {{"value": "transferring", "field": "transfer to agent"}}
-            10. If there's a phrase called "goodbye" or like that, it does not mean it is transferring to an agent. At that case, prevent responding with {{"value": "transferring", "field": "transfer to agent"}}.
-            11. Ignore example birthday formats provided by the IVR (e.g., "MMDDYYYY"). Only respond with the actual date of birth in the specified format.
-            12. If asked for a customer, don't reply to press a number corresponding to it. In short, don't allow response with press a number for customer, members like that. It should be only for provider.
-                (For example, If ivr ask for "You can say, I'm a customer or press one." then don't respond with press a number and value 1.)
-            13. If asked like "Please enter patient's 9 digit ID or the Social Security number of the primary account holder", then look for the relevant fields like Patient ID.
-            14. If asked like "Say claims or press one" then go for that corresponding number. In short, Claims option should be preferred.
-            15. If asked for "Please say or Patient's X ID" then X is company's name so in that case also, ignore X and look for patient id.
-            16. If it is asked for "Is it for Multiple Claims", prefer the number corresponding to "NO" option.
-            17. If there's statement related to confirmation like "Is that right?" if there's no corresponding number for "YES" then return the response stricty with  
-                {{
-                    "value": "Yes",
-                    "field": "voice only"
-                }}.
-            18. If IVR asks for statements like "Please Enter PatientID or memberID that does NOT include letters", 
-            then only respond the text with {{"value": <That ID with only numerical>, "field": "press a number"}}, do NOT exclude letters from Alphanumerical ID. 
-            Else, If it contains Alphanumerical value, then respond must be {{"value": <That Alphanumerical ID>, "field": "voice only"}}.
-            19. If IVR says any ID or thing such as "0212139202" then Do NOT send the response as it is, it should be considered as {{"value": "No matching data found", "field": "unknown"}} only.
-            20. If asked for scenarios like "You can say order an ID card, update other insurance, provide accident details or say help with something else", then prefer strict response with {{"value": "insurance", "field": "voice only"}} only.
-            
-            Your response should be in the following JSON structure (MUST!!! nothing else like spare text with this):
-            {{
-                "value": "response_value",
-                "field": "source_field"
-            }}
-
-            Where:
-            - "value" is the appropriate response or action based on the IVR prompt
-            - "field" is the source of the information (column name from row_data, or "press a number" / "voice only" if it's a direct response to the IVR prompt)
-
-            Follow this step-by-step process:
-
-            1. Carefully read and analyze the IVR_TEXT.
-            2. Identify the type of response required (e.g., numeric input, voice command, button press).
-            3. Search for relevant information in ROW_DATA.
-            4. Apply the general rules and preferences to determine the appropriate response.
-            5. Handle any special cases or scenarios as instructed.
-            6. Formulate the response in the required JSON structure.
-            7. For the statements that includes of "only speaking / "or say", field should be "voice only" and value should be the value that need to be spoken.
-
-            Examples:
-
-            1. IVR: "If you're a provider press 1, or if you're a member press 2."
-            Response: {{"value": "1", "field": "press a number"}}
-
-            2. IVR: "Please enter your 9-digit TAX_ID number followed by the pound sign."
-            Response: {{"value": "123456789#", "field": "TAX_ID"}}
-
-            3. IVR: "Please enter the patient's date of birth using 2 digits for the month, 2 digits for the day, and 4 digits for the year."
-            Response: {{"value": "01011990", "field": "DOB"}}
-
-            4. IVR: "For Claims, press 2."
-            Response: {{"value": "2", "field": "press a number"}}
-
-            5. IVR: "Please say your reason for calling. For example, you can say things like 'Claims' or 'Eligibility'."
-            Response: {{"value": "Claims", "field": "voice only"}}
-
-            6. IVR" "You can say "Eligibility" or press 1."
-            {{"value": "No matching data found", "field": "unknown"}}   (As it is Claims flow, that's why don't respond with press a number and value 1.)
-
-            Remember:
-            - Always prioritize provider options over member options.
-            - Use the most relevant and specific information from the provided data.
-            - If no matching data is found or the IVR prompt is irrelevant to the provided data, respond with:
-            {{"value": "No matching data found", "field": "unknown"}}
-            
-            THE MOST IMPORTANT THING IS TO FOLLOW THE INSTRUCTIONS PRECISELY AND RETURN THE RESPONSE IN THE REQUIRED JSON FORMAT ONLY NOT SPARE TEXT WITH, JUST JSON FORMAT, THAT'S IT.
-        """ 
-    elif selected_option == "Eligibility":
-        prompt = f"""
-            You are an advanced AI assistant designed to interpret IVR (Interactive Voice Response) prompts and extract relevant information from provided data. Your task is to analyze the IVR text and determine the appropriate response based on the given patient and provider details.
-            Your main role is to follow "Eligibility" role, so prefer that option whenver it is asked in IVR.
-            You will be provided with two input variables:
-
-            <row_data>
-            {json.dumps(row_data)}
-            </row_data>
-
-            This is a JSON object containing patient details from an Excel file in the form of key-value pairs. The keys are column names, and the values are the corresponding data.
-
-            <ivr_text>
-            {ivr_text}
-            </ivr_text>
-
-            This is a string representing the IVR spoken text. It may ask the caller to provide details, instruct the caller to press a number, or present multiple options.
-
-            Your task is to analyze the IVR_TEXT and determine the appropriate response based on the ROW_DATA. Follow these general rules and preferences:
-
-            1. If there's a choice between text and audio input, prefer a choice number corresponding to text.
-            2. For language preferences, always prefer a choice number for English.
-            3. Pay attention to negative instructions (e.g., "NOT") and follow them precisely, For example, if said "do NOT enter your provider_id, then don't prefer giving that field and value in response".
-            4. Ignore any phone numbers provided for calling. (e.g., "For emergency, call 911." then do not prefer giving that number in response).
-            5. If confirmation of information is requested and the information is incorrect, respond with the number corresponding to "NO" choice.
-            6. When asked for an NPI, look for the National provider ID similar field.
-            7. If asked for provider number, look for the provider ID similar field.
-            8. Do not enter example values provided by the IVR. (e.g., If they say "For example please enter a date in MMDDYYYY Format like 10121998", But do NOT return that example value 10121998).
-            9. If it is asked for a phone number / contact number, look for the 'payer phone' or related field from the row_data.
-            10. Strictly AVOID giving response for "Claims" option or any other options as the current flow is "Eligibility" flow.
-            11. If you get any IVR text such as "Enter a number 1", "June 12, 1967" only With NO prior context which does NOT make sense, then do NOT send the response as it is, it should be considered as {{"value": "No matching data found", "field": "unknown"}} only.
-            12. When questioned about the date of birth, stick with the same date of birth as it is in row_data, even if it is multiple times query.
-
-            Handle the following special cases and scenarios:
-            These responses should be in 'value' attribute of json response:
-            1. Provider vs. Member/Participant choice: Always choose the provider number option when available.
-            2. Numeric inputs: Enter TAX_ID, Participation ID, Health Claim ID, or Member ID as requested, using the appropriate field from row_data.
-            3. Date of Birth: Enter in the format specified by the IVR (e.g., MMDDYYYY).
-            4. Reason for call: Prefer the number option for "Eligibility" or "Eligibility benefits" related field when asked.
-            5. Healthcare provider identification: Confirm as a healthcare provider when asked by it's corresponding number.
-            6. Choose a corresponding number option for "Medical" or "Mental Health" , "Medicare Advantage" related when asked about type of coverage. Do NOT prefer options like 'Commercial plan', etc.
-            7. If the IVR prompt only allows / asks for a voice response (i.e., no numeric options), reply with 'field' set to 'Voice only' and 'value' set to the voice command that should be spoken 
-                (told by an IVR. e.g., Please speak the subscriber identification number, including all alpha characters then response should be 
-                {{
-                    "value": "<value that need to be spoken>",
-                    "field": "voice only"
-                }}).
-            8. (IMPORTANT POINT) If there's an option for pressing a number other than fields I mentioned, like irrelevant fields like business, e-commerce, For network contracts or credentialing, etc. then do NOT respond there with "press a number". 
-            9. If the IVR says it's transferring to an agent (e.g., "please wait while we connect you to an agent" or any similar statements telling for 
-                "please wait" or "please hold", "transferring your call", "connecting to a representative"), respond with:
-                {{"value": "transferring", "field": "transfer to agent"}}
-            10. If there's a phrase called "goodbye" or like that, it does not mean it is transferring to an agent. At that case, prevent responding with {{"value": "transferring", "field": "transfer to agent"}}.
-            11. Ignore example birthday formats provided by the IVR (e.g., "MMDDYYYY"). Only respond with the actual date of birth in the specified format.
-            12. If asked for a customer, don't reply to press a number corresponding to it. In short, don't allow response with press a number for customer, members like that. It should be only for provider.
-                (For example, If ivr ask for "You can say, I'm a customer or press one." then don't respond with press a number and value 1.)
-            13. If asked like "Please enter patient's 9 digit ID or the Social Security number of the primary account holder", then look for the relevant fields like Patient ID.
-            14. If asked like "Say Eligibility or press one" then go for that corresponding number. In short, Eligibility option should be preferred.
-            15. If asked for "Please say or Patient's X ID" then X is company's name so in that case also, ignore X and look for patient id.
-            16. If it is asked for "Is it for Multiple Eligibility Benefits", prefer the number corresponding to "NO" option.
-            17. If there's statement related to confirmation like "Is that right?" if there's no corresponding number for "YES" then return the response stricty with  
-                {{
-                    "value": "Yes",
-                    "field": "voice only"
-                }}).
-            18. If IVR asks for statements like "Please Enter PatientID or memberID that does NOT include letters", 
-            then only respond the text with {{"value": <That ID with only numerical>, "field": "press a number"}}, do NOT exclude letters from Alphanumerical ID. 
-            Else, If it contains Alphanumerical value, then respond must be {{"value": <That Alphanumerical ID>, "field": "voice only"}}.
-            19. If IVR says any ID or thing such as "0212139202" or "2" then Do NOT send the response as it is with {{value: "0212139202", field: "unknown"}} or {{value: "2", field: "unknown"}}, it should be strictly considered as {{"value": "No matching data found", "field": "unknown"}} only.
-            20. If asked for scenarios like "You can say order an ID card, update other insurance, provide accident details or say help with something else", then prefer strict response with {{"value": "insurance", "field": "voice only"}} only.
-            
-            Your response should be in the following JSON structure (MUST!!! nothing else like spare text with this):
-            {{
-                "value": "response_value",
-                "field": "source_field"
-            }}
-
-            Where:
-            - "value" is the appropriate response or action based on the IVR prompt
-            - "field" is the source of the information (column name from row_data, or "press a number" / "voice only" if it's a direct response to the IVR prompt)
-
-            Follow this step-by-step process:
-
-            1. Carefully read and analyze the IVR_TEXT.
-            2. Identify the type of response required (e.g., numeric input, voice command, button press).
-            3. Search for relevant information in ROW_DATA.
-            4. Apply the general rules and preferences to determine the appropriate response.
-            5. Handle any special cases or scenarios as instructed.
-            6. Formulate the response in the required JSON structure.
-            7. For the statements that includes of "only speaking / "or say", field should be "voice only" and value should be the value that need to be spoken.
-
-            Examples:
-
-            1. IVR: "If you're a provider press 1, or if you're a member press 2."
-            Response: {{"value": "1", "field": "press a number"}}
-
-            2. IVR: "Please enter your 9-digit TAX_ID number followed by the pound sign."
-            Response: {{"value": "123456789#", "field": "TAX_ID"}}
-
-            3. IVR: "Please enter the patient's date of birth using 2 digits for the month, 2 digits for the day, and 4 digits for the year."
-            Response: {{"value": "01011990", "field": "DOB"}}
-
-            4. IVR: "For Eligibility, press 2."
-            Response: {{"value": "2", "field": "press a number"}}
-
-            5. IVR: "Please say your reason for calling. For example, you can say things like 'Claims' or 'Eligibility'."
-            Response: {{"value": "Eligibility", "field": "voice only"}}
-
-            6. IVR" "You can say "Claims" or press 1."
-            {{"value": "No matching data found", "field": "unknown"}}   (As it is Eligibility flow, that's why don't respond with press a number and value 1.)
-
-
-            Remember:
-            - Always prioritize provider options over member options.
-            - Use the most relevant and specific information from the provided data.
-            - If no matching data is found or the IVR prompt is irrelevant to the provided data, respond with:
-            {{"value": "No matching data found", "field": "unknown"}}
-            
-            THE MOST IMPORTANT THING IS TO FOLLOW THE INSTRUCTIONS PRECISELY AND RETURN THE RESPONSE IN THE REQUIRED JSON FORMAT ONLY NOT SPARE TEXT WITH, JUST JSON FORMAT, THAT'S IT.
-        """ 
+    # Formulaic prompts are answered locally before touching the cache or Bedrock
+    if IVR_RULES_ENABLED:
+        matched = ivr_rule_engine.match(ivr_text, selected_option, row_data)
+        if matched is not None:
+            print(f"IVR rule {matched['rule']} answered: {matched}")
+            if not speculative:
+                count_ivr_decision(contact_id, "rules")
+            return {"question": ivr_text, "value": matched["value"], "field": matched["field"], "source": "rules"}
+
+    # Payers replay the same menus, so reuse an earlier decision resolved against this row
+    if IVR_CACHE_ENABLED:
+        cached = ivr_decision_cache.get(ivr_text, selected_option, row_data)
+        if cached is not None:
+            print(f"IVR decision cache hit: {cached}")
+            if not speculative:
+                count_ivr_decision(contact_id, "cache")
+            return {"question": ivr_text, **cached, "source": "cache"}
+
+    if not speculative:
+        count_ivr_decision(contact_id, "llm")
+
+    # Static instructions and row_data are cacheable prefix blocks; only ivr_text changes per segment
+    system_blocks = build_system_blocks(selected_option, row_data)
+    # A final prompt on a live call goes ahead of guesses made on partial transcripts
+    priority = PRIORITY_SPECULATIVE if speculative else PRIORITY_LIVE
+
+    async def ask(tier):
+        # A tier without prompt caching pays for the whole 40+ column row on every prompt, so it only gets the
+        # columns this prompt can refer to; a caching tier reads the full row from cache for less than that
+        blocks = system_blocks
+        if not tier.prompt_caching:
+            pruned_row = column_indexes.prune(contact_id, row_data, ivr_text)
+            if pruned_row is not None:
+                blocks = build_system_blocks(selected_option, pruned_row)
+
+        # Construct the request body for Claude, with this tier's model and max_tokens
+        body = request_body(blocks, ivr_text, tier)
+
+        # Invoke Claude via Bedrock without blocking the event loop
+        if BEDROCK_STREAMING:
+            # Returns as soon as "value" and "field" are complete, dropping the rest of the generation
+            streamed_fields, generated_text = await hedged_invoker.invoke_stream(
+                body, model_id=tier.model_id, priority=priority, deadline=deadline)
+            return streamed_fields or parse_decision(generated_text), generated_text
+        response_body = await hedged_invoker.invoke(body, model_id=tier.model_id, priority=priority, deadline=deadline)
+        generated_text = response_body['content'][0]['text']
+        return parse_decision(generated_text), generated_text
 
-    # ivr_text: {ivr_text}
     try:
-        # Construct the request body for Claude
-        body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1000,
-            "system": prompt,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "IVR_TEXT: " + ivr_text
-                        }
-                    ]
-                }
-            ]
-        }
-
-        # Invoke Claude via Bedrock
-        response = bedrock.invoke_model(
-            modelId="anthropic.claude-3-5-sonnet-20240620-v1:0",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(body)
-        )
-
-        # Parse the response
-        response_body = json.loads(response['body'].read())
-        generated_text = response_body['content'][0]['text']
-        print("Claude Response:", generated_text)
+        # A fast model answers first; the large model only sees prompts whose answer fails validation
+        decision, tier, generated_text = await model_router.decide(ask, ivr_text, row_data)
+        print(f"Claude Response ({tier.name}):", generated_text)
 
         # Uncomment the following lines to use OpenAI instead of Bedrock
         # response = openai.chat.completions.create(
         #     model="gpt-3.5-turbo",  # Or gpt-4
         #     messages=[
-        #         {"role": "system", "content": prompt},
+        #         {"role": "system", "content": "\n\n".join(block["text"] for block in system_blocks)},
         #         {"role": "user", "content": "IVR_TEXT: " + ivr_text}
         #     ]
         # )
@@ -581,51 +507,215 @@ async def process_ivr_prompt(contact_id: str, ivr_text: str):
         # print(f"---------------------LLM response: {response}")
 
         # Parse the generated text
-        try:
-            parsed_output = json.loads(generated_text)
-            value = parsed_output.get("value", "")
-            field = parsed_output.get("field", "unknown")
-        except json.JSONDecodeError:
+        if decision is not None:
+            value = str(decision["value"])
+            field = str(decision["field"])
+        else:
             value = generated_text
             field = "unknown"
+    except DeadlineExceeded as e:
+        print(f"IVR prompt shed for {contact_id}: {e}")
+        return {"question": ivr_text, "value": "No matching data found", "field": "unknown", "source": "shed"}
+    except Exception as e:
+        print(f"Bedrock API error: {e}")
+        return {"question": ivr_text, "value": "Invocation error", "field": "error", "source": "error"}
 
-        return {"question": ivr_text, "value": value, "field": field}
+    # Only parsed answers are cached; raw text from an unparsed one can hold this contact's row
+    if not speculative and decision is not None:
+        cache_ivr_decision(ivr_text, selected_option, row_data, value, field)
+    return {"question": ivr_text, "value": value, "field": field, "source": "llm", "tier": tier.name}
 
+def cache_ivr_decision(ivr_text: str, selected_option: str, row_data: dict, value, field: str):
+    """Remember a model decision; a cache failure never costs the caller its answer."""
+    if not IVR_CACHE_ENABLED:
+        return
+    try:
+        ivr_decision_cache.put(ivr_text, selected_option, row_data, value, field)
     except Exception as e:
-        print(f"Bedrock API error: {e}")
-        return {"question": ivr_text, "value": "Invocation error", "field": "error"}
+        print(f"IVR decision cache error: {e}")
+
+# Starts deciding on partial transcripts; decide_ivr_prompt commits the answer once the final text agrees
+speculative_decider = SpeculativeDecider(lambda contact_id, text: process_ivr_prompt(
+    contact_id, text, speculative=True, deadline=time.monotonic() + IVR_RESPONSE_DEADLINE))
+
+async def decide_ivr_prompt(contact_id: str, ivr_text: str, arrived_at: float = None):
+    """
+    Answer a final IVR segment, reusing a speculative answer when the text hasn't materially
+    changed. The IVR stops waiting IVR_RESPONSE_DEADLINE after the prompt `arrived_at`.
+    """
+    if SPECULATION_ENABLED:
+        speculated = await speculative_decider.commit(contact_id, ivr_text)
+        if speculated is not None and speculated.get("source") not in ("error", "shed"):
+            print(f"Committing speculative answer: {speculated}")
+            count_ivr_decision(contact_id, speculated["source"])
+            record = call_status_store.get(contact_id, {})
+            if speculated["source"] == "llm" and 'row_data' in record:
+                cache_ivr_decision(ivr_text, record.get('selected_option', 'Claims'), record['row_data'],
+                                   speculated["value"], speculated["field"])
+            return {**speculated, "question": ivr_text}
+    deadline = (time.monotonic() if arrived_at is None else arrived_at) + IVR_RESPONSE_DEADLINE
+    return await process_ivr_prompt(contact_id, ivr_text, deadline=deadline)
+
+async def ivr_response_ready(contact_id: str, response_sent: dict):
+    if response_sent["field"] == "press a number" and str(response_sent["value"]).isdigit():
+        print(f"Triggering DTMF send for: {response_sent['value']}")
+    notify_contact(contact_id)
+    # The flow usually stores what we entered as attributes shortly after
+    refresh_attributes(contact_id, "response sent", delay=ATTRIBUTE_REFRESH_AFTER_RESPONSE)
+
+# Each contact's prompts are decided in the background; a newer prompt cancels an older one
+ivr_pipeline = IVRPipeline(decide_ivr_prompt, ivr_response_ready)
+
+async def poll_transcripts(contact_id: str):
+    """The single Contact Lens polling loop for a contact, run by ingestion_manager"""
+    cursor = get_segment_cursor(contact_id)
+    while True:
+        result = await fetch_analysis_segments(contact_id)
+        status = call_status_store.get(contact_id, {})
+        if status.get('ContactStatus') in ['COMPLETED', 'FAILED']:
+            break
+        # Fast while IVR prompts arrive, slower while the call sits on hold
+        await asyncio.sleep(cursor.next_interval(result["new_customer_segments"]))
+
+def contact_status(response: dict) -> str:
+    """Derive a ContactStatus from a describe_contact response or a search_contacts summary"""
+    if 'ContactStatus' in response:
+        return response['ContactStatus']
+    contact = response.get('Contact', response)
+    if contact.get('DisconnectTimestamp'):
+        return 'COMPLETED'
+    if contact.get('ConnectedToSystemTimestamp') or contact.get('AgentInfo', {}).get('ConnectedToAgentTimestamp'):
+        return 'CONNECTED'
+    return 'INITIATED'
+
+def compact_contact(response: dict) -> dict:
+    """The describe_contact fields we keep per contact instead of the whole response"""
+    contact = response.get('Contact', response)
+    record = {field: contact[field] for field in CONTACT_RECORD_FIELDS if contact.get(field)}
+    agent = contact.get('AgentInfo') or {}
+    if agent.get('ConnectedToAgentTimestamp'):
+        record['ConnectedToAgentTimestamp'] = agent['ConnectedToAgentTimestamp']
+    return record
+
+def finish_contact(contact_id: str):
+    """Start the eviction clock for a contact whose call has ended"""
+    for store in (call_status_store, transcription_data, transcription_sessions):
+        store.finish(contact_id)
+    # Nothing is listening for IVR answers any more
+    ivr_pipeline.stop(contact_id)
+    # The call is over, so its transcript poller can go whether or not anyone is watching
+    ingestion_manager.stop(contact_id)
+
+def apply_contact_status(contact_id: str, response: dict):
+    """Merge a describe_contact response into call_status_store and react to status changes"""
+    current_status = contact_status(response)
+    previous_status = call_status_store.get(contact_id, {}).get('ContactStatus')
+    # Merge existing data with the fields we care about from the new response
+    call_status_store[contact_id] = {
+        **call_status_store.get(contact_id, {}),
+        **compact_contact(response),
+        'ContactStatus': current_status
+    }
+    if current_status != previous_status:
+        notify_contact(contact_id)
+        if current_status != 'INITIATED':
+            refresh_attributes(contact_id, f"status {current_status}")
+    if current_status in ['COMPLETED', 'FAILED']:
+        finish_contact(contact_id)
+
+    # Automatically start transcription when call connects
+    if current_status in ['CONNECTED', 'IN_PROGRESS'] and not ingestion_manager.is_running(contact_id, "transcripts"):
+        print(f"Starting real-time analysis for {contact_id}")
+        ingestion_manager.start(contact_id, "transcripts", poll_transcripts)
+
+async def refresh_call_status(contact_id: str):
+    response = await connect_api.describe_contact(
+        priority=PRIORITY_STATUS,
+        InstanceId=os.getenv("CONNECT_INSTANCE_ID"),
+        ContactId=contact_id
+    )
+    apply_contact_status(contact_id, response)
+    await share_contact(contact_id)
+
+def _sweep_signature(summary: dict) -> str:
+    # Only the parts of a search summary that move when the contact's state does
+    return json.dumps(sanitize_for_json({
+        "disconnect": summary.get('DisconnectTimestamp'),
+        "agent": summary.get('AgentInfo'),
+        "queue": summary.get('QueueInfo'),
+    }), sort_keys=True)
+
+async def search_active_contacts(active: dict) -> dict:
+    """Page through search_contacts once for every active contact; returns summaries by contact ID"""
+    earliest = min(
+        (record.get('timestamp') for record in active.values() if isinstance(record.get('timestamp'), datetime)),
+        default=datetime.now()
+    )
+    params = {
+        "InstanceId": os.getenv("CONNECT_INSTANCE_ID"),
+        "TimeRange": {
+            "Type": "INITIATION_TIMESTAMP",
+            "StartTime": (earliest - timedelta(minutes=5)).astimezone(timezone.utc),
+            "EndTime": datetime.now(timezone.utc),
+        },
+        "SearchCriteria": {"Channels": ["VOICE"]},
+        "MaxResults": 100,
+    }
+    summaries = {}
+    for _ in range(STATUS_SWEEP_MAX_PAGES):
+        response = await connect_api.search_contacts(priority=PRIORITY_STATUS, **params)
+        for summary in response.get('Contacts', []):
+            if summary.get('Id') in active:
+                summaries[summary['Id']] = summary
+        if len(summaries) == len(active) or not response.get('NextToken'):
+            break
+        params["NextToken"] = response['NextToken']
+    return summaries
+
+async def sweep_call_status():
+    """One status pass over every active contact"""
+    # Contacts dialed by other workers are swept by those workers
+    active = {
+        contact_id: record for contact_id, record in call_status_store.items()
+        if record.get('ContactStatus') not in ['COMPLETED', 'FAILED'] and record.get('owner', WORKER_ID) == WORKER_ID
+    }
+    if not active:
+        return
+    try:
+        summaries = await search_active_contacts(active)
+    except Exception as e:
+        print(f"Status sweep search error: {str(e)}")
+        summaries = {}
+
+    for contact_id, record in active.items():
+        summary = summaries.get(contact_id)
+        signature = _sweep_signature(summary) if summary is not None else None
+        # describe_contact only for contacts the search missed, whose summary moved,
+        # or that have not connected yet (search summaries carry no connect time)
+        if summary is not None and signature == status_signatures.get(contact_id) and record.get('ContactStatus') != 'INITIATED':
+            continue
+        try:
+            await refresh_call_status(contact_id)
+            if signature is not None:
+                status_signatures[contact_id] = signature
+        except Exception as e:
+            print(f"Status check error for {contact_id}: {str(e)}")
+
+    for contact_id in list(status_signatures):
+        if contact_id not in active:
+            del status_signatures[contact_id]
 
-# Modified poll_call_status to ensure real-time analysis starts
-async def poll_call_status(contact_id: str):
-    """Enhanced status polling with real-time analysis initiation"""
-    max_retries = 60
-    for _ in range(max_retries):
+async def status_sweeper():
+    """Single background loop keeping call_status_store current for calls of any length"""
+    while True:
         try:
-            response = connect.describe_contact(
-                InstanceId=os.getenv("CONNECT_INSTANCE_ID"),
-                ContactId=contact_id
-            )
-            
-            current_status = response.get('ContactStatus', 'INITIATED')
-            # Merge existing data with new response
-            call_status_store[contact_id] = {
-                **call_status_store.get(contact_id, {}),
-                **response
-            }
-            
-            # Automatically start transcription when call connects
-            if current_status in ['CONNECTED', 'IN_PROGRESS'] and contact_id not in transcription_data:
-                print(f"Starting real-time analysis for {contact_id}")
-                asyncio.create_task(fetch_analysis_segments(contact_id))
-            
-            if current_status in ['COMPLETED', 'FAILED']:
-                break
-                
-            await asyncio.sleep(2)
-            
+            await sweep_call_status()
         except Exception as e:
-            print(f"Status check error: {str(e)}")
-            await asyncio.sleep(2)
+            print(f"Status sweep error: {str(e)}")
+        for store in (call_status_store, transcription_data, transcription_sessions, campaigns,
+                      worklist_store.worklists):
+            store.evict_expired()
+        await asyncio.sleep(STATUS_SWEEP_INTERVAL)
 
 # Add this error handler for better logging
 @app.exception_handler(Exception)
@@ -636,35 +726,78 @@ async def generic_exception_handler(request, exc):
         content={"message": "Internal server error"}
     )
 
+async def start_call(phone_number: str, row_data: dict, selected_option: str) -> str:
+    """Dial a number through the scheduler and register the contact for status tracking"""
+    print(f"Selected option: {selected_option}")
+
+    response = await connect_api.start_outbound_voice_contact(
+        priority=PRIORITY_DIAL,
+        InstanceId=os.getenv("CONNECT_INSTANCE_ID"),
+        ContactFlowId=os.getenv("CONTACT_FLOW_ID"),
+        DestinationPhoneNumber=phone_number,
+        SourcePhoneNumber=os.getenv("SOURCE_PHONE_NUMBER"),
+        QueueId=os.getenv("QUEUE_ID"),
+        Attributes={  # Critical for transcription
+            "AWSContactLensEnabled": "true",
+            "LanguageCode": "en-US"
+        }
+    )
+
+    contact_id = response['ContactId']
+    print(contact_id)
+    call_status_store[contact_id] = {
+        'status': 'INITIATED',
+        'row_data': row_data,
+        'ContactStatus': 'INITIATED',
+        'timestamp': datetime.now(),
+        'selected_option': selected_option,
+        'owner': WORKER_ID
+    }
+    # Built once per call; each prompt to an uncached tier then picks its candidate columns from it
+    column_indexes.build(contact_id, row_data)
+    await share_contact(contact_id)
+    # status_sweeper picks the new contact up on its next pass
+    return contact_id
+
+@app.post("/worklists")
+async def upload_worklist(file: UploadFile = File(...), phoneColumn: Optional[str] = Form(None)):
+    """Parse an .xlsx or .csv worklist row by row; rows are then referenced by row ID on this worker only"""
+    try:
+        worklist = await asyncio.to_thread(parse_worklist, file.file, file.filename, phoneColumn)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+    worklist_store.add(worklist)
+    print(f"Worklist {worklist.id}: {len(worklist.rows)} rows, {worklist.rejected} rejected")
+    return worklist.summary()
+
+@app.get("/worklists/{worklist_id}")
+async def get_worklist(worklist_id: str, offset: int = 0, limit: int = 100):
+    worklist = worklist_store.worklists.get(worklist_id)
+    if worklist is None:
+        raise HTTPException(status_code=404, detail="Worklist not found")
+    return {**worklist.summary(), "offset": offset, "items": worklist.page(offset, min(limit, 1000))}
+
+@app.delete("/worklists/{worklist_id}")
+async def delete_worklist(worklist_id: str):
+    if not worklist_store.remove(worklist_id):
+        raise HTTPException(status_code=404, detail="Worklist not found")
+    return {"success": True}
+
 @app.post("/initiate-call")
 async def initiate_call(request: CallRequest):
+    phone_number, row_data = request.phoneNumber, request.rowData
+    if request.rowId:
+        try:
+            row_data = worklist_store.get(request.rowId)
+            phone_number = phone_number or worklist_store.phone(request.rowId)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+    if not phone_number or row_data is None:
+        raise HTTPException(status_code=400, detail="Send phoneNumber and rowData, or a rowId")
     try:
-        selected_option = request.selectedOption
-        print(f"Selected option: {selected_option}")
-
-        response = connect.start_outbound_voice_contact(
-            InstanceId=os.getenv("CONNECT_INSTANCE_ID"),
-            ContactFlowId=os.getenv("CONTACT_FLOW_ID"),
-            DestinationPhoneNumber=request.phoneNumber,
-            SourcePhoneNumber=os.getenv("SOURCE_PHONE_NUMBER"),
-            QueueId=os.getenv("QUEUE_ID"),
-            Attributes={  # Critical for transcription
-                "AWSContactLensEnabled": "true",
-                "LanguageCode": "en-US"
-            }
-        )
-
-        contact_id = response['ContactId']
-        print(contact_id)
-        call_status_store[contact_id] = {
-            'status': 'INITIATED',
-            'row_data': request.rowData,
-            'ContactStatus': 'INITIATED',
-            'timestamp': datetime.now(),
-            'selected_option': selected_option
-        }
-        
-        asyncio.create_task(poll_call_status(contact_id))
+        contact_id = await start_call(phone_number, row_data, request.selectedOption)
         
         return {
             "success": True,
@@ -674,153 +807,344 @@ async def initiate_call(request: CallRequest):
     except Exception as error:
         raise HTTPException(status_code=500, detail={"success": False, "error": str(error)})
 
+async def wait_for_call_outcome(contact_id: str):
+    """Wait for a contact to finish; returns (ContactStatus, DisconnectReason)"""
+    notifier = get_notifier(contact_id)
+    deadline = time.monotonic() + CAMPAIGN_CALL_TIMEOUT
+    while True:
+        seen = notifier.version
+        record = call_status_store.get(contact_id, {})
+        status = record.get('ContactStatus')
+        if status in ['COMPLETED', 'FAILED']:
+            return status, record.get('DisconnectReason')
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return 'TIMEOUT', None
+        await notifier.wait(seen, timeout=min(remaining, WS_IDLE_TIMEOUT))
+
+@app.post("/campaigns")
+async def create_campaign(request: CampaignRequest):
+    """Start dialing a batch of rows server-side, either sent inline or from an uploaded worklist"""
+    options = {
+        "concurrency": request.concurrency,
+        "max_attempts": request.maxAttempts,
+        "phone_column": request.phoneColumn
+    }
+    try:
+        if request.rowIds is not None or request.worklistId:
+            row_ids = request.rowIds if request.rowIds is not None else worklist_store.row_ids(request.worklistId)
+            campaign = Campaign(row_ids, request.selectedOption, row_source=worklist_store, **options)
+        elif request.rows is not None:
+            campaign = Campaign(request.rows, request.selectedOption, **options)
+        else:
+            raise HTTPException(status_code=400, detail="Send rows, rowIds or a worklistId")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    campaigns[campaign.id] = campaign
+    task = asyncio.create_task(campaign.run(start_call, wait_for_call_outcome))
+    campaign_tasks[campaign.id] = task
+
+    def campaign_done(_):
+        campaign_tasks.pop(campaign.id, None)
+        campaigns.finish(campaign.id)
+
+    task.add_done_callback(campaign_done)
+    return campaign.progress()
+
+@app.get("/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    if campaign_id not in campaigns:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaigns[campaign_id].progress(include_rows=True)
+
+@app.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    if campaign_id not in campaigns:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    campaigns[campaign_id].cancel()
+    return campaigns[campaign_id].progress()
+
+@app.websocket("/campaigns/{campaign_id}/ws")
+async def campaign_websocket(websocket: WebSocket, campaign_id: str):
+    """Pushes campaign progress, with per-row state, whenever a row changes"""
+    await websocket.accept()
+    campaign = campaigns.get(campaign_id)
+    if campaign is None:
+        await websocket.send_json({"error": "Campaign not found"})
+        await websocket.close()
+        return
+    try:
+        while True:
+            seen = campaign.notifier.version
+            await websocket.send_json(campaign.progress(include_rows=True))
+            if campaign.status in ['completed', 'cancelled']:
+                break
+            await campaign.notifier.wait(seen, timeout=WS_IDLE_TIMEOUT)
+    except WebSocketDisconnect:
+        print("Campaign client disconnected")
+
 @app.websocket("/ws/{contact_id}")
 async def websocket_endpoint(websocket: WebSocket, contact_id: str):
+    """
+    Live call updates. With ?protocol=delta the client gets one "snapshot" message,
+    then "segments", "status", "attributes" (changed and removed keys only) and
+    "responseSent" events carrying the transcript version. ?protocol=snapshot
+    (the default) sends the full payload on every change.
+    """
     await websocket.accept()
-    poll_task = None
+    # Every websocket for a contact shares one status loop and one Contact Lens loop
+    ingestion_manager.subscribe(contact_id)
     
     try:
-        # Start background polling task
-        async def background_poller():
-            while True:
-                try:
-                    await fetch_analysis_segments(contact_id)
-                    status = call_status_store.get(contact_id, {})
-                    if status.get('ContactStatus') in ['COMPLETED', 'FAILED']:
-                        break
-                    await asyncio.sleep(2)
-                except Exception as e:
-                    print(f"Background poll error: {str(e)}")
-                    break
-        
-        poll_task = asyncio.create_task(background_poller())
-        processed_prompt_hashes = set()
-
+        # The call may have been dialed through another worker
+        await load_shared_contact(contact_id)
+        record = call_status_store.get(contact_id, {})
+        # Status comes from the shared sweeper; only the transcript loop is per contact,
+        # and it runs on the worker that owns the contact
+        if record.get('ContactStatus') not in ['COMPLETED', 'FAILED'] and record.get('owner', WORKER_ID) == WORKER_ID:
+            ingestion_manager.start(contact_id, "transcripts", poll_transcripts)
+        # Contact Lens splits one menu into several CUSTOMER segments; decide on the whole utterance
+        coalescer = UtteranceCoalescer(contact_id, coalescing_metrics) if COALESCE_ENABLED else None
+        seen_version = 0
+        seen_responses = 0
+        last_status = None
+        seen_attributes = 0
+        first_message = True
+        notifier = get_notifier(contact_id)
+        # "delta" sends a snapshot and then only changes; "snapshot" keeps the original full payload
+        protocol = websocket.query_params.get("protocol", WS_PROTOCOL)
 
         while True:
-            # Get latest status and transcripts
+            # Anything written after this point wakes the wait at the bottom of the loop
+            notified_version = notifier.version
+
+            # Get latest status and only the segments added since the last push
             status = call_status_store.get(contact_id, {})
-            transcripts = transcription_data.get(contact_id, [])
-            
-            # Sort transcripts by offset time
-            sorted_transcripts = sorted(clean_transcripts(transcripts), key=lambda x: x['offset'])
-            
-            # Format transcript for display
-            formatted_transcript = "\n".join(
-                [f"[{datetime.fromisoformat(t['timestamp']).strftime('%H:%M:%S')}] "
-                 f"{t['participant']}: {t['content']}" 
-                 for t in sorted_transcripts]
-            )
-            
-            # Prepare response
-            response = {
-                "status": status.get('ContactStatus', 'UNKNOWN'),
-                "transcript": formatted_transcript,
-                "timestamp": datetime.now().isoformat(),
-                "ivr_connected": status.get('ContactStatus') in ['CONNECTED', 'IN_PROGRESS'],
-                "attributes": status.get('Attributes', {})
-            }
-
-             # Process new IVR prompts
-            for t in sorted_transcripts:
-                if t['participant'] == 'CUSTOMER':
-                    prompt_hash = hash_segment(t['content'])
-                    if prompt_hash in processed_prompt_hashes:
-                        continue
-                    processed_prompt_hashes.add(prompt_hash)
-                    response_value = await process_ivr_prompt(contact_id, t['content'])
-                    if response_value:
-                        try:
-                            if response_value.get("field") == "press a number" and response_value["value"].isdigit():
-                                dtmf_digits = str(response_value.get("value", ""))
-                                if dtmf_digits.isdigit():
-                                    response["responseSent"] = {
-                                        "timestamp": datetime.now().isoformat(),
-                                        "question": response_value["question"],
-                                        "field": "press a number",
-                                        "value": dtmf_digits
-                                    }
-                                    print(f"Triggering DTMF send for: {dtmf_digits}")
-                                else:
-                                    print(f"Invalid DTMF digits: {dtmf_digits}")
-                        except ClientError as e:
-                            print(f"AWS Client Error: {e.response['Error']['Message']}")
-                        except Exception as e:
-                            print(f"Unexpected error sending DTMF: {str(e)}")
-                        
-                        response["responseSent"] = {
+            store = transcription_data.get(contact_id)
+            new_segments = []
+            formatted_transcript = ""
+            if store is not None:
+                if store.version < seen_version:
+                    # The store was dropped and rebuilt; start over from its first segment
+                    seen_version = 0
+                new_segments = sorted(store.since(seen_version), key=lambda x: x['offset'])
+                seen_version = store.version
+                formatted_transcript = store.render()
+
+            current_status = status.get('ContactStatus', 'UNKNOWN')
+            attributes = status.get('Attributes', {})
+            # Only the keys that moved since this websocket last looked
+            attribute_tracker = attribute_refresher.tracker(contact_id)
+            if attribute_tracker.version < seen_attributes:
+                seen_attributes = 0
+            attribute_diff = attribute_tracker.since(seen_attributes)
+            seen_attributes = attribute_tracker.version
+            ivr_connected = status.get('ContactStatus') in ['CONNECTED', 'IN_PROGRESS']
+
+            # Collect complete IVR prompts with when the IVR finished saying them
+            prompts = []
+            for t in new_segments:
+                if coalescer is None:
+                    if t['participant'] == 'CUSTOMER':
+                        prompts.append((t['content'], time.monotonic()))
+                    continue
+                # Another participant speaking means the IVR finished its prompt
+                ready = coalescer.add(t) if t['participant'] == 'CUSTOMER' else coalescer.flush()
+                prompts.extend((utterance.text, utterance.last_at) for utterance in ready)
+            if coalescer is not None:
+                prompts.extend((utterance.text, utterance.last_at) for utterance in coalescer.due())
+
+            # Decisions run in the contact's IVR worker; answers come back on a later pass
+            for prompt, arrived_at in prompts:
+                ivr_pipeline.submit(contact_id, prompt, arrived_at)
+            responses_sent = []
+            ivr_worker = ivr_pipeline.workers.get(contact_id)
+            if ivr_worker is not None:
+                if ivr_worker.version < seen_responses:
+                    # The worker was replaced; its answers start over
+                    seen_responses = 0
+                responses_sent = ivr_worker.since(seen_responses)
+                seen_responses = ivr_worker.version
+
+            status_changed = current_status != last_status
+            if protocol == "snapshot":
+                if first_message or new_segments or status_changed or attribute_diff or responses_sent:
+                    response = {
+                        "status": current_status,
+                        "transcript": formatted_transcript,
+                        "timestamp": datetime.now().isoformat(),
+                        "ivr_connected": ivr_connected,
+                        "attributes": attributes
+                    }
+                    # One full payload per response so none overwrite each other
+                    for response_sent in responses_sent or [None]:
+                        if response_sent is not None:
+                            response["responseSent"] = response_sent
+                        await websocket.send_json(sanitize_for_json(response))
+            else:
+                if first_message:
+                    await websocket.send_json(sanitize_for_json({
+                        "type": "snapshot",
+                        "version": seen_version,
+                        "status": current_status,
+                        "ivr_connected": ivr_connected,
+                        "attributes": attributes,
+                        "segments": store.segments if store is not None else [],
+                        "transcript": formatted_transcript,
+                        "timestamp": datetime.now().isoformat(),
+                    }))
+                else:
+                    if new_segments:
+                        await websocket.send_json({
+                            "type": "segments",
+                            "version": seen_version,
+                            "segments": new_segments,
+                        })
+                    if status_changed:
+                        await websocket.send_json(sanitize_for_json({
+                            "type": "status",
+                            "version": seen_version,
+                            "status": current_status,
+                            "ivr_connected": ivr_connected,
                             "timestamp": datetime.now().isoformat(),
-                            "question": response_value["question"],
-                            "field": response_value["field"],
-                            "value": response_value["value"]
-                        }
+                        }))
+                    if attribute_diff:
+                        await websocket.send_json(sanitize_for_json({
+                            "type": "attributes",
+                            "version": seen_version,
+                            **attribute_diff,
+                        }))
+                for response_sent in responses_sent:
+                    await websocket.send_json({
+                        "type": "responseSent",
+                        "version": seen_version,
+                        "responseSent": response_sent,
+                    })
+            first_message = False
+            last_status = current_status
 
-            
-            # Send updates to client
-            await websocket.send_json(sanitize_for_json(response))
-            
             # Check if call has ended
-            if response["status"] in ['COMPLETED', 'FAILED']:
-                await websocket.send_json({"status": "COMPLETED", "message": "Call ended"})
+            if current_status in ['COMPLETED', 'FAILED']:
+                await websocket.send_json({"type": "completed", "status": "COMPLETED", "message": "Call ended"})
                 
-                if contact_id in transcription_data:
-                    del transcription_data[contact_id]
-                if contact_id in transcription_sessions:
-                    del transcription_sessions[contact_id]
+                session = transcription_sessions.pop(contact_id)
+                if session is not None:
+                    await session.close()
                 
                 break
 
-                
-            await asyncio.sleep(0.5)
+            # Sleep until the pollers write something new; the timeout is only a safety net,
+            # or wakes the loop when a held utterance is due
+            timeout = WS_IDLE_TIMEOUT
+            if coalescer is not None and coalescer.pending is not None:
+                timeout = min(timeout, coalescer.timeout())
+            await notifier.wait(notified_version, timeout=timeout)
             
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
-        if poll_task:
-            poll_task.cancel()
-        if contact_id in transcription_data:
-            del transcription_data[contact_id]
+        # Polling and the transcript outlive this websocket: the client may reconnect through
+        # another worker mid-call. finish_contact and eviction clean them up once the call ends
+        ingestion_manager.unsubscribe(contact_id)
+
+@app.get("/llm-stats")
+async def get_llm_stats():
+    return {
+        "bedrock": hedged_invoker.stats(),
+        "scheduler": llm_scheduler.stats(),
+        "routing": model_router.stats(),
+        "row_pruning": column_indexes.stats(),
+        "decision_cache": ivr_decision_cache.stats(),
+        "rules": ivr_rule_engine.stats(),
+        "speculation": speculative_decider.stats(),
+        "coalescing": coalescing_metrics.stats(),
+        "pipeline": ivr_pipeline.stats(),
+    }
+
+@app.get("/ingestion-stats")
+async def get_ingestion_stats():
+    return {
+        **ingestion_manager.stats(),
+        "attributes": attribute_refresher.stats(),
+        "transcription": {contact_id: session.stats() for contact_id, session in transcription_sessions.items()},
+        "status_sweep": {"interval": STATUS_SWEEP_INTERVAL, "tracked": len(status_signatures)},
+    }
+
+@app.get("/voice-stats")
+async def get_voice_stats():
+    return voice_hub.stats()
+
+@app.get("/memory-stats")
+async def get_memory_stats():
+    return {
+        "process": process_memory(),
+        "stores": {
+            store.name: store.stats()
+            for store in (call_status_store, transcription_data, transcription_sessions, campaigns,
+                          worklist_store.worklists)
+        },
+        "notifiers": len(contact_notifiers),
+        "segment_cursors": len(segment_cursors),
+        "status_signatures": len(status_signatures),
+        "worklist_rows": sum(len(worklist.rows) for worklist in worklist_store.worklists.values()),
+    }
+
+@app.get("/connect-stats")
+async def get_connect_stats():
+    return connect_scheduler.stats()
 
 @app.get("/call-status/{contact_id}")
 async def get_call_status(contact_id: str):
-    if contact_id not in call_status_store:
+    if not await load_shared_contact(contact_id):
         raise HTTPException(status_code=404, detail="Contact ID not found")
     return call_status_store[contact_id]
     
-# Modified transcription handling
-async def handle_transcription(contact_id):
-    session = aioboto3.Session()
-    transcribe = session.client('transcribe-streaming', region_name=os.getenv("AWS_REGION"))
-    
+async def handle_transcription(contact_id: str, source):
+    """
+    Stream a call's 8 kHz PCM audio (an async iterator of byte chunks) to Transcribe.
+    Final results land in transcription_data like Contact Lens segments do.
+    """
+    async def on_final(segment):
+        if contact_id not in transcription_data:
+            transcription_data[contact_id] = TranscriptStore()
+        added = transcription_data[contact_id].add(segment['content'], segment['participant'], segment['offset'],
+                                                   end_offset=segment['end_offset'])
+        if added is not None:
+            notify_contact(contact_id)
+            await share_segments(contact_id, [added])
+
+    def on_partial(segment, result_id):
+        if SPECULATION_ENABLED and segment['participant'] == 'CUSTOMER' and contact_id in call_status_store:
+            speculative_decider.speculate(contact_id, segment['content'], result_id)
+
+    session = TranscriptionSession(contact_id, source, on_final=on_final, on_partial=on_partial)
+    transcription_sessions[contact_id] = session
     try:
-        stream = await transcribe.start_stream_transcription(
-            LanguageCode='en-US',
-            MediaEncoding='pcm',
-            MediaSampleRateHertz=8000,
-            EnableChannelIdentification=True,
-            NumberOfChannels=1,
-        )
-        
-        transcription_sessions[contact_id] = {
-            'stream': stream,
-            'transcript': ''
-        }
-        
-        async for event in stream.TranscriptResultStream:
-            results = event['Transcript']['Results']
-            if results:
-                transcript = results[0]['Alternatives'][0]['Transcript']
-                transcription_sessions[contact_id]['transcript'] += transcript + ' '
-                
+        await session.run()
     except Exception as e:
         print(f"Transcription error: {str(e)}")
     finally:
-        if contact_id in transcription_sessions:
+        if transcription_sessions.get(contact_id) is session:
             del transcription_sessions[contact_id]
 
+async def websocket_audio(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        if message.get("bytes"):
+            yield message["bytes"]
+
+@app.websocket("/audio-ws/{contact_id}")
+async def audio_websocket(websocket: WebSocket, contact_id: str):
+    """Binary frames of 16-bit mono 8 kHz PCM from a media-stream bridge, transcribed live"""
+    await websocket.accept()
+    await handle_transcription(contact_id, websocket_audio(websocket))
+
 # Run the server
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3001)
\ No newline at end of file
+    # Protocol-level pings catch dead /voice-ws connections from clients that don't answer heartbeats
+    uvicorn.run(app, host="0.0.0.0", port=3001, ws_ping_interval=20, ws_ping_timeout=20)
\ No newline at end of file
@@ -0,0 +1,10 @@
+def percentile(values, fraction: float, default=None):
+    """Nearest-rank percentile of `values`, or `default` when there are none."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else default
+
+
+def percentile_ms(values, fraction: float, default=None):
+    """percentile() of durations in seconds, in milliseconds."""
+    value = percentile(values, fraction)
+    return value * 1000 if value is not None else default
@@ -0,0 +1,199 @@
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Dict
+from dotenv import load_dotenv
+from llm import BEDROCK_MODEL_ID
+from llm_scheduler import DeadlineExceeded
+from metrics import percentile_ms
+from ivr_cache import decision_template
+from ivr_rules import normalize_ivr_text, parse_date
+
+load_dotenv()
+
+# Try a fast model first and only escalate to BEDROCK_MODEL_ID when its answer fails validation
+IVR_ROUTING_ENABLED = os.getenv("IVR_ROUTING_ENABLED", "true").lower() == "true"
+IVR_FAST_MODEL_ID = os.getenv("IVR_FAST_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+# {"value": ..., "field": ...} is about 30 tokens; a fast answer that needs more than this is suspect anyway
+IVR_FAST_MAX_TOKENS = int(os.getenv("IVR_FAST_MAX_TOKENS", "80"))
+# Claude 3 Haiku on Bedrock rejects cache_control, so the fast tier sends the prompt uncached by default
+IVR_FAST_PROMPT_CACHING = os.getenv("IVR_FAST_PROMPT_CACHING", "false").lower() == "true"
+IVR_LARGE_MAX_TOKENS = int(os.getenv("IVR_LARGE_MAX_TOKENS", "300"))
+# Per-tier latencies kept for percentiles
+ROUTING_LATENCY_SAMPLES = 500
+
+NO_MATCH = "No matching data found"
+# Fields the prompt allows besides row_data columns, lower-cased; the prompt itself asks for 'Voice only'
+ROUTING_FIELDS = {"press a number", "voice only", "transfer to agent", "unknown"}
+# Dates are keyed in or spoken in one of these forms
+DATE_ANSWER_FORMATS = ["%m%d%Y", "%m%d%y", "%Y%m%d", "%m/%d/%Y", "%Y-%m-%d"]
+
+_ASKS_FOR_INPUT = re.compile(r"\b(press|enter|say|key in|type|dial)\b")
+_MENU_DIGIT = re.compile(r"\b\d\b")
+_DIGIT_COUNT = re.compile(r"\b(\d+) digit")
+
+
+class ModelTier:
+    def __init__(self, name: str, model_id: str, max_tokens: int, prompt_caching: bool = True):
+        self.name = name
+        self.model_id = model_id
+        self.max_tokens = max_tokens
+        self.prompt_caching = prompt_caching
+
+
+def default_tiers() -> list:
+    large = ModelTier("large", BEDROCK_MODEL_ID, IVR_LARGE_MAX_TOKENS)
+    if not IVR_ROUTING_ENABLED:
+        return [large]
+    return [ModelTier("fast", IVR_FAST_MODEL_ID, IVR_FAST_MAX_TOKENS, IVR_FAST_PROMPT_CACHING), large]
+
+
+def request_body(system_blocks: list, ivr_text: str, tier: ModelTier) -> dict:
+    """The Bedrock request for one IVR prompt on one tier."""
+    if not tier.prompt_caching:
+        system_blocks = [{key: value for key, value in block.items() if key != "cache_control"}
+                         for block in system_blocks]
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": tier.max_tokens,
+        "system": system_blocks,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "IVR_TEXT: " + ivr_text
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def parse_decision(generated_text: str):
+    """{"value", "field"} from a complete model response, or None if it isn't a JSON object."""
+    try:
+        parsed_output = json.loads(generated_text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed_output, dict):
+        return None
+    return {"value": parsed_output.get("value", ""), "field": parsed_output.get("field", "unknown")}
+
+
+def _derived_from_cell(cell, value: str) -> bool:
+    # decision_template can't replay reformatted dates, but they still come from the cell
+    date = parse_date(cell)
+    if date is None:
+        return False
+    answer = value.rstrip("#").strip()
+    return any(answer == date.strftime(fmt) for fmt in DATE_ANSWER_FORMATS)
+
+
+def check_decision(decision, ivr_text: str, row_data: dict):
+    """
+    Why a model answer can't be trusted without escalating, or None if it is
+    consistent with the prompt and row_data: keypresses must be options the IVR
+    offered or digits from the row, and column answers must come from that column.
+    """
+    if decision is None:
+        return "invalid json"
+    value = str(decision.get("value", "")).strip()
+    field = str(decision.get("field", "")).strip()
+    # Column names keep their case; the fixed fields are matched whatever case the model used
+    kind = field.lower()
+    if not value:
+        return "empty value"
+    text = normalize_ivr_text(ivr_text)
+    digits = re.sub(r"\D", "", value)
+    counts = set(_DIGIT_COUNT.findall(text))
+    if len(counts) == 1 and digits and len(digits) != int(counts.pop()):
+        return "digit count differs from prompt"
+
+    if kind == "press a number":
+        keys = value.rstrip("#")
+        if not re.fullmatch(r"[0-9*]+", keys):
+            return "keypress is not digits"
+        if len(keys) == 1:
+            return None if keys in _MENU_DIGIT.findall(text) else "option not offered"
+        if not any(keys == re.sub(r"\D", "", str(cell)) for cell in row_data.values()):
+            return "keypress digits not in row"
+        return None
+    if kind == "unknown":
+        if value != NO_MATCH:
+            return "unknown field with a value"
+        # Low confidence: the IVR wants something and the fast model found nothing to give it
+        return "no match on a prompt asking for input" if _ASKS_FOR_INPUT.search(text) else None
+    if kind in ROUTING_FIELDS:
+        return None
+    if field not in row_data:
+        return "field not in row_data"
+    if decision_template(row_data, value, field) is None and not _derived_from_cell(row_data[field], value):
+        return "value not from its column"
+    return None
+
+
+class ModelRouter:
+    """
+    Runs an IVR prompt through the model tiers in order. Every tier but the last
+    must pass check_decision; a failing or erroring tier escalates to the next.
+    `await ask(tier)` returns (decision dict or None, generated text).
+    """
+
+    def __init__(self, tiers: list = None):
+        self.tiers = tiers or default_tiers()
+        self.counts: Dict[str, dict] = {
+            tier.name: {"calls": 0, "answered": 0, "escalated": 0, "errors": 0} for tier in self.tiers
+        }
+        self.latencies: Dict[str, deque] = {tier.name: deque(maxlen=ROUTING_LATENCY_SAMPLES) for tier in self.tiers}
+        self.escalation_reasons: Dict[str, int] = {}
+
+    async def decide(self, ask, ivr_text: str, row_data: dict):
+        """Returns (decision or None, tier that answered, generated text)."""
+        for position, tier in enumerate(self.tiers):
+            last = position == len(self.tiers) - 1
+            counts = self.counts[tier.name]
+            counts["calls"] += 1
+            started = time.monotonic()
+            try:
+                decision, generated_text = await ask(tier)
+            except DeadlineExceeded:
+                # A bigger model won't make the deadline either
+                raise
+            except Exception as e:
+                counts["errors"] += 1
+                if last:
+                    raise
+                reason = "model error"
+                print(f"{tier.name} model error, escalating: {e}")
+            else:
+                self.latencies[tier.name].append(time.monotonic() - started)
+                reason = None if last else check_decision(decision, ivr_text, row_data)
+                if reason is None:
+                    counts["answered"] += 1
+                    return decision, tier, generated_text
+                print(f"Escalating IVR prompt from {tier.name}: {reason} ({generated_text!r})")
+            counts["escalated"] += 1
+            self.escalation_reasons[reason] = self.escalation_reasons.get(reason, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": IVR_ROUTING_ENABLED,
+            "tiers": {
+                tier.name: {
+                    "model_id": tier.model_id,
+                    "max_tokens": tier.max_tokens,
+                    **self.counts[tier.name],
+                    "latency_ms": {"p50": percentile_ms(self.latencies[tier.name], 0.5),
+                                   "p95": percentile_ms(self.latencies[tier.name], 0.95)},
+                }
+                for tier in self.tiers
+            },
+            "escalation_reasons": dict(self.escalation_reasons),
+        }
+
+
+model_router = ModelRouter()
@@ -0,0 +1,11 @@
+import hashlib
+
+
+def normalize_segment(content: str) -> str:
+    """Collapse whitespace and lowercase so repeated IVR prompts compare equal."""
+    return " ".join(content.strip().lower().split())
+
+
+def hash_segment(content: str) -> str:
+    """Generate a hash for content after normalizing whitespace and case."""
+    return hashlib.sha256(normalize_segment(content).encode()).hexdigest()
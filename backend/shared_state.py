@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "memory" keeps everything in this process; "redis" shares state across workers and nodes
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+STATE_KEY_PREFIX = os.getenv("STATE_KEY_PREFIX", "integrity:")
+# Redis connections per worker; commands beyond this wait for a free one instead of failing
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Redis expires contact records and transcripts this long after their last write
+SHARED_STATE_TTL_SECONDS = int(os.getenv("SHARED_STATE_TTL_SECONDS", str(12 * 3600)))
+
+# Identifies this process in published messages so it can skip its own updates
+WORKER_ID = uuid.uuid4().hex[:8]
+
+
+class StateBackend(ABC):
+    """
+    Contact state, transcript segments and pub/sub shared by every API worker.
+    Messages are JSON-serializable dicts; `subscribe` yields (channel, message).
+    `shared` is False when the backend is only visible to this process.
+    """
+
+    shared = False
+
+    @abstractmethod
+    async def put_contact(self, contact_id: str, record: dict):
+        ...
+
+    @abstractmethod
+    async def get_contact(self, contact_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def add_segments(self, contact_id: str, segments: List[dict]):
+        ...
+
+    @abstractmethod
+    async def get_segments(self, contact_id: str) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict):
+        ...
+
+    @abstractmethod
+    def subscribe(self, channels: List[str]):
+        """An async generator of (channel, message)."""
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """Single-process backend; pub/sub still works so callers need no special case."""
+
+    def __init__(self):
+        self.contacts: Dict[str, dict] = {}
+        self.segments: Dict[str, List[dict]] = {}
+        self._subscribers: Dict[str, set] = {}
+
+    async def put_contact(self, contact_id: str, record: dict):
+        self.contacts[contact_id] = json.loads(json.dumps(record))
+
+    async def get_contact(self, contact_id: str) -> Optional[dict]:
+        return self.contacts.get(contact_id)
+
+    async def add_segments(self, contact_id: str, segments: List[dict]):
+        self.segments.setdefault(contact_id, []).extend(segments)
+
+    async def get_segments(self, contact_id: str) -> List[dict]:
+        return list(self.segments.get(contact_id, []))
+
+    async def publish(self, channel: str, message: dict):
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait((channel, json.loads(json.dumps(message))))
+
+    async def subscribe(self, channels: List[str]):
+        queue = asyncio.Queue()
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for channel in channels:
+                self._subscribers[channel].discard(queue)
+
+
+class RedisBackend(StateBackend):
+    """
+    Shared backend on redis.asyncio, which handles pooling, reconnects, AUTH and TLS
+    (rediss:// URLs). Contact records are JSON strings, transcripts are lists of
+    JSON segments and broadcasts use PUBLISH/SUBSCRIBE; every key and channel is
+    namespaced with STATE_KEY_PREFIX.
+    """
+
+    shared = True
+
+    def __init__(self, url: str = None, prefix: str = None, ttl_seconds: int = None):
+        import redis.asyncio as redis
+
+        # RESP2 whatever the redis-py version defaults to; it is all these commands need
+        pool = redis.BlockingConnectionPool.from_url(url or REDIS_URL, decode_responses=True, protocol=2,
+                                                     max_connections=REDIS_MAX_CONNECTIONS)
+        self.client = redis.Redis.from_pool(pool)
+        self.prefix = STATE_KEY_PREFIX if prefix is None else prefix
+        self.ttl_seconds = ttl_seconds or SHARED_STATE_TTL_SECONDS
+
+    def _key(self, kind: str, contact_id: str) -> str:
+        return f"{self.prefix}{kind}:{contact_id}"
+
+    async def put_contact(self, contact_id: str, record: dict):
+        await self.client.set(self._key("contact", contact_id), json.dumps(record), ex=self.ttl_seconds)
+
+    async def get_contact(self, contact_id: str) -> Optional[dict]:
+        value = await self.client.get(self._key("contact", contact_id))
+        return json.loads(value) if value is not None else None
+
+    async def add_segments(self, contact_id: str, segments: List[dict]):
+        if not segments:
+            return
+        key = self._key("segments", contact_id)
+        # One round trip for the append and the TTL refresh
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *[json.dumps(segment) for segment in segments])
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def get_segments(self, contact_id: str) -> List[dict]:
+        values = await self.client.lrange(self._key("segments", contact_id), 0, -1)
+        return [json.loads(value) for value in values]
+
+    async def publish(self, channel: str, message: dict):
+        await self.client.publish(self.prefix + channel, json.dumps(message))
+
+    async def subscribe(self, channels: List[str]):
+        # A subscribed connection can't run other commands, so pubsub takes its own
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(*[self.prefix + channel for channel in channels])
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["channel"][len(self.prefix):], json.loads(message["data"])
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_state_backend(kind: str = None) -> StateBackend:
+    kind = (kind or STATE_BACKEND).lower()
+    if kind == "redis":
+        return RedisBackend()
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown STATE_BACKEND '{kind}'")
+
+
+state_backend = create_state_backend()
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import re
+import time
+from typing import Dict
+from dotenv import load_dotenv
+from ivr_rules import normalize_ivr_text
+
+load_dotenv()
+
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "true").lower() == "true"
+# Don't guess at a prompt shorter than this
+SPECULATION_MIN_WORDS = int(os.getenv("SPECULATION_MIN_WORDS", "4"))
+# A growing utterance is only re-issued once it has gained this many words
+SPECULATION_MIN_NEW_WORDS = int(os.getenv("SPECULATION_MIN_NEW_WORDS", "3"))
+
+# Utterances per contact with a speculation still waiting for their final text
+SPECULATION_MAX_OPEN = 3
+
+# Words that can change what we should answer; a tail without them doesn't change the decision
+DECISION_WORDS = {"press", "enter", "say", "dial", "key", "type", "option", "pound", "star", "not", "if", "or", "for"}
+
+
+def _words(text: str) -> list:
+    return normalize_ivr_text(text).split()
+
+
+def tail_is_neutral(tail: list) -> bool:
+    """True when words appended to a prompt carry no digit or menu keyword."""
+    return not any(word in DECISION_WORDS or re.search(r"\d", word) for word in tail)
+
+
+class Speculation:
+    def __init__(self, text: str, words: list, task: asyncio.Task):
+        self.text = text
+        self.words = words
+        self.task = task
+        self.started = time.monotonic()
+        self.finished = None
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self.finished = time.monotonic()
+
+    def matches(self, words: list) -> bool:
+        """The final text is the speculated text plus, at most, words that can't change the answer."""
+        return words[:len(self.words)] == self.words and tail_is_neutral(words[len(self.words):])
+
+
+class SpeculativeDecider:
+    """
+    Starts `decide(contact_id, text)` on partial CUSTOMER text before the final
+    segment exists, one speculation per utterance. Material changes to the text
+    cancel and re-issue it; when the final text arrives, commit() hands back the
+    speculative answer if the final text only differs by words that can't change
+    the decision.
+    """
+
+    def __init__(self, decide, min_words: int = None, min_new_words: int = None):
+        self.decide = decide
+        self.min_words = min_words or SPECULATION_MIN_WORDS
+        self.min_new_words = min_new_words or SPECULATION_MIN_NEW_WORDS
+        # contact_id -> utterance_id -> speculation, oldest utterance first
+        self.speculations: Dict[str, Dict[str, Speculation]] = {}
+        self.started = 0
+        self.cancelled = 0
+        self.committed = 0
+        self.discarded = 0
+        self.saved_ms_total = 0.0
+
+    def _material(self, current: Speculation, words: list) -> bool:
+        if words == current.words:
+            return False
+        grown = words[:len(current.words)] == current.words
+        if not grown:
+            return True
+        tail = words[len(current.words):]
+        return len(tail) >= self.min_new_words or not tail_is_neutral(tail)
+
+    def speculate(self, contact_id: str, text: str, utterance_id: str = "current"):
+        """Feed the latest partial text of one of a contact's utterances."""
+        words = _words(text)
+        if len(words) < self.min_words:
+            return
+        open_utterances = self.speculations.setdefault(contact_id, {})
+        current = open_utterances.get(utterance_id)
+        if current is not None and not self._material(current, words):
+            return
+        if current is not None:
+            self._cancel(current)
+            self.cancelled += 1
+            del open_utterances[utterance_id]
+        while len(open_utterances) >= SPECULATION_MAX_OPEN:
+            # Its final text never showed up
+            self._cancel(open_utterances.pop(next(iter(open_utterances))))
+            self.discarded += 1
+        task = asyncio.create_task(self.decide(contact_id, text))
+        open_utterances[utterance_id] = Speculation(text, words, task)
+        self.started += 1
+
+    def _cancel(self, speculation: Speculation):
+        if not speculation.task.done():
+            speculation.task.cancel()
+
+    async def commit(self, contact_id: str, final_text: str):
+        """The speculative answer for `final_text`, or None if it has to be decided afresh."""
+        open_utterances = self.speculations.get(contact_id)
+        if not open_utterances:
+            return None
+        words = _words(final_text)
+        utterance_id = next((key for key, speculation in open_utterances.items() if speculation.matches(words)), None)
+        if utterance_id is None:
+            return None
+        speculation = open_utterances.pop(utterance_id)
+        arrived = time.monotonic()
+        # wait() rather than awaiting the task, so forget() cancelling it doesn't cancel the caller
+        await asyncio.wait([speculation.task])
+        if speculation.task.cancelled() or speculation.task.exception() is not None:
+            print(f"Speculative decision failed for {contact_id}")
+            self.discarded += 1
+            return None
+        result = speculation.task.result()
+        # Whatever ran before the final text arrived is latency the caller no longer waits for
+        self.saved_ms_total += (min(arrived, speculation.finished) - speculation.started) * 1000
+        self.committed += 1
+        return result
+
+    def forget(self, contact_id: str):
+        for speculation in self.speculations.pop(contact_id, {}).values():
+            self._cancel(speculation)
+
+    def stats(self) -> dict:
+        wasted = self.cancelled + self.discarded
+        return {
+            "enabled": SPECULATION_ENABLED,
+            "open": sum(len(open_utterances) for open_utterances in self.speculations.values()),
+            "started": self.started,
+            "committed": self.committed,
+            "cancelled": self.cancelled,
+            "discarded": self.discarded,
+            "wasted_call_rate": wasted / self.started if self.started else 0.0,
+            "saved_ms_total": self.saved_ms_total,
+            "saved_ms_per_commit": self.saved_ms_total / self.committed if self.committed else 0.0,
+        }
@@ -0,0 +1,178 @@
+import itertools
+import os
+import sys
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How long a finished contact's state stays around for late /call-status reads and reconnects
+CONTACT_STATE_TTL_SECONDS = float(os.getenv("CONTACT_STATE_TTL_SECONDS", "1800"))
+# Hard cap per store; finished contacts go first, then the longest-idle active ones
+CONTACT_STATE_MAX_ENTRIES = int(os.getenv("CONTACT_STATE_MAX_ENTRIES", "5000"))
+# Active contacts not written for this long are assumed lost (e.g. the sweeper never saw them end)
+CONTACT_STATE_MAX_IDLE_SECONDS = float(os.getenv("CONTACT_STATE_MAX_IDLE_SECONDS", str(12 * 3600)))
+# Sizing a store walks its entries on the event loop, so stats() measures a sample of this many
+# entries, scales it to the whole store and reuses the figure for MEMORY_STATS_INTERVAL seconds
+MEMORY_STATS_SAMPLE = int(os.getenv("MEMORY_STATS_SAMPLE", "200"))
+MEMORY_STATS_INTERVAL = float(os.getenv("MEMORY_STATS_INTERVAL", "30"))
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """Approximate bytes held by an object and everything it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class ContactStore:
+    """
+    Per-contact state with bounded lifetime. Entries are kept while the call is
+    active, expire `ttl_seconds` after finish() and are evicted oldest-finished
+    first once the store holds more than `max_entries`. `on_evict(key, value)`
+    runs for every entry dropped by expiry or the size cap (not for explicit deletes).
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = None, max_entries: int = None,
+                 max_idle_seconds: float = None, on_evict=None):
+        self.name = name
+        self.ttl_seconds = CONTACT_STATE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = max_entries or CONTACT_STATE_MAX_ENTRIES
+        self.max_idle_seconds = CONTACT_STATE_MAX_IDLE_SECONDS if max_idle_seconds is None else max_idle_seconds
+        self.on_evict = on_evict
+        self._entries = {}
+        # key -> last write, least recently written first
+        self._updated = OrderedDict()
+        # key -> finish time, earliest finished first
+        self._finished = OrderedDict()
+        self.evicted = {"ttl": 0, "idle": 0, "size": 0}
+        self._approx_bytes = None
+        self._sized_at = 0.0
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def __setitem__(self, key, value):
+        self._entries[key] = value
+        self._updated[key] = time.monotonic()
+        self._updated.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._evict_to_size()
+
+    def __delitem__(self, key):
+        del self._entries[key]
+        self._updated.pop(key, None)
+        self._finished.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def pop(self, key, default=None):
+        if key not in self._entries:
+            return default
+        value = self._entries[key]
+        del self[key]
+        return value
+
+    def items(self):
+        return list(self._entries.items())
+
+    def values(self):
+        return list(self._entries.values())
+
+    def finish(self, key):
+        """Start the TTL for a contact whose call has ended."""
+        if key in self._entries and key not in self._finished:
+            self._finished[key] = time.monotonic()
+
+    def is_finished(self, key) -> bool:
+        return key in self._finished
+
+    def _evict(self, key, reason: str):
+        value = self._entries.get(key)
+        del self[key]
+        self.evicted[reason] += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _evict_to_size(self):
+        while len(self._entries) > self.max_entries and self._finished:
+            self._evict(next(iter(self._finished)), "size")
+        while len(self._entries) > self.max_entries:
+            key = next(iter(self._updated))
+            print(f"{self.name}: evicting active contact {key}, store is over {self.max_entries} entries")
+            self._evict(key, "size")
+
+    def evict_expired(self, now: float = None) -> int:
+        """Drop finished entries past the TTL and active ones idle for too long."""
+        now = time.monotonic() if now is None else now
+        before = len(self._entries)
+        while self._finished:
+            key, finished_at = next(iter(self._finished.items()))
+            if now - finished_at < self.ttl_seconds:
+                break
+            self._evict(key, "ttl")
+        while self._updated:
+            key, updated = next(iter(self._updated.items()))
+            if now - updated < self.max_idle_seconds:
+                break
+            self._evict(key, "idle")
+        return before - len(self._entries)
+
+    def approx_bytes(self) -> int:
+        """Estimated memory held by the entries, from a cached sample."""
+        now = time.monotonic()
+        if self._approx_bytes is None or now - self._sized_at >= MEMORY_STATS_INTERVAL:
+            keys = list(itertools.islice(self._updated, MEMORY_STATS_SAMPLE))
+            sampled = deep_sizeof({key: self._entries[key] for key in keys})
+            self._approx_bytes = sampled * len(self._entries) // len(keys) if keys else 0
+            self._sized_at = now
+        return self._approx_bytes
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "active": len(self._entries) - len(self._finished),
+            "finished": len(self._finished),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted": dict(self.evicted),
+            "approx_bytes": self.approx_bytes(),
+        }
+
+
+def process_memory() -> dict:
+    """Resident and peak memory of this worker, where the platform reports it."""
+    memory = {}
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        memory["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as statm:
+            memory["rss_bytes"] = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    return memory
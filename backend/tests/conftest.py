@@ -0,0 +1,7 @@
+import os
+
+# Module-level singletons are built at import: keep the decision cache in memory and state in-process
+os.environ.setdefault("IVR_CACHE_PATH", "")
+os.environ.setdefault("STATE_BACKEND", "memory")
+# main.py builds its boto3 clients at import
+os.environ.setdefault("AWS_REGION", "us-east-1")
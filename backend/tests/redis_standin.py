@@ -0,0 +1,128 @@
+"""
+A small in-process server speaking enough of the Redis protocol for
+shared_state.RedisBackend on redis-py: HELLO (RESP2 only), PING, AUTH, SELECT,
+GET, SET (EX), DEL, RPUSH, LRANGE, EXPIRE, PUBLISH and SUBSCRIBE. Expiry is
+accepted but not enforced, and other commands (e.g. CLIENT SETINFO) get an
+error reply. Used by the tests and benchmarks/cross_worker_state.py; run it on
+its own to point a couple of local uvicorn workers at it:
+
+    python tests/redis_standin.py --port 6390
+    STATE_BACKEND=redis REDIS_URL=redis://localhost:6390/0 uvicorn main:app --workers 2
+"""
+import argparse
+import asyncio
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, Exception):
+        # An error whose message starts with an upper-case code is sent as is, e.g. NOPROTO
+        message = str(value)
+        prefix = b"" if message.split(" ")[0].isupper() else b"ERR "
+        return b"-%s%s\r\n" % (prefix, message.encode())
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    count = int(line[1:-2])
+    args = []
+    for _ in range(count):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+class StandInRedis:
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+        self.channels = {}
+        self.commands = 0
+        self.server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self.server = await asyncio.start_server(self._client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _client(self, reader, writer):
+        subscribed = []
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                self.commands += 1
+                name = args[0].upper().decode()
+                if name == "SUBSCRIBE":
+                    for index, channel in enumerate(args[1:], start=1):
+                        self.channels.setdefault(channel, set()).add(writer)
+                        subscribed.append(channel)
+                        writer.write(encode([b"subscribe", channel, index]))
+                else:
+                    writer.write(encode(self._run(name, args[1:])))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscribed:
+                self.channels[channel].discard(writer)
+            writer.close()
+
+    def _run(self, name, args):
+        if name == "HELLO":
+            # redis-py 6+ opens every connection with HELLO; only RESP2 is spoken here
+            if args and args[0] != b"2":
+                return ValueError("NOPROTO unsupported protocol version")
+            return [b"server", b"redis", b"version", b"7.2.0", b"proto", 2, b"id", 1,
+                    b"mode", b"standalone", b"role", b"master", b"modules", []]
+        if name in ("PING", "AUTH", "SELECT"):
+            return "PONG" if name == "PING" else "OK"
+        if name == "SET":
+            self.values[args[0]] = args[1]
+            return "OK"
+        if name == "GET":
+            return self.values.get(args[0])
+        if name == "DEL":
+            return sum(1 for key in args if self.values.pop(key, None) is not None or self.lists.pop(key, None) is not None)
+        if name == "RPUSH":
+            self.lists.setdefault(args[0], []).extend(args[1:])
+            return len(self.lists[args[0]])
+        if name == "LRANGE":
+            items = self.lists.get(args[0], [])
+            start, stop = int(args[1]), int(args[2])
+            return items[start:None if stop == -1 else stop + 1]
+        if name == "EXPIRE":
+            return 1
+        if name == "PUBLISH":
+            receivers = self.channels.get(args[0], set())
+            for writer in receivers:
+                writer.write(encode([b"message", args[0], args[1]]))
+            return len(receivers)
+        return ValueError(f"unknown command '{name}'")
+
+
+async def serve(port: int):
+    standin = StandInRedis()
+    port = await standin.start(port=port)
+    print(f"Stand-in Redis listening on 127.0.0.1:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=6390)
+    asyncio.run(serve(parser.parse_args().port))
@@ -0,0 +1,62 @@
+import asyncio
+
+from attributes import AttributeRefresher, AttributeTracker
+
+
+def test_tracker_diffs_and_merges_since_a_version():
+    tracker = AttributeTracker()
+    assert tracker.apply({"step": "menu"}) == {"changed": {"step": "menu"}, "removed": []}
+    assert tracker.apply({"step": "menu"}) is None
+    seen = tracker.version
+    tracker.apply({"step": "npi", "npi": "1447914288"})
+    tracker.apply({"step": "dob"})
+    assert tracker.since(seen) == {"changed": {"step": "dob"}, "removed": ["npi"]}
+    assert tracker.since(tracker.version) is None
+
+
+def test_requests_fold_into_one_fetch_and_rerun_once_mid_fetch():
+    async def run():
+        refresher = AttributeRefresher()
+        fetched = asyncio.Event()
+        release = asyncio.Event()
+        fetches, changes = [], []
+
+        async def fetch(contact_id):
+            fetches.append(contact_id)
+            fetched.set()
+            await release.wait()
+            return {"step": f"step-{len(fetches)}"}
+
+        async def on_change(contact_id, attributes, diff):
+            changes.append(attributes["step"])
+
+        task = refresher.request("c1", fetch, on_change, delay=0.01, reason="status CONNECTED")
+        # Still waiting to fetch: folded into the pending refresh
+        refresher.request("c1", fetch, on_change, delay=0.01, reason="response sent")
+        await fetched.wait()
+        # Mid-fetch: the flow may have moved on, so one more fetch follows, however many requests arrive
+        refresher.request("c1", fetch, on_change, reason="status IN_PROGRESS")
+        refresher.request("c1", fetch, on_change, reason="response sent")
+        release.set()
+        await task
+        return refresher, fetches, changes
+
+    refresher, fetches, changes = asyncio.run(run())
+    assert len(fetches) == 2 and changes == ["step-1", "step-2"]
+    assert refresher.stats()["coalesced"] == 1 and refresher.stats()["pending"] == 0
+
+
+def test_fetch_errors_are_counted_not_raised():
+    async def run():
+        refresher = AttributeRefresher()
+
+        async def fetch(contact_id):
+            raise RuntimeError("throttled")
+
+        async def on_change(contact_id, attributes, diff):
+            raise AssertionError("no change without attributes")
+
+        await refresher.request("c1", fetch, on_change)
+        return refresher
+
+    assert asyncio.run(run()).stats()["errors"] == 1
@@ -0,0 +1,80 @@
+import asyncio
+
+from broadcast import BroadcastHub, HEARTBEAT_MESSAGE
+
+
+class StandInSocket:
+    """A websocket whose sends take `delay` seconds, or block until released when `stalled`."""
+
+    def __init__(self, delay=0.0, stalled=False, error=None):
+        self.delay = delay
+        self.stalled = asyncio.Event() if stalled else None
+        self.error = error
+        self.received = []
+        self.closed = False
+
+    async def send_text(self, message):
+        if self.error is not None:
+            raise self.error
+        if self.stalled is not None:
+            await self.stalled.wait()
+        await asyncio.sleep(self.delay)
+        self.received.append(message)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_slow_client_does_not_hold_up_the_rest():
+    async def run():
+        hub = BroadcastHub(queue_size=4, policy="drop_oldest")
+        fast, stalled = StandInSocket(), StandInSocket(stalled=True)
+        hub.connect(fast)
+        slow_client = hub.connect(stalled)
+        for index in range(10):
+            assert hub.broadcast(str(index)) == 2
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        queued = list(slow_client.queue._queue)
+        await hub.close()
+        return hub, fast, queued
+
+    hub, fast, queued = asyncio.run(run())
+    assert fast.received == [str(index) for index in range(10)]
+    # The stalled client keeps only the newest messages
+    assert queued == ["6", "7", "8", "9"] and hub.stats()["dropped"] > 0
+
+
+def test_disconnect_policy_and_send_errors_close_the_socket():
+    async def run():
+        hub = BroadcastHub(queue_size=1, policy="disconnect")
+        stalled, broken = StandInSocket(stalled=True), StandInSocket(error=ConnectionError("gone"))
+        hub.connect(stalled)
+        hub.connect(broken)
+        for index in range(3):
+            hub.broadcast(str(index))
+            await asyncio.sleep(0.01)
+        return hub, stalled, broken
+
+    hub, stalled, broken = asyncio.run(run())
+    assert hub.stats()["clients"] == 0
+    assert hub.closed["slow"] == 1 and hub.closed["send_error"] == 1
+    assert stalled.closed and broken.closed
+
+
+def test_silent_heartbeat_client_is_dropped():
+    async def run():
+        hub = BroadcastHub(heartbeat_interval=0.01, heartbeat_timeout=0.05)
+        answering, silent = StandInSocket(), StandInSocket()
+        answering_client = hub.connect(answering, heartbeat=True)
+        hub.connect(silent, heartbeat=True)
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            hub.seen(answering_client)
+        clients = len(hub.clients)
+        await hub.close()
+        return hub, clients, answering, silent
+
+    hub, clients, answering, silent = asyncio.run(run())
+    assert clients == 1 and hub.closed["heartbeat"] == 1
+    assert silent.closed and HEARTBEAT_MESSAGE in answering.received
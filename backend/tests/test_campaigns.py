@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+import campaigns as campaigns_module
+from campaigns import Campaign, campaigns
+
+ROWS = [{"Phone": "8005550101"}, {"Phone": "8005550102"}, {"Phone": ""}]
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(campaigns_module, "CAMPAIGN_DIAL_INTERVAL", 0)
+    monkeypatch.setattr(campaigns_module, "CAMPAIGN_RETRY_BASE_SECONDS", 0)
+
+
+def test_rows_complete_retry_and_fail():
+    outcomes = {"+18005550101": [("COMPLETED", "CUSTOMER_DISCONNECT")],
+                "+18005550102": [("COMPLETED", "TELECOM_PROBLEM")] * 2}
+    dialed = []
+
+    async def dial(phone, row_data, selected_option):
+        dialed.append(phone)
+        return f"{phone}-{len(dialed)}"
+
+    async def wait_for_outcome(contact_id):
+        return outcomes[contact_id.split("-")[0]].pop(0)
+
+    campaign = Campaign(ROWS, "Claims", concurrency=2, max_attempts=2)
+    asyncio.run(campaign.run(dial, wait_for_outcome))
+
+    statuses = [row.status for row in campaign.rows]
+    assert statuses == ["completed", "failed", "skipped"]
+    assert campaign.rows[1].attempts == 2 and len(campaign.rows[1].contact_ids) == 2
+    assert campaign.status == "completed" and campaign.progress()["finished"] == 3
+
+
+def test_finished_campaigns_expire():
+    campaign = Campaign(ROWS, "Claims")
+    campaigns[campaign.id] = campaign
+    later = time.monotonic() + campaigns_module.CAMPAIGN_TTL_SECONDS * 365
+    campaigns.evict_expired(now=later)
+    # Still running: never expires, however long it takes
+    assert campaign.id in campaigns
+    campaigns.finish(campaign.id)
+    campaigns.evict_expired()
+    assert campaign.id in campaigns
+    campaigns.evict_expired(now=later)
+    assert campaign.id not in campaigns
+
+
+def test_cancel_settles_rows_on_a_call():
+    async def run():
+        answered = asyncio.Event()
+
+        async def dial(phone, row_data, selected_option):
+            return f"contact-{phone}"
+
+        async def wait_for_outcome(contact_id):
+            answered.set()
+            await asyncio.sleep(3600)
+
+        campaign = Campaign(ROWS, "Claims", concurrency=1)
+        task = asyncio.create_task(campaign.run(dial, wait_for_outcome))
+        await answered.wait()
+        assert campaign.rows[0].status == "in_progress"
+        campaign.cancel()
+        await asyncio.wait_for(task, 1)
+        return campaign
+
+    campaign = asyncio.run(run())
+    assert [row.status for row in campaign.rows] == ["cancelled", "cancelled", "skipped"]
+    assert campaign.rows[0].contact_id == "contact-+18005550101"
+    assert campaign.status == "cancelled" and campaign.progress()["finished"] == 3
+
+
+def test_cancel_during_a_dial_still_records_the_call():
+    async def run():
+        dialing = asyncio.Event()
+        placed = []
+
+        async def dial(phone, row_data, selected_option):
+            dialing.set()
+            # The Connect request is already on its way
+            await asyncio.sleep(0.05)
+            placed.append(phone)
+            return f"contact-{phone}"
+
+        async def wait_for_outcome(contact_id):
+            await asyncio.sleep(3600)
+
+        campaign = Campaign(ROWS, "Claims", concurrency=1)
+        task = asyncio.create_task(campaign.run(dial, wait_for_outcome))
+        await dialing.wait()
+        campaign.cancel()
+        await asyncio.wait_for(task, 1)
+        return campaign, placed
+
+    campaign, placed = asyncio.run(run())
+    assert placed == ["+18005550101"]
+    assert campaign.rows[0].contact_id == "contact-+18005550101" and campaign.rows[0].status == "cancelled"
+    assert campaign.rows[1].contact_ids == []
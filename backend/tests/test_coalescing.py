@@ -0,0 +1,42 @@
+from coalescing import CoalescingMetrics, UtteranceCoalescer, segment_end
+
+
+def segment(content, offset, end_offset=None):
+    return {"content": content, "offset": offset, "end_offset": end_offset}
+
+
+def test_segment_end_is_estimated_without_an_end_offset():
+    assert segment_end(segment("one two", 1000, 1400)) == 1400
+    assert segment_end(segment("one two", 1000)) == 1700
+
+
+def test_adjacent_fragments_become_one_utterance():
+    metrics = CoalescingMetrics()
+    coalescer = UtteranceCoalescer("c1", metrics, max_gap_ms=1200, silence_ms=3000, max_wait_ms=8000)
+    assert coalescer.add(segment("please enter your", 0, 1000), now=0) == []
+    assert coalescer.add(segment("member ID", 1500, 2200), now=1) == []
+    # Quiet, but not for long enough yet
+    assert coalescer.due(now=2) == [] and coalescer.timeout(now=2) == 2
+    (utterance,) = coalescer.due(now=4)
+    assert utterance.text == "please enter your member ID"
+    assert coalescer.timeout() is None
+    stats = metrics.stats()
+    assert stats["fragments"] == 2 and stats["utterances"] == 1 and stats["decisions_saved"] == 1
+    assert stats["contacts"]["c1"]["added_wait_ms_max"] == 3000
+
+
+def test_gap_hands_on_the_pending_utterance():
+    coalescer = UtteranceCoalescer("c1", max_gap_ms=1200, silence_ms=3000, max_wait_ms=8000)
+    coalescer.add(segment("thank you for calling", 0, 1500), now=0)
+    (utterance,) = coalescer.add(segment("press 1 for claims", 5000, 6500), now=1)
+    assert utterance.text == "thank you for calling"
+    assert [utterance.text for utterance in coalescer.flush(now=1)] == ["press 1 for claims"]
+
+
+def test_growing_utterance_is_held_at_most_max_wait():
+    coalescer = UtteranceCoalescer("c1", max_gap_ms=1200, silence_ms=3000, max_wait_ms=8000)
+    for second in range(8):
+        coalescer.add(segment(f"word {second}", second * 1000, second * 1000 + 500), now=second)
+    assert coalescer.timeout(now=7) == 1
+    (utterance,) = coalescer.due(now=8)
+    assert len(utterance.fragments) == 8
@@ -0,0 +1,42 @@
+from column_index import ColumnIndex, ColumnIndexStore
+
+ROW = {
+    "Provider Name": "HARMONY OAKS", "Billing Provider NPI": "1447914288", "TAX_ID": "843612075",
+    "Patient First Name": "Jane", "DOB": "01/01/1990", "Member ID": "W123456789", "Claim Number": "7845120093",
+    "Authorization Number": "AUTH-99812", "Provider Zip": "76102", "Notes": "auth on file",
+}
+
+
+def test_concept_prompts_pick_their_columns():
+    index = ColumnIndex(ROW)
+    assert "Billing Provider NPI" in index.candidates("Please enter the provider's 10 digit NPI number.")
+    assert "TAX_ID" in index.candidates("Please enter your 9 digit tax ID.")
+    assert "DOB" in index.candidates("Enter the patient's date of birth.")
+    assert index.candidates("Please enter the authorization number.") == ["Authorization Number"]
+
+
+def test_digit_count_matches_column_values():
+    columns = ColumnIndex(ROW).candidates("Please enter the 10 digit number followed by pound.")
+    assert "Billing Provider NPI" in columns and "Claim Number" in columns
+    assert "TAX_ID" not in columns
+
+
+def test_menus_fall_back_to_the_full_row():
+    index = ColumnIndex(ROW)
+    assert index.candidates("If you are a provider press 1. If you are a member press 2.") is not None
+    assert index.candidates("Your call may be monitored or recorded.") is None
+
+
+def test_store_prunes_and_counts():
+    store = ColumnIndexStore()
+    store.build("c1", ROW)
+    pruned = store.prune("c1", ROW, "Please enter the claim number.")
+    assert pruned == {"Claim Number": "7845120093"}
+    assert store.prune("c1", ROW, "Please hold.") is None
+    # An index built on demand for a contact shared from another worker
+    assert store.prune("c2", ROW, "Please enter the claim number.") == pruned
+    stats = store.stats()
+    assert stats["prompts"] == 3 and stats["pruned"] == 2 and stats["fallbacks"] == 1
+    assert stats["row_tokens_saved_estimate"] > 0
+    store.forget("c1")
+    assert "c1" not in store.indexes
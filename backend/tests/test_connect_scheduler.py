@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+import connect_scheduler as connect_scheduler_module
+from connect_scheduler import (ConnectScheduler, ScheduledClient, TokenBucket, PRIORITY_DIAL, PRIORITY_IVR_TRANSCRIPT,
+                               PRIORITY_STATUS)
+
+
+class StandInClientError(Exception):
+    def __init__(self, code, status=400):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}
+
+
+class StandInConnect:
+    """Fails the first `failures` calls of each method with `error`, then answers."""
+
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error
+        self.calls = []
+
+    def _call(self, name, params):
+        self.calls.append(name)
+        if self.calls.count(name) <= self.failures:
+            raise self.error
+        return {"api": name, **params}
+
+    def describe_contact(self, **params):
+        return self._call("describe_contact", params)
+
+    def start_outbound_voice_contact(self, **params):
+        return self._call("start_outbound_voice_contact", params)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(connect_scheduler_module, "CONNECT_RETRY_BASE_SECONDS", 0)
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_take() == 0 and bucket.try_take() == 0
+    assert 0 < bucket.try_take() <= 0.1
+    bucket.drain()
+    assert bucket.tokens <= 0
+
+
+def test_waiters_released_by_priority():
+    async def run():
+        scheduler = ConnectScheduler({"describe_contact": (1000, 1)})
+        await scheduler.acquire("describe_contact", PRIORITY_DIAL)
+        order = []
+
+        async def waiter(priority):
+            await scheduler.acquire("describe_contact", priority)
+            order.append(priority)
+
+        await asyncio.gather(waiter(PRIORITY_DIAL), waiter(PRIORITY_IVR_TRANSCRIPT))
+        return order
+
+    assert asyncio.run(run()) == [PRIORITY_IVR_TRANSCRIPT, PRIORITY_DIAL]
+
+
+def test_priorities_compete_across_apis_sharing_a_budget():
+    async def run():
+        scheduler = ConnectScheduler({"status": (1000, 1), "start_outbound_voice_contact": (1000, 1)},
+                                     groups={"describe_contact": "status", "get_contact_attributes": "status"})
+        await scheduler.acquire("describe_contact", PRIORITY_STATUS)
+        order = []
+
+        async def waiter(api, priority):
+            await scheduler.acquire(api, priority)
+            order.append(api)
+
+        # The dial has a budget of its own and goes straight through
+        await asyncio.gather(waiter("describe_contact", PRIORITY_DIAL), waiter("get_contact_attributes", PRIORITY_STATUS),
+                             waiter("start_outbound_voice_contact", PRIORITY_DIAL))
+        return scheduler, order
+
+    scheduler, order = asyncio.run(run())
+    assert order == ["start_outbound_voice_contact", "get_contact_attributes", "describe_contact"]
+    stats = scheduler.stats()
+    assert stats["describe_contact"]["budget"] == "status" and stats["describe_contact"]["granted"] == 2
+    assert "status" not in stats
+
+
+def test_apis_without_a_budget_share_the_default():
+    scheduler = ConnectScheduler({"describe_contact": (5, 10)}, groups={})
+    assert scheduler.budget("stop_contact") == scheduler.budget("update_contact_attributes") == "default"
+    assert scheduler.budget("describe_contact") == "describe_contact"
+
+
+def test_throttles_are_retried_through_the_budget():
+    connect = StandInConnect(failures=2, error=StandInClientError("ThrottlingException"))
+    scheduler = ConnectScheduler({"describe_contact": (1000, 5)})
+    client = ScheduledClient(connect, scheduler)
+    response = asyncio.run(client.describe_contact(ContactId="c1"))
+    assert response == {"api": "describe_contact", "ContactId": "c1"}
+    stats = scheduler.stats()["describe_contact"]
+    # Every attempt took a token of its own
+    assert stats["granted"] == 3 and stats["throttles"] == 2 and stats["retries"] == 2
+
+
+def test_retries_stop_at_max_attempts():
+    connect = StandInConnect(failures=10, error=StandInClientError("ThrottlingException"))
+    client = ScheduledClient(connect, ConnectScheduler({"describe_contact": (1000, 5)}))
+    with pytest.raises(StandInClientError):
+        asyncio.run(client.describe_contact(ContactId="c1"))
+    assert len(connect.calls) == connect_scheduler_module.CONNECT_MAX_ATTEMPTS
+
+
+def test_server_errors_never_redial():
+    error = StandInClientError("InternalServiceException", status=500)
+    connect = StandInConnect(failures=1, error=error)
+    client = ScheduledClient(connect, ConnectScheduler())
+    assert asyncio.run(client.describe_contact(ContactId="c1"))["ContactId"] == "c1"
+    with pytest.raises(StandInClientError):
+        asyncio.run(client.start_outbound_voice_contact(DestinationPhoneNumber="+18005550101"))
+    assert connect.calls.count("start_outbound_voice_contact") == 1
+
+
+def test_client_errors_are_not_retried():
+    connect = StandInConnect(failures=1, error=StandInClientError("ResourceNotFoundException"))
+    scheduler = ConnectScheduler()
+    with pytest.raises(StandInClientError):
+        asyncio.run(ScheduledClient(connect, scheduler).describe_contact(ContactId="c1"))
+    assert scheduler.stats()["describe_contact"]["errors"] == 1 and len(connect.calls) == 1
@@ -0,0 +1,38 @@
+import asyncio
+
+from contact_events import ContactNotifier, contact_notifiers, get_notifier, notify_contact
+
+
+def test_wait_wakes_on_notify():
+    async def run():
+        notifier = ContactNotifier()
+        seen = notifier.version
+        waiters = [asyncio.create_task(notifier.wait(seen, timeout=1)) for _ in range(3)]
+        await asyncio.sleep(0)
+        notifier.notify()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == [True, True, True]
+
+
+def test_missed_notification_returns_at_once_and_idle_times_out():
+    async def run():
+        notifier = ContactNotifier()
+        seen = notifier.version
+        notifier.notify()
+        missed = await notifier.wait(seen, timeout=1)
+        idle = await notifier.wait(notifier.version, timeout=0.01)
+        return missed, idle, len(notifier._waiters)
+
+    assert asyncio.run(run()) == (True, False, 0)
+
+
+def test_notify_contact_only_reaches_watched_contacts():
+    contact_notifiers.clear()
+    notify_contact("nobody-watching")
+    assert "nobody-watching" not in contact_notifiers
+    notifier = get_notifier("c1")
+    assert get_notifier("c1") is notifier
+    notify_contact("c1")
+    assert notifier.version == 1
+    contact_notifiers.clear()
@@ -0,0 +1,103 @@
+import asyncio
+
+from hedging import CircuitBreaker, BedrockEndpoint, HedgedInvoker
+from llm_scheduler import InferenceScheduler
+
+LARGE = "large-model"
+FAST = "fast-model"
+
+
+class StandInInvoker:
+    """
+    BedrockInvoker's invoke(): answers with the model it was asked for after `delay`, or raises
+    `error`. With a `scheduler` it holds one of its slots for the duration, as BedrockInvoker does.
+    """
+
+    def __init__(self, delay=0.0, error=None, scheduler=None):
+        self.delay = delay
+        self.error = error
+        self.scheduler = scheduler or InferenceScheduler(max_concurrency=1000, budgets={})
+        self.models = []
+
+    async def invoke(self, body, model_id=None, priority=None, deadline=None, on_admitted=None):
+        async with self.scheduler.slot(model_id, priority, deadline):
+            if on_admitted is not None:
+                on_admitted()
+            self.models.append(model_id)
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return {"model": model_id}
+
+    def stats(self):
+        return {}
+
+
+def test_breaker_opens_then_probes():
+    breaker = CircuitBreaker(failures=2, cooldown=0)
+    breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.opens == 1
+    # Cooldown of 0: straight to half-open, which lets exactly one probe through
+    assert breaker.state == "half-open" and breaker.allow()
+    breaker.attempt()
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.opens == 2
+    breaker.attempt()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_breaker_routes_elsewhere():
+    primary, backup = StandInInvoker(error=RuntimeError("down")), StandInInvoker()
+    invoker = HedgedInvoker([BedrockEndpoint("primary", primary, breaker=CircuitBreaker(failures=1, cooldown=60)),
+                             BedrockEndpoint("backup", backup)], hedge=False)
+    assert asyncio.run(invoker.invoke({}, model_id=LARGE)) == {"model": LARGE}
+    assert invoker.stats()["failovers"] == 1
+    asyncio.run(invoker.invoke({}, model_id=LARGE))
+    assert len(primary.models) == 1 and len(backup.models) == 2
+
+
+def test_slow_endpoint_is_hedged(monkeypatch):
+    import hedging
+    monkeypatch.setattr(hedging, "BEDROCK_HEDGE_DELAY_MS", 20)
+    slow, fast = StandInInvoker(delay=5), StandInInvoker(delay=0.01)
+    invoker = HedgedInvoker([BedrockEndpoint("slow", slow), BedrockEndpoint("fast", fast)], hedge=True)
+    assert asyncio.run(asyncio.wait_for(invoker.invoke({}, model_id=LARGE), 1)) == {"model": LARGE}
+    stats = invoker.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    assert stats["endpoints"]["slow"]["cancelled"] == 1
+
+
+def test_backup_model_only_serves_its_own_tier():
+    primary = StandInInvoker(error=RuntimeError("down"))
+    large_backup, fast_backup = StandInInvoker(), StandInInvoker()
+    invoker = HedgedInvoker([
+        BedrockEndpoint("us-east-1", primary),
+        BedrockEndpoint("us-east-1", large_backup, model_id="large-backup", backup_for=LARGE),
+        BedrockEndpoint("us-east-1", fast_backup, model_id="fast-backup", backup_for=FAST),
+    ], hedge=False)
+    assert asyncio.run(invoker.invoke({}, model_id=FAST)) == {"model": "fast-backup"}
+    assert asyncio.run(invoker.invoke({}, model_id=LARGE)) == {"model": "large-backup"}
+    assert large_backup.models == ["large-backup"] and fast_backup.models == ["fast-backup"]
+
+
+def test_waiting_for_a_local_slot_is_not_hedged(monkeypatch):
+    import hedging
+    monkeypatch.setattr(hedging, "BEDROCK_HEDGE_DELAY_MS", 80)
+
+    async def run():
+        # Both endpoints share one saturated pool; a hedge would only queue behind the first request
+        scheduler = InferenceScheduler(max_concurrency=2, budgets={LARGE: (1000, 100)})
+        primary, backup = StandInInvoker(delay=0.03, scheduler=scheduler), StandInInvoker(scheduler=scheduler)
+        invoker = HedgedInvoker([BedrockEndpoint("primary", primary), BedrockEndpoint("backup", backup)], hedge=True)
+        await asyncio.gather(*(invoker.invoke({}, model_id=LARGE) for _ in range(8)))
+        return invoker, primary, backup
+
+    invoker, primary, backup = asyncio.run(run())
+    assert invoker.stats()["hedged"] == 0
+    assert len(primary.models) == 8 and backup.models == []
+    # Latency samples cover the model call only, not up to 90ms waiting for a slot
+    assert max(invoker.endpoints[0].latencies) < 0.06
@@ -0,0 +1,137 @@
+import asyncio
+
+import ingestion
+from ingestion import IngestionManager, SegmentCursor, get_segment_cursor, pull_segments, segment_cursors
+
+
+def poller(polls):
+    async def poll(contact_id):
+        while True:
+            polls.append(contact_id)
+            await asyncio.sleep(0.01)
+    return poll
+
+
+def test_poller_survives_disconnect_and_reconnect_on_another_worker():
+    async def scenario():
+        owner, other = IngestionManager(), IngestionManager()
+        polls = []
+        poll = poller(polls)
+
+        # The client first watches the call through the worker that dialed it
+        owner.subscribe("contact-1")
+        owner.start("contact-1", "transcripts", poll)
+        get_segment_cursor("contact-1").last_offset = 4200
+        await asyncio.sleep(0.03)
+        assert owner.unsubscribe("contact-1") == 0
+
+        # It reconnects through a worker that doesn't own the contact and so starts no poller of its own
+        other.subscribe("contact-1")
+        seen = len(polls)
+        await asyncio.sleep(0.05)
+        assert owner.is_running("contact-1", "transcripts")
+        assert not other.is_running("contact-1", "transcripts")
+        assert len(polls) > seen
+        assert segment_cursors["contact-1"].last_offset == 4200
+
+        # finish_contact stops it once the call has ended
+        owner.stop("contact-1")
+        await asyncio.sleep(0)
+        assert not owner.is_running("contact-1", "transcripts")
+        assert "contact-1" not in segment_cursors
+
+    asyncio.run(scenario())
+
+
+def test_start_deduplicates_pollers_per_contact():
+    async def scenario():
+        manager = IngestionManager()
+        polls = []
+        poll = poller(polls)
+        first = manager.start("contact-2", "transcripts", poll)
+        second = manager.start("contact-2", "transcripts", poll)
+        assert first is second
+        assert manager.deduplicated == 1
+        await manager.close()
+        assert manager.contacts == {}
+
+    asyncio.run(scenario())
+
+
+def test_unsubscribe_without_pollers_forgets_the_contact():
+    manager = IngestionManager()
+    manager.subscribe("contact-3")
+    assert manager.unsubscribe("contact-3") == 0
+    assert "contact-3" not in manager.contacts
+
+
+def test_finished_poller_can_be_started_again():
+    async def scenario():
+        manager = IngestionManager()
+
+        async def fails(contact_id):
+            raise RuntimeError("describe_contact failed")
+
+        await asyncio.gather(manager.start("contact-4", "status", fails), return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not manager.is_running("contact-4", "status") and "contact-4" not in manager.contacts
+        polls = []
+        manager.start("contact-4", "status", poller(polls))
+        manager.start("contact-4", "transcripts", poller(polls))
+        assert manager.stats()["running"] == {"status": 1, "transcripts": 1}
+        assert manager.started == 3
+        await manager.close()
+
+    asyncio.run(scenario())
+
+
+class StandInContactLens:
+    """list_realtime_contact_analysis_segments over a growing transcript, two segments a page."""
+
+    def __init__(self):
+        self.segments = []
+        self.requests = []
+
+    def say(self, *contents):
+        for content in contents:
+            offset = len(self.segments) * 1000
+            self.segments.append({"Transcript": {"Id": f"s{offset}", "Content": content, "BeginOffsetMillis": offset,
+                                                 "ParticipantRole": "SYSTEM"}})
+
+    async def list_segments(self, InstanceId, ContactId, MaxResults, NextToken=None):
+        self.requests.append(NextToken)
+        start = int(NextToken or 0)
+        # Contact Lens keeps handing out a token while analysis is running
+        return {"Segments": self.segments[start:start + MaxResults], "NextToken": str(start + MaxResults)
+                if start + MaxResults <= len(self.segments) else str(len(self.segments))}
+
+
+def test_pull_segments_resumes_from_the_cursor():
+    async def scenario():
+        lens, cursor = StandInContactLens(), SegmentCursor()
+        lens.say("Thank you for calling.", "Press 1 for claims.", "Enter the NPI.")
+        first = await pull_segments(lens.list_segments, "instance", "c1", cursor, max_results=2)
+        lens.say("Please hold.")
+        second = await pull_segments(lens.list_segments, "instance", "c1", cursor, max_results=2)
+        nothing = await pull_segments(lens.list_segments, "instance", "c1", cursor, max_results=2)
+        return lens, cursor, first, second, nothing
+
+    lens, cursor, first, second, nothing = asyncio.run(scenario())
+    assert [t["Content"] for t in first] == ["Thank you for calling.", "Press 1 for claims.", "Enter the NPI."]
+    assert [t["Content"] for t in second] == ["Please hold."]
+    assert nothing == []
+    # Later polls start at the saved token rather than the first page
+    assert lens.requests[:2] == [None, "2"] and None not in lens.requests[2:]
+    assert cursor.segments == 4 and cursor.last_offset == 3000
+
+
+def test_poll_interval_backs_off_on_hold(monkeypatch):
+    monkeypatch.setattr(ingestion, "TRANSCRIPT_POLL_FAST", 1)
+    monkeypatch.setattr(ingestion, "TRANSCRIPT_POLL_SLOW", 6)
+    monkeypatch.setattr(ingestion, "TRANSCRIPT_IVR_WINDOW", 10)
+    cursor = SegmentCursor()
+    cursor.interval = 1
+    assert cursor.next_interval(1, now=100) == 1
+    assert cursor.next_interval(0, now=105) == 1
+    assert [cursor.next_interval(0, now=now) for now in (111, 113, 117, 123)] == [2, 4, 6, 6]
+    assert cursor.next_interval(1, now=124) == 1
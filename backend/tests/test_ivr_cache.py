@@ -0,0 +1,94 @@
+from ivr_cache import IVRDecisionCache, decision_template, resolve_template
+
+ROW_A = {"NPI": "1447914288", "DOB": "01/01/1990", "Patient Name": "Jane Doe"}
+ROW_B = {"NPI": "1811992431", "DOB": "02/03/1985", "Patient Name": "John Roe"}
+NPI_PROMPT = "Please enter the provider's 10 digit NPI followed by pound."
+
+
+def test_column_answer_follows_the_row():
+    template = decision_template(ROW_A, "1447914288#", "NPI")
+    assert template["kind"] == "column" and template["suffix"] == "#"
+    assert resolve_template(template, ROW_B) == {"value": "1811992431#", "field": "NPI"}
+    assert resolve_template(template, {"DOB": "x"}) is None
+
+
+def test_literal_and_reformatted_answers():
+    assert decision_template(ROW_A, "2", "press a number") == {"kind": "literal", "field": "press a number",
+                                                               "value": "2"}
+    # Reformatted dates can't be replayed against another row
+    assert decision_template(ROW_A, "January first 1990", "DOB") is None
+
+
+def test_unparsed_and_failed_answers_are_not_templated():
+    raw = 'Sure! The NPI is 1447914288 and the patient is Jane Doe'
+    assert decision_template(ROW_A, raw, "unknown") is None
+    assert decision_template(ROW_A, "No matching data found", "unknown") is None
+    assert decision_template(ROW_A, "Invocation error", "error") is None
+
+
+def test_cache_hit_resolves_against_current_row():
+    cache = IVRDecisionCache(path=None)
+    cache.put(NPI_PROMPT, "Claims", ROW_A, "1447914288#", "NPI")
+    assert cache.get(NPI_PROMPT, "Claims", ROW_B) == {"value": "1811992431#", "field": "NPI"}
+    assert cache.get(NPI_PROMPT, "Eligibility", ROW_B) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_unknown_output_never_reaches_another_contact():
+    cache = IVRDecisionCache(path=None)
+    cache.put("Please say the patient's name.", "Claims", ROW_A, "The patient is Jane Doe", "unknown")
+    assert cache.stats()["stores"] == 0
+    assert cache.get("Please say the patient's name.", "Claims", ROW_B) is None
+
+
+def test_lru_bound_and_ttl():
+    cache = IVRDecisionCache(path=None, max_entries=2, ttl_seconds=3600)
+    for option in ("1", "2", "3"):
+        cache.put(f"For option {option} press {option}.", "Claims", ROW_A, option, "press a number")
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    assert cache.get("For option 1 press 1.", "Claims", ROW_A) is None
+
+    expired = IVRDecisionCache(path=None, ttl_seconds=-1)
+    expired.put(NPI_PROMPT, "Claims", ROW_A, "1", "press a number")
+    assert expired.get(NPI_PROMPT, "Claims", ROW_A) is None
+
+
+def test_writes_persist_through_the_writer_thread(tmp_path):
+    path = str(tmp_path / "decisions.db")
+    cache = IVRDecisionCache(path=path, max_entries=2)
+    cache.put(NPI_PROMPT, "Claims", ROW_A, "1447914288#", "NPI")
+    cache.put("For claims press 3.", "Claims", ROW_A, "3", "press a number")
+    cache.put("For eligibility press 2.", "Claims", ROW_A, "2", "press a number")
+    cache.close()
+
+    reloaded = IVRDecisionCache(path=path, max_entries=2)
+    try:
+        assert reloaded.stats()["entries"] == 2
+        assert reloaded.get(NPI_PROMPT, "Claims", ROW_B) is None
+        assert reloaded.get("For eligibility press 2.", "Claims", ROW_B) == {"value": "2", "field": "press a number"}
+        assert reloaded.stats()["write_errors"] == 0
+    finally:
+        reloaded.close()
+
+
+def test_keyed_row_digits_are_not_replayed_on_another_row():
+    cache = IVRDecisionCache(path=None)
+    prompt = "Please enter the member ID followed by pound."
+    row_a, row_b = {**ROW_A, "Member ID": "MB-123456789"}, {**ROW_B, "Member ID": "MB-987654321"}
+    cache.put(prompt, "Claims", row_a, "123456789", "press a number")
+    assert cache.get(prompt, "Claims", row_b) == {"value": "987654321", "field": "press a number"}
+    # Part of a cell can't be templated, so it isn't stored at all
+    assert decision_template(row_a, "6789", "press a number") is None
+    assert decision_template(row_a, "*", "press a number") == {"kind": "literal", "field": "press a number",
+                                                               "value": "*"}
+
+
+def test_reformatted_row_values_are_not_stored_as_literals():
+    cache = IVRDecisionCache(path=None)
+    prompt = "Please say the patient's date of birth."
+    row_a = {**ROW_A, "DOB": "1980-01-02"}
+    cache.put(prompt, "Claims", row_a, "01/02/1980", "voice only")
+    cache.put(prompt, "Eligibility", row_a, "01021980", "voice only")
+    assert cache.stats()["stores"] == 0
+    assert cache.get(prompt, "Claims", ROW_B) is None
+    assert decision_template(ROW_A, "Transfer me to an agent", "transfer to agent")["kind"] == "literal"
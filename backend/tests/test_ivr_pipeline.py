@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import ivr_pipeline as ivr_pipeline_module
+from ivr_pipeline import IVRPipeline
+
+
+class StandInDecider:
+    """decide() that holds each prompt until released, plus an on_result() that records answers."""
+
+    def __init__(self):
+        self.started = []
+        self.release = {}
+        self.answers = []
+
+    async def decide(self, contact_id, prompt, arrived_at):
+        self.started.append(prompt)
+        self.release[prompt] = asyncio.Event()
+        await self.release[prompt].wait()
+        if prompt == "error":
+            raise RuntimeError("model down")
+        return {"question": prompt, "field": "npi", "value": "1234567890"}
+
+    async def on_result(self, contact_id, response_sent):
+        self.answers.append(response_sent["question"])
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture(autouse=True)
+def supersede(monkeypatch):
+    monkeypatch.setattr(ivr_pipeline_module, "IVR_SUPERSEDE", True)
+
+
+def test_newer_prompt_cancels_the_older_one():
+    async def run():
+        decider = StandInDecider()
+        pipeline = IVRPipeline(decider.decide, decider.on_result)
+        pipeline.submit("c1", "enter your npi")
+        await settle()
+        pipeline.submit("c1", "enter your tax id")
+        await settle()
+        decider.release["enter your tax id"].set()
+        await settle()
+        worker = pipeline.workers["c1"]
+        try:
+            return decider, worker.since(0), pipeline.stats()
+        finally:
+            await pipeline.close()
+
+    decider, results, stats = asyncio.run(run())
+    assert decider.started == ["enter your npi", "enter your tax id"]
+    assert decider.answers == ["enter your tax id"] and [result["question"] for result in results] == decider.answers
+    assert stats["cancelled"] == 1 and stats["decided"] == 1 and stats["latency_ms"]["p50"] is not None
+
+
+def test_repeated_prompt_is_a_duplicate():
+    async def run():
+        decider = StandInDecider()
+        pipeline = IVRPipeline(decider.decide, decider.on_result)
+        accepted = [pipeline.submit("c1", "enter your npi"), pipeline.submit("c1", "Enter your NPI")]
+        await pipeline.close()
+        return accepted, pipeline.stats()
+
+    accepted, stats = asyncio.run(run())
+    assert accepted == [True, False]
+    assert stats["duplicates"] == 1 and stats["workers"] == 0
+
+
+def test_errors_dont_stop_the_worker():
+    async def run():
+        decider = StandInDecider()
+        pipeline = IVRPipeline(decider.decide, decider.on_result)
+        pipeline.submit("c1", "error")
+        await settle()
+        decider.release["error"].set()
+        await settle()
+        pipeline.submit("c1", "enter your npi")
+        await settle()
+        decider.release["enter your npi"].set()
+        await settle()
+        try:
+            return decider, pipeline.stats()
+        finally:
+            pipeline.stop("c1")
+
+    decider, stats = asyncio.run(run())
+    assert decider.answers == ["enter your npi"]
+    assert stats["errors"] == 1 and stats["decided"] == 1
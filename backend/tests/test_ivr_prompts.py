@@ -0,0 +1,20 @@
+from ivr_prompts import build_system_blocks, PROMPT_TEMPLATES
+
+ROW = {"NPI": "1447914288", "DOB": "01/01/1990"}
+
+
+def test_instructions_then_row_both_cached():
+    instructions, row = build_system_blocks("Eligibility", ROW)
+    assert instructions["text"] == PROMPT_TEMPLATES["Eligibility"]
+    assert row["text"] == '<row_data>\n{"NPI": "1447914288", "DOB": "01/01/1990"}\n</row_data>'
+    assert instructions["cache_control"] == row["cache_control"] == {"type": "ephemeral"}
+
+
+def test_prefix_is_identical_across_prompts_and_rows():
+    # Only the row block differs between contacts; nothing differs between a contact's prompts
+    assert build_system_blocks("Claims", ROW) == build_system_blocks("Claims", dict(ROW))
+    assert build_system_blocks("Claims", ROW)[0] == build_system_blocks("Claims", {"NPI": "1811992431"})[0]
+
+
+def test_unknown_option_uses_claims():
+    assert build_system_blocks("Appeals", ROW)[0]["text"] == PROMPT_TEMPLATES["Claims"]
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from ivr_rules import IVRRuleEngine, find_column, normalize_ivr_text, parse_date
+
+ROW = {"Billing Provider NPI": "1447-914288", "TAX_ID": "84-3612075", "Patient DOB": "1990-01-31"}
+
+
+def answer(text, selected_option="Claims", row=ROW):
+    return IVRRuleEngine().match(text, selected_option, row)
+
+
+def test_menus():
+    assert answer("If you are a provider, press two.") == {"value": "2", "field": "press a number",
+                                                           "rule": "provider_menu"}
+    assert answer("For claims status press 3.")["value"] == "3"
+    # The claims menu rule is off in the Eligibility flow
+    assert answer("For claims status press 3.", "Eligibility") is None
+
+
+def test_identifiers_come_from_the_row():
+    assert answer("Please enter your 9 digit tax ID followed by the pound sign.") == {
+        "value": "843612075#", "field": "TAX_ID", "rule": "tax_id"}
+    assert answer("Enter the NPI.")["value"] == "1447914288"
+    assert answer("Enter the patient's date of birth as MMDDYYYY.")["value"] == "01311990"
+    # A date format other than MMDDYYYY is left to the LLM
+    assert answer("Enter the patient's date of birth.") is None
+    # Negated prompts are too easy to misread
+    assert answer("If you do not have a tax ID, enter the NPI.") is None
+
+
+def test_mixed_and_missing_answers_go_to_the_llm():
+    engine = IVRRuleEngine()
+    assert engine.match("If you are a provider press 1. For English press 2.", "Claims", ROW) is None
+    assert engine.stats()["ambiguous"] == 1
+    assert engine.match("Please enter your tax ID.", "Claims", {"Name": "Jane"}) is None
+    assert engine.match("Thank you for calling, goodbye. Please hold.", "Claims", ROW) is None
+
+
+def test_helpers():
+    assert normalize_ivr_text("Press ONE, for claims!") == "press 1 for claims"
+    assert find_column({"NPI": 1, "Provider Name": 2}, "npi") == "NPI"
+    assert find_column({"NPI": 1, "Provider NPI": 2}, "npi") is None
+    assert parse_date("01/31/1990") == datetime(1990, 1, 31)
+    assert parse_date(32904) == datetime(1990, 1, 31)
+    assert parse_date("not a date") is None
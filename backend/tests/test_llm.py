@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+from llm import BedrockInvoker, StreamingFieldExtractor
+from llm_scheduler import InferenceScheduler
+
+ANSWER = {"content": [{"text": '{"value": "1", "field": "press a number"}'}],
+          "usage": {"input_tokens": 12, "cache_read_input_tokens": 1500}}
+
+
+class StandInBody:
+    async def read(self):
+        return json.dumps(ANSWER).encode()
+
+
+class StandInStream:
+    """Bedrock's streamed message events for the given text deltas."""
+
+    def __init__(self, deltas):
+        self.events = [{"type": "message_start", "message": {"usage": {"input_tokens": 7}}}]
+        self.events += [{"type": "content_block_delta", "delta": {"text": delta}} for delta in deltas]
+        self.read = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.read == len(self.events):
+            raise StopAsyncIteration
+        self.read += 1
+        return {"chunk": {"bytes": json.dumps(self.events[self.read - 1]).encode()}}
+
+    def close(self):
+        self.closed = True
+
+
+class StandInBedrock:
+    """An aioboto3 bedrock-runtime client context manager that counts clients and concurrent calls."""
+
+    opened = 0
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.requests = []
+        self.closed = False
+        self.stream_deltas = []
+
+    async def __aenter__(self):
+        StandInBedrock.opened += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+        return False
+
+    async def invoke_model_with_response_stream(self, **kwargs):
+        return {"body": StandInStream(self.stream_deltas)}
+
+    async def invoke_model(self, **kwargs):
+        self.requests.append(kwargs)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return {"body": StandInBody()}
+
+
+def test_invoke_shares_one_client_under_the_concurrency_bound():
+    client = StandInBedrock()
+    invoker = BedrockInvoker(lambda: client, InferenceScheduler(max_concurrency=2, budgets={"m": (1000, 1000)}))
+
+    async def run():
+        StandInBedrock.opened = 0
+        responses = await asyncio.gather(*(invoker.invoke({"messages": []}, model_id="m") for _ in range(6)))
+        await invoker.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert responses == [ANSWER] * 6
+    assert StandInBedrock.opened == 1 and client.closed
+    assert client.peak == 2
+    assert client.requests[0]["modelId"] == "m" and json.loads(client.requests[0]["body"]) == {"messages": []}
+    assert invoker.stats()["usage"]["cache_read_input_tokens"] == 6 * 1500
+
+
+def test_extractor_waits_for_complete_values():
+    extractor = StreamingFieldExtractor()
+    assert extractor.feed('{"value": "12') is None
+    assert extractor.feed('34#", "fie') is None
+    assert extractor.feed('ld": "NPI"') == {"value": "1234#", "field": "NPI"}
+
+
+def test_extractor_numbers_need_a_terminator():
+    extractor = StreamingFieldExtractor()
+    assert extractor.feed('{"field": "press a number", "value": 1') is None
+    assert extractor.feed('2}') == {"value": 12, "field": "press a number"}
+
+
+def test_extractor_handles_escapes():
+    assert StreamingFieldExtractor().feed(r'{"value": "say \"yes\"", "field": "voice only"}') == \
+        {"value": 'say "yes"', "field": "voice only"}
+
+
+def test_stream_stops_once_fields_are_complete():
+    client = StandInBedrock()
+    client.stream_deltas = ['{"value": "3", ', '"field": "press a number"}', ' Because the menu', ' says claims.']
+    invoker = BedrockInvoker(lambda: client, InferenceScheduler(budgets={}))
+    fields, text = asyncio.run(invoker.invoke_stream({}, model_id="m"))
+    assert fields == {"value": "3", "field": "press a number"}
+    assert text == '{"value": "3", "field": "press a number"}'
+    stats = invoker.stats()
+    assert stats["early_exits"] == 1 and stats["usage"]["input_tokens"] == 7
+
+
+def test_stream_without_json_returns_the_text():
+    client = StandInBedrock()
+    client.stream_deltas = ["I could not ", "find that."]
+    invoker = BedrockInvoker(lambda: client, InferenceScheduler(budgets={}))
+    assert asyncio.run(invoker.invoke_stream({}, model_id="m")) == (None, "I could not find that.")
+    assert invoker.stats()["early_exits"] == 0
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_scheduler import InferenceScheduler, DeadlineExceeded, PRIORITY_LIVE, PRIORITY_SPECULATIVE
+
+MODEL = "large-model"
+
+
+class StandInThrottle(Exception):
+    response = {"Error": {"Code": "ThrottlingException"}}
+
+
+def test_waiters_released_by_priority_then_deadline():
+    async def run():
+        scheduler = InferenceScheduler(max_concurrency=1, budgets={MODEL: (1000, 100)})
+        await scheduler.acquire(MODEL)
+        order = []
+
+        async def waiter(name, priority, deadline):
+            await scheduler.acquire(MODEL, priority, deadline)
+            order.append(name)
+            scheduler.release(MODEL)
+
+        now = time.monotonic()
+        waiters = asyncio.gather(waiter("speculative", PRIORITY_SPECULATIVE, None),
+                                 waiter("live-late", PRIORITY_LIVE, now + 60),
+                                 waiter("live-soon", PRIORITY_LIVE, now + 30))
+        await asyncio.sleep(0)
+        scheduler.release(MODEL)
+        await waiters
+        return order
+
+    assert asyncio.run(run()) == ["live-soon", "live-late", "speculative"]
+
+
+def test_request_that_cannot_finish_is_shed():
+    async def run():
+        scheduler = InferenceScheduler(max_concurrency=1, budgets={})
+        scheduler.lane(MODEL).service_seconds = 2
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.acquire(MODEL, deadline=time.monotonic() + 1)
+        # Admitted, then shed while waiting behind a slot that never frees up
+        await scheduler.acquire(MODEL)
+        with pytest.raises(DeadlineExceeded):
+            await asyncio.wait_for(scheduler.acquire(MODEL, deadline=time.monotonic() + 2.05), 1)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["models"][MODEL]["shed"] == 2 and stats["waiting"] == 0
+
+
+def test_per_model_budgets():
+    async def run():
+        scheduler = InferenceScheduler(max_concurrency=10, budgets={MODEL: (1, 1), "fast-model@us-west-2": (1000, 5)})
+        async with scheduler.slot(MODEL):
+            pass
+        blocked = asyncio.create_task(scheduler.acquire(MODEL))
+        await asyncio.sleep(0.01)
+        # Out of budget for one model; another still gets through
+        async with scheduler.slot("fast-model@us-west-2"):
+            pass
+        blocked.cancel()
+        return scheduler, blocked
+
+    scheduler, blocked = asyncio.run(run())
+    assert blocked.cancelled()
+    stats = scheduler.stats()["models"]
+    assert stats[MODEL]["granted"] == 1 and stats["fast-model@us-west-2"]["burst"] == 5
+
+
+def test_throttles_drain_the_budget():
+    async def run():
+        scheduler = InferenceScheduler(max_concurrency=2, budgets={MODEL: (1000, 5)})
+        with pytest.raises(StandInThrottle):
+            async with scheduler.slot(MODEL):
+                raise StandInThrottle()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.in_flight == 0
+    assert scheduler.stats()["models"][MODEL]["throttles"] == 1 and scheduler.lane(MODEL).bucket.tokens <= 0
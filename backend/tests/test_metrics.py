@@ -0,0 +1,8 @@
+from metrics import percentile, percentile_ms
+
+
+def test_percentile():
+    values = [0.4, 0.1, 0.3, 0.2]
+    assert percentile(values, 0.5) == 0.3 and percentile(values, 0.99) == 0.4
+    assert percentile_ms(values, 0) == 100
+    assert percentile([], 0.5) is None and percentile_ms([], 0.5, default=0.0) == 0.0
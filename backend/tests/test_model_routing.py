@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from llm_scheduler import DeadlineExceeded
+from model_routing import ModelRouter, ModelTier, check_decision, parse_decision, request_body, NO_MATCH
+
+ROW = {"NPI": "1234567890", "Patient DOB": "03/14/1980", "Claim Number": "C-5521"}
+FAST = ModelTier("fast", "fast-model", 80, prompt_caching=False)
+LARGE = ModelTier("large", "large-model", 300)
+
+
+def test_parse_decision():
+    assert parse_decision('{"value": "1", "field": "press a number"}') == {"value": "1", "field": "press a number"}
+    assert parse_decision('{"value": "1"') is None
+    assert parse_decision('["1"]') is None
+
+
+@pytest.mark.parametrize("decision, ivr_text, reason", [
+    ({"value": "2", "field": "press a number"}, "For claims press 2", None),
+    ({"value": "Claims", "field": "Voice only"}, "Say claims or eligibility", None),
+    ({"value": "2", "field": " Press a number"}, "For claims press 2", None),
+    ({"value": "3", "field": "press a number"}, "For claims press 2", "option not offered"),
+    ({"value": "1234567890#", "field": "press a number"}, "Enter your NPI followed by pound", None),
+    ({"value": "123456789", "field": "NPI"}, "Enter your 10 digit NPI", "digit count differs from prompt"),
+    ({"value": "1234567890", "field": "NPI"}, "Enter your NPI", None),
+    ({"value": "03141980", "field": "Patient DOB"}, "Enter the date of birth", None),
+    ({"value": "C-9999", "field": "Claim Number"}, "Say the claim number", "value not from its column"),
+    ({"value": "x", "field": "Group"}, "Say the group number", "field not in row_data"),
+    ({"value": NO_MATCH, "field": "unknown"}, "Please enter your tax ID", "no match on a prompt asking for input"),
+    ({"value": NO_MATCH, "field": "unknown"}, "Thank you for calling", None),
+    (None, "Enter your NPI", "invalid json"),
+])
+def test_check_decision(decision, ivr_text, reason):
+    assert check_decision(decision, ivr_text, ROW) == reason
+
+
+def test_uncached_tier_strips_cache_control():
+    system_blocks = [{"type": "text", "text": "rules", "cache_control": {"type": "ephemeral"}}]
+    assert "cache_control" not in request_body(system_blocks, "Enter your NPI", FAST)["system"][0]
+    body = request_body(system_blocks, "Enter your NPI", LARGE)
+    assert body["system"] == system_blocks and body["max_tokens"] == 300
+    assert body["messages"][0]["content"][0]["text"] == "IVR_TEXT: Enter your NPI"
+
+
+def answers(by_tier):
+    async def ask(tier):
+        answer = by_tier[tier.name]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer, str(answer)
+    return ask
+
+
+def test_valid_fast_answer_is_kept():
+    router = ModelRouter([FAST, LARGE])
+    decision, tier, _ = asyncio.run(router.decide(
+        answers({"fast": {"value": "2", "field": "press a number"}}), "For claims press 2", ROW))
+    assert decision["value"] == "2" and tier is FAST
+    assert router.stats()["tiers"]["large"]["calls"] == 0
+
+
+def test_invalid_or_failing_fast_answer_escalates():
+    router = ModelRouter([FAST, LARGE])
+    large = {"value": "1234567890", "field": "NPI"}
+    _, tier, _ = asyncio.run(router.decide(
+        answers({"fast": {"value": "999", "field": "NPI"}, "large": large}), "Enter your NPI", ROW))
+    assert tier is LARGE
+    _, tier, _ = asyncio.run(router.decide(answers({"fast": RuntimeError("down"), "large": large}), "Enter your NPI", ROW))
+    assert tier is LARGE
+    stats = router.stats()
+    assert stats["tiers"]["fast"]["escalated"] == 2 and stats["tiers"]["fast"]["errors"] == 1
+    assert stats["escalation_reasons"] == {"value not from its column": 1, "model error": 1}
+
+
+def test_deadline_is_not_escalated():
+    router = ModelRouter([FAST, LARGE])
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(router.decide(answers({"fast": DeadlineExceeded("late")}), "Enter your NPI", ROW))
+    assert router.stats()["tiers"]["large"]["calls"] == 0
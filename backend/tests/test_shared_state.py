@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from shared_state import StateBackend, MemoryBackend, create_state_backend
+
+
+async def exercise(worker_a, worker_b):
+    """Worker A writes and publishes, worker B reads and receives."""
+    received = asyncio.Queue()
+
+    async def listen():
+        async for channel, message in worker_b.subscribe(["contacts"]):
+            await received.put((channel, message))
+
+    listener = asyncio.create_task(listen())
+    await asyncio.sleep(0.05)
+    await worker_a.put_contact("c1", {"status": "dialing"})
+    await worker_a.add_segments("c1", [{"Id": "s1"}, {"Id": "s2"}])
+    await worker_a.add_segments("c1", [])
+    await worker_a.publish("contacts", {"contact_id": "c1"})
+    try:
+        return (await worker_b.get_contact("c1"), await worker_b.get_contact("missing"),
+                await worker_b.get_segments("c1"), await asyncio.wait_for(received.get(), 2))
+    finally:
+        listener.cancel()
+
+
+def test_state_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StateBackend()
+
+
+def test_memory_backend_round_trip():
+    backend = create_state_backend("memory")
+    assert isinstance(backend, MemoryBackend) and not backend.shared
+    contact, missing, segments, message = asyncio.run(exercise(backend, backend))
+    assert contact == {"status": "dialing"}
+    assert missing is None
+    assert segments == [{"Id": "s1"}, {"Id": "s2"}]
+    assert message == ("contacts", {"contact_id": "c1"})
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_state_backend("memcached")
+
+
+def test_redis_backend_across_workers():
+    pytest.importorskip("redis")
+    from redis_standin import StandInRedis
+    from shared_state import RedisBackend
+
+    async def run():
+        standin = StandInRedis()
+        url = f"redis://127.0.0.1:{await standin.start()}/0"
+        worker_a, worker_b = RedisBackend(url, "test:"), RedisBackend(url, "test:")
+        try:
+            return await exercise(worker_a, worker_b), standin
+        finally:
+            await worker_a.close()
+            await worker_b.close()
+            await standin.stop()
+
+    (contact, missing, segments, message), standin = asyncio.run(run())
+    assert contact == {"status": "dialing"}
+    assert missing is None
+    assert segments == [{"Id": "s1"}, {"Id": "s2"}]
+    assert message == ("contacts", {"contact_id": "c1"})
+    assert b"test:contact:c1" in standin.values
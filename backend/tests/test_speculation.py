@@ -0,0 +1,84 @@
+import asyncio
+
+from speculation import SpeculativeDecider, tail_is_neutral
+
+PROMPT = "please enter your national provider identifier"
+
+
+class StandInDecide:
+    """decide(contact_id, text): records what it was asked and answers with the text's word count."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.texts = []
+
+    async def __call__(self, contact_id, text):
+        self.texts.append(text)
+        await asyncio.sleep(self.delay)
+        return len(text.split())
+
+
+def test_tail_is_neutral():
+    assert tail_is_neutral(["now", "thank", "you"])
+    assert not tail_is_neutral(["press", "one"])
+    assert not tail_is_neutral(["10"])
+
+
+def test_neutral_tail_commits_the_speculation():
+    async def run():
+        decide = StandInDecide()
+        decider = SpeculativeDecider(decide, min_words=4, min_new_words=3)
+        decider.speculate("c1", "please enter")
+        decider.speculate("c1", PROMPT)
+        # One word more isn't material; the speculation keeps running
+        decider.speculate("c1", PROMPT + " now")
+        return decide, decider, await decider.commit("c1", PROMPT + " now")
+
+    decide, decider, result = asyncio.run(run())
+    assert decide.texts == [PROMPT]
+    assert result == len(PROMPT.split())
+    stats = decider.stats()
+    assert stats["started"] == 1 and stats["committed"] == 1 and stats["open"] == 0
+
+
+def test_material_change_reissues():
+    async def run():
+        decide = StandInDecide(delay=0.01)
+        decider = SpeculativeDecider(decide, min_words=4, min_new_words=3)
+        decider.speculate("c1", PROMPT)
+        await asyncio.sleep(0)
+        decider.speculate("c1", PROMPT + " or press 2")
+        # The final text asks for a keypress the first speculation never saw
+        return decide, decider, await decider.commit("c1", PROMPT + " or press 2")
+
+    decide, decider, result = asyncio.run(run())
+    assert decide.texts == [PROMPT, PROMPT + " or press 2"]
+    assert result == len((PROMPT + " or press 2").split())
+    assert decider.stats()["cancelled"] == 1
+
+
+def test_diverging_final_text_is_decided_afresh():
+    async def run():
+        decider = SpeculativeDecider(StandInDecide(), min_words=4, min_new_words=3)
+        decider.speculate("c1", PROMPT)
+        result = await decider.commit("c1", PROMPT + " then press pound")
+        decider.forget("c1")
+        return decider, result
+
+    decider, result = asyncio.run(run())
+    assert result is None
+    assert decider.stats()["committed"] == 0 and decider.stats()["open"] == 0
+
+
+def test_oldest_unanswered_utterance_is_discarded():
+    async def run():
+        decider = SpeculativeDecider(StandInDecide(delay=1), min_words=4, min_new_words=3)
+        for number in range(4):
+            decider.speculate("c1", f"{PROMPT} {number}", utterance_id=f"u{number}")
+        open_utterances = list(decider.speculations["c1"])
+        decider.forget("c1")
+        return decider, open_utterances
+
+    decider, open_utterances = asyncio.run(run())
+    assert open_utterances == ["u1", "u2", "u3"]
+    assert decider.stats()["discarded"] == 1
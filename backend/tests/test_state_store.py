@@ -0,0 +1,45 @@
+import time
+
+import state_store
+from state_store import ContactStore, deep_sizeof
+
+
+def test_finished_entries_expire_after_ttl():
+    evicted = []
+    store = ContactStore("test", ttl_seconds=60, max_idle_seconds=3600, on_evict=lambda key, value: evicted.append(key))
+    store["a"] = {"status": "COMPLETED"}
+    store["b"] = {"status": "CONNECTED"}
+    store.finish("a")
+    now = time.monotonic()
+    assert store.evict_expired(now + 30) == 0
+    assert store.evict_expired(now + 61) == 1
+    assert "a" not in store and "b" in store and evicted == ["a"]
+    # Active but never written again: assumed lost
+    assert store.evict_expired(now + 3601) == 1
+    assert store.stats()["evicted"] == {"ttl": 1, "idle": 1, "size": 0}
+
+
+def test_size_cap_evicts_finished_first():
+    store = ContactStore("test", max_entries=2)
+    store["a"] = 1
+    store["b"] = 2
+    store.finish("b")
+    store["c"] = 3
+    assert list(store) == ["a", "c"]
+    store["d"] = 4
+    assert list(store) == ["c", "d"]
+
+
+def test_approx_bytes_is_sampled_and_cached(monkeypatch):
+    monkeypatch.setattr(state_store, "MEMORY_STATS_SAMPLE", 10)
+    monkeypatch.setattr(state_store, "MEMORY_STATS_INTERVAL", 3600)
+    store = ContactStore("test")
+    for index in range(100):
+        store[f"contact-{index}"] = {"transcript": ["x" * 100] * 5}
+    estimate = store.stats()["approx_bytes"]
+    exact = deep_sizeof(store._entries)
+    assert 0.5 * exact < estimate < 1.5 * exact
+    # Reused until the interval passes
+    store["extra"] = {"transcript": ["x" * 100000]}
+    assert store.stats()["approx_bytes"] == estimate
+    assert ContactStore("empty").approx_bytes() == 0
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("boto3")
+pytest.importorskip("openai")
+
+import main  # noqa: E402
+
+
+class StandInConnect:
+    """search_contacts over fixed summaries and describe_contact from fixed contacts, counting calls."""
+
+    def __init__(self, summaries, contacts):
+        self.summaries = summaries
+        self.contacts = contacts
+        self.searches = 0
+        self.described = []
+
+    async def search_contacts(self, priority=None, **params):
+        self.searches += 1
+        return {"Contacts": list(self.summaries)}
+
+    async def describe_contact(self, priority=None, InstanceId=None, ContactId=None):
+        self.described.append(ContactId)
+        return {"Contact": self.contacts[ContactId]}
+
+
+@pytest.fixture
+def contacts(monkeypatch):
+    async def no_poller(contact_id):
+        pass
+
+    monkeypatch.setattr(main, "refresh_attributes", lambda *args, **kwargs: None)
+    monkeypatch.setattr(main, "poll_transcripts", no_poller)
+    ids = ["sweep-connected", "sweep-ended", "sweep-missing", "sweep-other-worker"]
+    for contact_id in ids:
+        main.call_status_store[contact_id] = {"ContactStatus": "CONNECTED", "timestamp": datetime.now(),
+                                              "owner": main.WORKER_ID}
+    main.call_status_store["sweep-other-worker"]["owner"] = "another-worker"
+    yield ids
+    for contact_id in ids:
+        main.call_status_store.pop(contact_id)
+        main.status_signatures.pop(contact_id, None)
+    asyncio.run(main.ingestion_manager.close())
+
+
+def test_one_search_per_sweep_and_describe_only_on_change(monkeypatch, contacts):
+    connected = {"Id": "sweep-connected", "ConnectedToSystemTimestamp": "2024-05-01T09:30:00"}
+    ended = {"Id": "sweep-ended", "ConnectedToSystemTimestamp": "2024-05-01T09:30:00",
+             "DisconnectTimestamp": "2024-05-01T09:34:00", "DisconnectReason": "CUSTOMER_DISCONNECT"}
+    connect = StandInConnect([connected, ended], {
+        "sweep-connected": connected, "sweep-ended": ended,
+        "sweep-missing": {"Id": "sweep-missing", "ConnectedToSystemTimestamp": "2024-05-01T09:30:00"},
+    })
+    monkeypatch.setattr(main, "connect_api", connect)
+
+    async def sweeps():
+        await main.sweep_call_status()
+        first = sorted(connect.described)
+        connect.described.clear()
+        await main.sweep_call_status()
+        return first, sorted(connect.described)
+
+    first, second = asyncio.run(sweeps())
+    # Contacts owned by another worker are that worker's to sweep
+    assert first == ["sweep-connected", "sweep-ended", "sweep-missing"]
+    assert main.call_status_store["sweep-ended"]["ContactStatus"] == "COMPLETED"
+    # Unchanged summaries need no describe_contact; a contact the search missed always gets one
+    assert second == ["sweep-missing"]
+    assert connect.searches == 2
+
+
+def test_evicted_contact_closes_its_transcription_session():
+    class StandInSession:
+        closed = False
+
+        async def close(self):
+            self.closed = True
+
+    async def run():
+        session = StandInSession()
+        main.transcription_sessions["evicted"] = session
+        # What call_status_store runs when it evicts the contact's record
+        main.forget_contact("evicted")
+        await asyncio.gather(*main.closing_sessions)
+        return session
+
+    session = asyncio.run(run())
+    assert session.closed and "evicted" not in main.transcription_sessions
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from transcript_store import TranscriptStore
+
+AT = datetime(2024, 5, 1, 9, 30, 0)
+
+
+def test_segments_kept_in_offset_order():
+    store = TranscriptStore()
+    store.add("Press 1 for claims.", "SYSTEM", 2000, AT)
+    store.add("Thank you for calling.", "SYSTEM", 0, AT)
+    store.add("1", "CUSTOMER", 3000, AT)
+    assert [segment["offset"] for segment in store.segments] == [0, 2000, 3000]
+    assert store.render() == ("[09:30:00] SYSTEM: Thank you for calling.\n"
+                              "[09:30:00] SYSTEM: Press 1 for claims.\n"
+                              "[09:30:00] CUSTOMER: 1")
+
+
+def test_duplicates_are_dropped():
+    store = TranscriptStore()
+    assert store.add("Press 1 for claims.", "SYSTEM", 0, AT) is not None
+    assert store.add("  press 1  FOR claims. ", "SYSTEM", 500, AT) is None
+    # The same words from someone else are a new segment
+    assert store.add("Press 1 for claims.", "CUSTOMER", 900, AT) is not None
+    assert len(store) == 2 and store.version == 2
+
+
+def test_since_returns_new_segments_in_arrival_order():
+    store = TranscriptStore()
+    store.add("second", "SYSTEM", 2000, AT)
+    seen = store.version
+    store.add("first", "SYSTEM", 1000, AT)
+    store.add("third", "SYSTEM", 3000, AT)
+    assert [segment["content"] for segment in store.since(seen)] == ["first", "third"]
+    assert store.since(store.version) == []
@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+from transcription import TranscriptionSession, chunk_bytes
+
+
+def result(result_id, text, start, end, partial):
+    return SimpleNamespace(result_id=result_id, start_time=start, end_time=end, is_partial=partial,
+                           alternatives=[SimpleNamespace(transcript=text)])
+
+
+class StandInStream:
+    """A transcribe-streaming stream: records audio and plays back `results` once the input ends."""
+
+    def __init__(self, results):
+        self.results = results
+        self.audio = []
+        self.ended = asyncio.Event()
+        self.input_stream = self
+        self.output_stream = self._output()
+
+    async def send_audio_event(self, audio_chunk):
+        self.audio.append(audio_chunk)
+
+    async def end_stream(self):
+        self.ended.set()
+
+    async def _output(self):
+        await self.ended.wait()
+        for item in self.results:
+            yield SimpleNamespace(transcript=SimpleNamespace(results=[item]))
+
+
+class StandInTranscribe:
+    def __init__(self, results):
+        self.stream = StandInStream(results)
+
+    async def start_stream_transcription(self, **kwargs):
+        return self.stream
+
+
+async def chunks(count):
+    for _ in range(count):
+        yield b"\0" * chunk_bytes()
+
+
+def test_partials_update_in_place_and_finals_are_delivered():
+    client = StandInTranscribe([
+        result("r1", "please enter", 0.0, 0.2, True),
+        result("r1", "please enter the NPI", 0.0, 0.3, False),
+        result("r2", "followed by", 0.4, 0.5, True),
+    ])
+    finals, partials = [], []
+
+    async def on_final(segment):
+        finals.append(segment["content"])
+
+    async def run():
+        session = TranscriptionSession("c1", chunks(5), client=client, on_final=on_final,
+                                       on_partial=lambda segment, result_id: partials.append(result_id),
+                                       queue_chunks=2)
+        await session.run()
+        return session
+
+    session = asyncio.run(run())
+    assert len(client.stream.audio) == 5 and session.stats()["audio_seconds"] == 0.5
+    assert finals == ["please enter the NPI"] and partials == ["r1", "r2"]
+    assert [segment["content"] for segment in session.segments] == ["please enter the NPI", "followed by"]
+    assert session.transcript == "please enter the NPI"
+    assert session.stats()["partials_open"] == 1
+    assert session.stats()["final_latency_ms"]["p50"] is not None
@@ -0,0 +1,98 @@
+import asyncio
+import io
+import time
+
+import pytest
+
+import campaigns
+from campaigns import Campaign
+from worklists import WorklistStore, header_names, normalize_phone, parse_worklist
+
+CSV = (
+    "Patient Name,Payer Phone,NPI,DOB,,NPI\n"
+    "Jane Doe,(800) 555-0101,1447914288,1990-01-31,,x\n"
+    "John Roe,,1811992431,1985-02-03,,\n"
+    ",,,,,\n"
+    "Ann Poe,800.555.0103 ext 12,12345,someday,,\n"
+)
+
+
+def upload(text, filename="worklist.csv"):
+    return parse_worklist(io.BytesIO(text.encode()), filename)
+
+
+def test_csv_rows_are_parsed_and_validated():
+    worklist = upload(CSV)
+    assert worklist.columns == ("Patient Name", "Payer Phone", "NPI", "DOB", "__EMPTY", "NPI_1")
+    assert len(worklist.rows) == 2 and worklist.rejected == 1
+    assert worklist.phones == ["+18005550101", "+18005550103"]
+    assert worklist.get(0)["Patient Name"] == "Jane Doe"
+    issues = [(issue["line"], issue["type"]) for issue in worklist.summary()["issues"]]
+    # The blank line is skipped; the last row dials but warns about its NPI and DOB
+    assert issues == [(3, "error"), (5, "warning"), (5, "warning")]
+
+
+def test_bad_uploads():
+    with pytest.raises(ValueError):
+        upload("", "worklist.csv")
+    with pytest.raises(ValueError):
+        upload("Phone\n", "worklist.csv")
+    with pytest.raises(ValueError):
+        upload(CSV, "worklist.pdf")
+
+
+def test_helpers():
+    assert header_names(["A", None, "A", "A"]) == ["A", "__EMPTY", "A_1", "A_2"]
+    assert normalize_phone("1-800-555-0101") == "+18005550101"
+    assert normalize_phone("12") == ""
+
+
+def test_campaigns_dial_rows_by_id(monkeypatch):
+    monkeypatch.setattr(campaigns, "CAMPAIGN_DIAL_INTERVAL", 0)
+    store = WorklistStore()
+    worklist = store.add(upload(CSV))
+    row_ids = store.row_ids(worklist.id)
+    assert store.get(row_ids[1])["Patient Name"] == "Ann Poe"
+    with pytest.raises(KeyError):
+        store.get(f"{worklist.id}:9")
+
+    dialed = []
+
+    async def dial(phone, row_data, selected_option):
+        dialed.append((phone, row_data["Patient Name"]))
+        return phone
+
+    async def wait_for_outcome(contact_id):
+        return "COMPLETED", "CUSTOMER_DISCONNECT"
+
+    campaign = Campaign(row_ids, "Claims", row_source=store)
+    # Row data is only looked up when a row is dialed
+    assert all(row.row_data is None for row in campaign.rows)
+    asyncio.run(campaign.run(dial, wait_for_outcome))
+    assert sorted(dialed) == [("+18005550101", "Jane Doe"), ("+18005550103", "Ann Poe")]
+
+
+def test_unused_worklists_are_dropped():
+    store = WorklistStore(max_entries=2, ttl_seconds=0.05)
+    first, second = store.add(upload(CSV)), store.add(upload(CSV))
+    time.sleep(0.06)
+    # Reading a row keeps the first worklist alive; the second sat unused
+    store.get(f"{first.id}:0")
+    assert store.worklists.evict_expired() == 1
+    assert store.row_ids(first.id) and second.id not in store.worklists
+    third, fourth = store.add(upload(CSV)), store.add(upload(CSV))
+    assert list(store.worklists) == [third.id, fourth.id]
+    with pytest.raises(KeyError):
+        store.phone(f"{first.id}:0")
+
+
+def test_xlsx_upload():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Patient Name", "Phone", "Amount"])
+    workbook.active.append(["Jane Doe", 8005550101, 12.0])
+    data = io.BytesIO()
+    workbook.save(data)
+    data.seek(0)
+    worklist = parse_worklist(data, "worklist.xlsx")
+    assert worklist.get(0) == {"Patient Name": "Jane Doe", "Phone": 8005550101, "Amount": 12}
@@ -0,0 +1,63 @@
+from bisect import bisect_right
+from datetime import datetime
+from segments import normalize_segment
+
+
+class TranscriptStore:
+    """
+    One contact's transcript, kept in offset order and deduplicated on insert.
+    Every accepted segment gets a version so readers only pick up what is new.
+    """
+
+    def __init__(self):
+        self.segments = []  # offset order
+        self.version = 0
+        self._offsets = []
+        self._lines = []
+        self._log = []  # insertion order; index i holds the segment with version i + 1
+        self._keys = set()
+        self._rendered = ""
+
+    def __len__(self):
+        return len(self.segments)
+
+    def add(self, content: str, participant: str, offset: int, timestamp: datetime = None, end_offset: int = None):
+        """Insert a segment; returns it, or None if the same participant already said this."""
+        content = content.strip()
+        key = (participant, normalize_segment(content))
+        if key in self._keys:
+            return None
+        self._keys.add(key)
+
+        timestamp = timestamp or datetime.now()
+        self.version += 1
+        segment = {
+            'content': content,
+            'timestamp': timestamp.isoformat(),
+            'participant': participant,
+            'offset': offset,
+            'end_offset': end_offset,
+            'version': self.version,
+        }
+        line = f"[{timestamp.strftime('%H:%M:%S')}] {participant}: {content}"
+
+        index = bisect_right(self._offsets, offset)
+        self._offsets.insert(index, offset)
+        self.segments.insert(index, segment)
+        self._lines.insert(index, line)
+        self._log.append(segment)
+
+        if index == len(self._lines) - 1:
+            # Common case: the segment lands at the end, so extend the cached text
+            self._rendered = f"{self._rendered}\n{line}" if self._rendered else line
+        else:
+            self._rendered = "\n".join(self._lines)
+        return segment
+
+    def since(self, version: int) -> list:
+        """Segments accepted after `version`, in the order they arrived."""
+        return self._log[version:]
+
+    def render(self) -> str:
+        """The formatted transcript shown to the operator, maintained incrementally."""
+        return self._rendered
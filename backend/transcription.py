@@ -0,0 +1,213 @@
+import asyncio
+import os
+import time
+import wave
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from dotenv import load_dotenv
+from metrics import percentile_ms
+
+load_dotenv()
+
+TRANSCRIBE_LANGUAGE = os.getenv("TRANSCRIBE_LANGUAGE", "en-US")
+TRANSCRIBE_SAMPLE_RATE = int(os.getenv("TRANSCRIBE_SAMPLE_RATE", "8000"))
+# 16-bit mono PCM sent to Transcribe in chunks of this many milliseconds
+TRANSCRIBE_CHUNK_MS = int(os.getenv("TRANSCRIBE_CHUNK_MS", "100"))
+# Chunks buffered between the audio source and Transcribe before the source is made to wait
+TRANSCRIBE_QUEUE_CHUNKS = int(os.getenv("TRANSCRIBE_QUEUE_CHUNKS", "50"))
+# Audio-to-text latencies kept per session for percentiles
+TRANSCRIBE_LATENCY_SAMPLES = 500
+
+BYTES_PER_SAMPLE = 2
+
+
+def chunk_bytes(sample_rate: int = None, chunk_ms: int = None) -> int:
+    return (sample_rate or TRANSCRIBE_SAMPLE_RATE) * BYTES_PER_SAMPLE * (chunk_ms or TRANSCRIBE_CHUNK_MS) // 1000
+
+
+async def file_source(path: str, chunk_ms: int = None, realtime: bool = True):
+    """Replay a .wav or raw 16-bit PCM file as audio chunks, paced like a live call by default."""
+    size = chunk_bytes(chunk_ms=chunk_ms)
+    interval = (chunk_ms or TRANSCRIBE_CHUNK_MS) / 1000
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as audio:
+            frames = audio.readframes(audio.getnframes())
+    else:
+        with open(path, "rb") as audio:
+            frames = audio.read()
+    started = time.monotonic()
+    for index, offset in enumerate(range(0, len(frames), size)):
+        if realtime:
+            await asyncio.sleep(max(0.0, started + index * interval - time.monotonic()))
+        yield frames[offset:offset + size]
+
+
+async def socket_source(reader: asyncio.StreamReader, chunk_ms: int = None):
+    """Read raw 16-bit PCM from a stream socket (a stand-in for the Connect media stream)."""
+    size = chunk_bytes(chunk_ms=chunk_ms)
+    while True:
+        try:
+            chunk = await reader.readexactly(size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                yield e.partial
+            return
+        yield chunk
+
+
+_transcribe_client = None
+
+
+def transcribe_client():
+    """One amazon-transcribe streaming client shared by every call."""
+    global _transcribe_client
+    if _transcribe_client is None:
+        from amazon_transcribe.client import TranscribeStreamingClient
+        _transcribe_client = TranscribeStreamingClient(region=os.getenv("AWS_REGION"))
+    return _transcribe_client
+
+
+class TranscriptionSession:
+    """
+    Streams one call's audio to Transcribe: source -> bounded queue -> audio
+    events, with results kept in `segments`. A partial result is updated in
+    place until Transcribe finalizes it; `await on_final(segment)` runs for each final one
+    and `on_partial(segment, result_id)` for every partial update.
+    """
+
+    def __init__(self, contact_id: str, source, client=None, participant: str = "CUSTOMER",
+                 on_final=None, on_partial=None, queue_chunks: int = None):
+        self.contact_id = contact_id
+        self.source = source
+        self.client = client
+        self.participant = participant
+        self.on_final = on_final
+        self.on_partial = on_partial
+        self.queue = asyncio.Queue(queue_chunks or TRANSCRIBE_QUEUE_CHUNKS)
+        self.segments = []
+        self._partials = {}  # result_id -> index in segments
+        # (audio ms sent so far, wall time the chunk was read) for latency lookups
+        self._sent = deque()
+        self._sent_ms = deque()
+        self.audio_ms = 0.0
+        self.chunks = 0
+        self.queue_waits = 0
+        self.latencies = {"partial": deque(maxlen=TRANSCRIBE_LATENCY_SAMPLES), "final": deque(maxlen=TRANSCRIBE_LATENCY_SAMPLES)}
+        self.started_at = datetime.now()
+        self._tasks = []
+
+    async def run(self):
+        client = self.client or transcribe_client()
+        stream = await client.start_stream_transcription(
+            language_code=TRANSCRIBE_LANGUAGE,
+            media_sample_rate_hz=TRANSCRIBE_SAMPLE_RATE,
+            media_encoding="pcm",
+        )
+        receiver = asyncio.create_task(self._receive(stream))
+        self._tasks = [
+            asyncio.create_task(self._read_source()),
+            asyncio.create_task(self._send_audio(stream)),
+            receiver,
+        ]
+        try:
+            # Ends when Transcribe closes the output stream after end_stream, or on close()
+            await asyncio.wait([receiver])
+            if not receiver.cancelled():
+                receiver.result()
+        finally:
+            await self.close()
+
+    async def _read_source(self):
+        try:
+            async for chunk in self.source:
+                if self.queue.full():
+                    self.queue_waits += 1
+                await self.queue.put((chunk, time.monotonic()))
+        except Exception as e:
+            print(f"Audio source error for {self.contact_id}: {e}")
+        await self.queue.put(None)
+
+    async def _send_audio(self, stream):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                await stream.input_stream.end_stream()
+                return
+            chunk, read_at = item
+            await stream.input_stream.send_audio_event(audio_chunk=chunk)
+            self.chunks += 1
+            self.audio_ms += len(chunk) / (TRANSCRIBE_SAMPLE_RATE * BYTES_PER_SAMPLE) * 1000
+            self._sent_ms.append(self.audio_ms)
+            self._sent.append(read_at)
+
+    def _audio_read_at(self, end_ms: float):
+        """Wall time at which the audio up to `end_ms` had been read from the source."""
+        index = bisect_left(self._sent_ms, end_ms)
+        if index >= len(self._sent):
+            return None
+        read_at = self._sent[index]
+        # Results only move forward, so older chunk times are not needed again
+        for _ in range(max(0, index - 1)):
+            self._sent_ms.popleft()
+            self._sent.popleft()
+        return read_at
+
+    async def _receive(self, stream):
+        async for event in stream.output_stream:
+            for result in event.transcript.results:
+                if result.alternatives:
+                    await self._apply(result)
+
+    async def _apply(self, result):
+        text = result.alternatives[0].transcript.strip()
+        read_at = self._audio_read_at(result.end_time * 1000)
+        kind = "partial" if result.is_partial else "final"
+        if read_at is not None:
+            self.latencies[kind].append(time.monotonic() - read_at)
+
+        segment = {
+            'content': text,
+            'timestamp': datetime.now().isoformat(),
+            'participant': self.participant,
+            'offset': int(result.start_time * 1000),
+            'end_offset': int(result.end_time * 1000),
+            'partial': result.is_partial,
+        }
+        index = self._partials.get(result.result_id)
+        if index is None:
+            index = len(self.segments)
+            self.segments.append(segment)
+        else:
+            self.segments[index] = segment
+        if result.is_partial:
+            self._partials[result.result_id] = index
+            if self.on_partial is not None and text:
+                self.on_partial(segment, result.result_id)
+        else:
+            self._partials.pop(result.result_id, None)
+            if self.on_final is not None and text:
+                await self.on_final(segment)
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(segment['content'] for segment in self.segments if not segment['partial'])
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "audio_seconds": self.audio_ms / 1000,
+            "chunks": self.chunks,
+            "queue_depth": self.queue.qsize(),
+            "queue_waits": self.queue_waits,
+            "segments": len(self.segments),
+            "partials_open": len(self._partials),
+            **{
+                f"{kind}_latency_ms": {"p50": percentile_ms(values, 0.5), "p95": percentile_ms(values, 0.95)}
+                for kind, values in self.latencies.items()
+            },
+        }
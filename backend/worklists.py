@@ -0,0 +1,267 @@
+import csv
+import io
+import json
+import os
+import re
+import uuid
+from datetime import date, datetime
+from dotenv import load_dotenv
+from ivr_rules import find_column, parse_date
+from state_store import ContactStore
+
+load_dotenv()
+
+# Row-level errors and warnings kept for the upload response
+WORKLIST_MAX_ISSUES = int(os.getenv("WORKLIST_MAX_ISSUES", "200"))
+# Uploaded worklists kept per worker; the least recently used goes first
+WORKLIST_MAX_ENTRIES = int(os.getenv("WORKLIST_MAX_ENTRIES", "50"))
+# A worklist nobody has read a row of for this long is dropped
+WORKLIST_TTL_SECONDS = float(os.getenv("WORKLIST_TTL_SECONDS", str(24 * 3600)))
+
+# Columns the frontend has always dialed from, in order of preference
+PHONE_COLUMNS = ["Payer Phone", "Phone"]
+
+
+def normalize_phone(phone) -> str:
+    """E.164 for US numbers, the same rules as normalizePhone in App.jsx; "" if invalid."""
+    if not phone:
+        return ""
+    digits = re.sub(r"\D", "", str(phone).strip())
+
+    # More digits than a US number means an extension was appended; cut it off
+    if len(digits) > 11 and digits.startswith("1"):
+        digits = digits[:11]
+    elif len(digits) > 10 and not digits.startswith("1"):
+        digits = digits[:10]
+
+    if len(digits) == 10:
+        return f"+1{digits}"
+    if len(digits) == 11 and digits.startswith("1"):
+        return f"+{digits}"
+    return ""
+
+
+def row_phone(row: dict, phone_column: str = None) -> str:
+    """The normalized number to dial for a worklist row."""
+    columns = [phone_column] if phone_column else PHONE_COLUMNS
+    for column in columns:
+        if row.get(column):
+            return normalize_phone(row[column])
+    return ""
+
+
+def _cell_value(value):
+    """Match what sheet_to_json hands the frontend: "" for blanks, ints for whole numbers."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def header_names(header: list) -> list:
+    """Column names the way sheet_to_json builds them: __EMPTY for blanks, _1, _2 for repeats."""
+    names, seen = [], {}
+    for cell in header:
+        name = str(_cell_value(cell)) or "__EMPTY"
+        base = name
+        while name in seen:
+            seen[base] += 1
+            name = f"{base}_{seen[base]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def iter_csv_rows(file):
+    """Yield raw rows from a binary CSV file object, one at a time."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(file):
+    """Yield raw rows from the first sheet of an .xlsx file without loading the whole sheet."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for row in sheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def iter_rows(file, filename: str):
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return iter_csv_rows(file)
+    if extension in (".xlsx", ".xlsm"):
+        return iter_xlsx_rows(file)
+    raise ValueError(f"Unsupported file type '{extension}', upload .xlsx or .csv")
+
+
+# Identifier columns the IVR asks for and the digit count each must have (None for dates)
+KEY_FIELDS = {"npi": 10, "tax_id": 9, "dob": None}
+
+
+def key_field_columns(columns) -> dict:
+    """Map each key field concept to its column, resolved once from the header."""
+    header = dict.fromkeys(columns)
+    return {concept: column for concept in KEY_FIELDS if (column := find_column(header, concept)) is not None}
+
+
+def validate_key_fields(row: dict, key_columns: dict) -> list:
+    """Warnings for identifier columns the IVR will be asked for."""
+    warnings = []
+    for concept, column in key_columns.items():
+        value = row[column]
+        if value == "":
+            continue
+        length = KEY_FIELDS[concept]
+        if length is None:
+            if parse_date(value) is None:
+                warnings.append(f"{column} is not a date")
+        elif len(re.sub(r"\D", "", str(value))) != length:
+            warnings.append(f"{column} should have {length} digits")
+    return warnings
+
+
+class Worklist:
+    """
+    Rows of one uploaded file. Column names are stored once and each row is kept
+    as a compact JSON array string, decoded back into a dict only when it is used.
+    """
+
+    def __init__(self, filename: str, columns: list):
+        self.id = uuid.uuid4().hex[:12]
+        self.filename = filename
+        self.columns = tuple(columns)
+        self.rows = []
+        self.phones = []
+        self.rejected = 0
+        self.warnings = 0
+        self.issues = []
+        self.created_at = datetime.now()
+        self.key_columns = key_field_columns(self.columns)
+
+    def _issue(self, line: int, kind: str, message: str):
+        if len(self.issues) < WORKLIST_MAX_ISSUES:
+            self.issues.append({"line": line, "type": kind, "message": message})
+
+    def add(self, line: int, values, phone_column: str = None):
+        values = [_cell_value(value) for value in values]
+        if not any(value != "" for value in values):
+            return
+        values = (values + [""] * len(self.columns))[:len(self.columns)]
+        row = dict(zip(self.columns, values))
+        phone = row_phone(row, phone_column)
+        if not phone:
+            self.rejected += 1
+            self._issue(line, "error", "Missing or invalid phone number")
+            return
+        for warning in validate_key_fields(row, self.key_columns):
+            self.warnings += 1
+            self._issue(line, "warning", warning)
+        self.rows.append(json.dumps(values, separators=(",", ":"), default=str))
+        self.phones.append(phone)
+
+    def row_id(self, index: int) -> str:
+        return f"{self.id}:{index}"
+
+    def get(self, index: int) -> dict:
+        return dict(zip(self.columns, json.loads(self.rows[index])))
+
+    def page(self, offset: int = 0, limit: int = 100) -> list:
+        return [
+            {"row_id": self.row_id(index), "phone": self.phones[index], "data": self.get(index)}
+            for index in range(offset, min(offset + limit, len(self.rows)))
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "worklist_id": self.id,
+            "filename": self.filename,
+            "columns": list(self.columns),
+            "rows": len(self.rows),
+            "rejected": self.rejected,
+            "warnings": self.warnings,
+            "issues": self.issues,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+def parse_worklist(file, filename: str, phone_column: str = None) -> Worklist:
+    """Stream a CSV or .xlsx upload into a Worklist; the first row is the header."""
+    rows = iter_rows(file, filename)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("The file is empty")
+    worklist = Worklist(filename, header_names(header))
+    for line, values in enumerate(rows, start=2):
+        worklist.add(line, values, phone_column)
+    if not worklist.rows and not worklist.rejected:
+        raise ValueError("The file has no data rows")
+    return worklist
+
+
+class WorklistStore:
+    """
+    Uploaded worklists, addressed by worklist ID and by "<worklist_id>:<index>" row IDs.
+    Worklists stay in the worker that parsed the upload and are not shared through
+    the state backend, so with several workers the upload, /initiate-call by rowId
+    and /campaigns must reach the same one (e.g. sticky sessions). Reading a row
+    keeps a worklist alive; it is dropped after `ttl_seconds` unused or when more
+    than `max_entries` are held.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        self.worklists = ContactStore("worklists", ttl_seconds=0, max_entries=max_entries or WORKLIST_MAX_ENTRIES,
+                                      max_idle_seconds=WORKLIST_TTL_SECONDS if ttl_seconds is None else ttl_seconds)
+
+    def add(self, worklist: Worklist) -> Worklist:
+        self.worklists[worklist.id] = worklist
+        return worklist
+
+    def remove(self, worklist_id: str) -> bool:
+        return self.worklists.pop(worklist_id, None) is not None
+
+    def _locate(self, row_id: str):
+        worklist_id, _, index = str(row_id).partition(":")
+        worklist = self._use(worklist_id)
+        if worklist is None or not index.isdigit() or int(index) >= len(worklist.rows):
+            raise KeyError(f"Unknown row ID {row_id}")
+        return worklist, int(index)
+
+    def _use(self, worklist_id: str):
+        worklist = self.worklists.get(worklist_id)
+        if worklist is not None:
+            # Rewriting the entry restarts its idle clock, so a campaign still dialing it keeps it
+            self.worklists[worklist_id] = worklist
+        return worklist
+
+    def get(self, row_id: str) -> dict:
+        worklist, index = self._locate(row_id)
+        return worklist.get(index)
+
+    def phone(self, row_id: str) -> str:
+        worklist, index = self._locate(row_id)
+        return worklist.phones[index]
+
+    def row_ids(self, worklist_id: str) -> list:
+        worklist = self._use(worklist_id)
+        if worklist is None:
+            raise KeyError(f"Unknown worklist {worklist_id}")
+        return [worklist.row_id(index) for index in range(len(worklist.rows))]
+
+
+worklist_store = WorklistStore()